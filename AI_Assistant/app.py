@@ -1,21 +1,83 @@
-from flask import Flask, request, jsonify
-from utils import search_internet, append_learning_data, get_ai_response
+import os
+import time
+from flask import Flask, Response, g, request, jsonify, stream_with_context
+from utils import answer_text, execute_command, respond_verbal, speech_text, search_answer, format_search_snippet
+from knowledge_base import get_knowledge_base
+from assistant import AIAssistant
+from search_cache import search_cache
+from tts_stream import stream_speech
+from resolver import Resolver, Tier
+from metrics import registry, SamplingProfiler, recent_profiles, CONTENT_TYPE
+from job_queue import get_job_queue
+from sessions import SessionStore
 # from utils import load_learning_data
 # Import the get_ai_response function
-from adaptive_ai import AdaptiveAI  # Import the AdaptiveAI class
 
 app = Flask(__name__)
 
-# Initialize AdaptiveAI instance
-ai = AdaptiveAI()
 
-# Load learning data once on startup
-data = ai.data  # Assuming ai.data contains necessary learning data
+# Learning data file; serving.py sets this to its --file for every worker
+LEARNING_FILE = os.environ.get('ASSISTANT_LEARNING_FILE', 'learning.json')
+
+# Shared, thread-safe learning data; writes are batched to disk in the background
+knowledge_base = get_knowledge_base(LEARNING_FILE)  # One shared copy for every component in this process
+learning_data_manager = knowledge_base.learning
+ai_assistant = AIAssistant(knowledge_base=knowledge_base)  # Answers /define from the shared dictionary
+job_queue = get_job_queue()  # Learning writes run here, after the response is sent
+
+request_seconds = registry.histogram('assistant_request_seconds', "HTTP request latency per route.", ('route',))
+# Per-request sampling profiles (?profile=1) are only honoured when this is set
+PROFILING_ENABLED = os.environ.get('ASSISTANT_PROFILING') == '1'
+# Also render audio for predicted follow-ups, so /speak can answer them without synthesis
+PREFETCH_AUDIO = os.environ.get('ASSISTANT_PREFETCH_AUDIO') == '1'
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if PROFILING_ENABLED and request.args.get('profile') == '1':
+        g.profiler = SamplingProfiler().start()
+
+@app.after_request
+def record_request(response):
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    request_seconds.observe(time.perf_counter() - g.request_started, route=route)
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        recent_profiles.append(dict(profiler.stop().report(), route=route))
+    return response
+
+def local_response(user_input):
+    """Answer from the learning data; exact lookups are served from the mmap snapshot while it is current."""
+    if user_input.startswith('#'):
+        return execute_command(user_input)
+    return answer_text(learning_data_manager.lookup(user_input))
+
+def learned_answer(query):
+    """Answers learned for the closest stored question, or None."""
+    entry = learning_data_manager.lookup(query)
+    return (entry.get('answer') or None) if entry is not None else None
+
+ASK_BUDGET = 2.0  # Seconds a quoted /ask search may take before falling back to the local answer
+SEARCHES_IN_FLIGHT = 4  # Slow searches the resolver pool runs at once; beyond that /ask answers locally
+# Searches prefer the online snippet; the learned answer is a hedge started once the search runs late
+search_resolver = Resolver([
+    Tier('remote', search_answer, 0.8, max_in_flight=SEARCHES_IN_FLIGHT),
+    Tier('local', learned_answer, 0.005),
+], budget=ASK_BUDGET)
+
+# Requests that send a session_id get follow-up answers resolved ahead of time
+sessions = SessionStore(lookup=learning_data_manager.lookup, resolve=local_response, prefetch_audio=PREFETCH_AUDIO)
+
+def session_response(session_id, user_input):
+    """The answer predicted for this session's next question, else the learned one."""
+    response = sessions.answer(session_id, user_input) if session_id else None
+    return response if response is not None else local_response(user_input)
 
 @app.route('/ask', methods=['POST'])
 def ask():
     """Handle user input and return AI-generated responses or internet search results."""
     user_input = request.json.get('input', '').strip().lower()
+    session_id = request.json.get('session_id')  # Optional: keeps context and prefetches follow-ups
 
     if not user_input:
         return jsonify({"error": "No input provided."}), 400  # Bad request
@@ -23,36 +85,78 @@ def ask():
     # Check if the user input is enclosed in quotes for an internet search
     if user_input.startswith('"') and user_input.endswith('"'):
         query = user_input.strip('"')
-        response = search_internet(query)
+        # Online answer within the budget, else the learned one if the search is slow or failing
+        response, tier = search_resolver.resolve(query)
+        # Only a real search hit is new knowledge: never fallback text, errors or what was already learned
+        if tier == 'remote':
+            job_queue.submit('learn', knowledge_base.learning_file, query, response)  # Merged in the background
+        response = response or format_search_snippet(None)
     else:
-        # Get AI response from the learning data
-        response = get_ai_response(user_input, data)
+        # Get AI response from the learning data (or the session's prefetched follow-up answer)
+        response = session_response(session_id, user_input)
 
-    # Save new data only if the response is meaningful
-    if response and len(response) > 10:
-        append_learning_data(user_input, response, data)
+    if session_id:
+        sessions.record(session_id, user_input, response)
 
-    # Log the response for debugging
-    print(response)
-
-    return jsonify({"entries": response or "I'm sorry, I couldn't understand that. Please rephrase your question."})
+    result = {"entries": response or "I'm sorry, I couldn't understand that. Please rephrase your question."}
+    if session_id:
+        result["session_id"] = session_id
+    return jsonify(result)
 
 
 @app.route('/speak', methods=['POST'])
 def speak():
-    """Handle user input and return a verbal response."""
+    """Handle user input and return a verbal response.
+
+    With "stream": true the MP3 itself is streamed back (chunked), one
+    sentence at a time as it is synthesized, instead of a file path.
+    """
     user_input = request.json.get('input', '').strip().lower()
-    response = get_ai_response(user_input, data)
-    audio_file = ai.speak(response)  # Generate verbal response
+    session_id = request.json.get('session_id')
+    response = session_response(session_id, user_input)
+    if session_id:
+        sessions.record(session_id, user_input, response)
+    if request.json.get('stream'):
+        return Response(stream_with_context(stream_speech(speech_text(response))), mimetype='audio/mpeg')
+    audio_file = respond_verbal(speech_text(response))  # Served from the audio cache when already rendered
     return jsonify({"entries": response, "audio_file": audio_file})
 
 @app.route('/define', methods=['POST'])
 def define():
-    """Fetch word meaning from the dictionary."""
-    word = request.json.get('word', '').strip().lower()
-    meaning = ai.get_word_meaning(word)
-    return jsonify({"word": word, "meaning": meaning})
+    """Fetch word meaning from the dictionary, correcting typos and suggesting close words locally."""
+    word = request.json.get('word', '')
+    return jsonify(ai_assistant.define_word(word))
+
+@app.route('/search_cache', methods=['GET'])
+def search_cache_stats():
+    """Report search cache hit/miss counts and the fetch latency they saved."""
+    return jsonify(search_cache.stats())
+
+@app.route('/resolver', methods=['GET'])
+def resolver_stats():
+    """Report per-tier hit rates and latencies of answer resolution."""
+    return jsonify({"ask": search_resolver.stats(), "reasoning": ai_assistant.resolver.stats()})
+
+@app.route('/jobs', methods=['GET'])
+def job_stats():
+    """Report the background job queue: pending, processed, failed and rejected jobs."""
+    return jsonify(job_queue.stats())
+
+@app.route('/sessions', methods=['GET'])
+def session_stats():
+    """Report active sessions and how often predicted follow-ups were asked."""
+    return jsonify(sessions.stats())
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Stage latencies, cache hits/misses and request counters in the Prometheus text format."""
+    return Response(registry.render(), content_type=CONTENT_TYPE)
+
+@app.route('/metrics/profiles', methods=['GET'])
+def profiles():
+    """Most recent sampling profiles of requests made with ?profile=1 (ASSISTANT_PROFILING=1)."""
+    return jsonify(list(recent_profiles))
 
-# Run the Flask app
+# Run the Flask app (one process; python serving.py runs several workers behind one port)
 if __name__ == '__main__':
     app.run(debug=False, port=5001)  # Ensure this block is included
@@ -0,0 +1,313 @@
+"""asyncio-native variant of app.py with the same routes and JSON contract.
+
+Run it with any ASGI server, e.g. ``hypercorn asgi_app:app`` or
+``uvicorn asgi_app:app``. Outbound searches use a non-blocking HTTP client
+and blocking work (TTS synthesis, disk and index maintenance) runs in a
+thread pool, so one process can keep hundreds of slow lookups in flight.
+The Flask app in app.py remains the simple synchronous deployment.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from quart import Quart, Response, g, request, jsonify
+from utils import answer_text, execute_command, respond_verbal, speech_text, format_search_snippet, google_search_url, first_google_snippet
+from knowledge_base import get_knowledge_base
+from assistant import AIAssistant
+from search_cache import search_cache, cache_key
+from http_client import AsyncHttpClient
+from tts_stream import stream_speech
+from metrics import registry, stage, SamplingProfiler, recent_profiles, CONTENT_TYPE
+from resolver import TierStats, tier_results, tier_seconds
+from job_queue import get_job_queue
+from sessions import SessionStore
+
+app = Quart(__name__)
+
+LEARNING_FILE = os.environ.get('ASSISTANT_LEARNING_FILE', 'learning.json')  # As in app.py
+knowledge_base = get_knowledge_base(LEARNING_FILE)  # One shared copy for every component in this process
+learning_data_manager = knowledge_base.learning
+ai_assistant = AIAssistant(knowledge_base=knowledge_base)  # Answers /define from the shared dictionary
+job_queue = get_job_queue()  # Learning writes run here, after the response is sent
+
+# Blocking work (lookups, gTTS, queueing learning writes) runs in executor instead of on the event loop
+executor = None
+http_client = None
+_inflight = {}  # Cache key -> Future for searches already in progress on this loop
+
+
+request_seconds = registry.histogram('assistant_request_seconds', "HTTP request latency per route.", ('route',))
+# Per-request sampling profiles (?profile=1) are only honoured when this is set
+PROFILING_ENABLED = os.environ.get('ASSISTANT_PROFILING') == '1'
+# Also render audio for predicted follow-ups, so /speak can answer them without synthesis
+PREFETCH_AUDIO = os.environ.get('ASSISTANT_PREFETCH_AUDIO') == '1'
+
+
+@app.before_request
+async def start_request_timer():
+    g.request_started = time.perf_counter()
+    if PROFILING_ENABLED and request.args.get('profile') == '1':
+        g.profiler = SamplingProfiler().start()  # Samples the event loop thread, so other requests show up too
+
+
+@app.after_request
+async def record_request(response):
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    request_seconds.observe(time.perf_counter() - g.request_started, route=route)
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        recent_profiles.append(dict(profiler.stop().report(), route=route))
+    return response
+
+
+@app.before_serving
+async def startup():
+    global executor, http_client
+    executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='asgi-worker')
+    http_client = AsyncHttpClient()
+
+
+@app.after_serving
+async def shutdown():
+    await http_client.aclose()
+    executor.shutdown(wait=True)
+
+
+async def run_blocking(function, *args):
+    """Run a blocking call in the worker pool and await its result."""
+    return await asyncio.get_running_loop().run_in_executor(executor, partial(function, *args))
+
+
+async def stream_blocking(generator):
+    """Drive a blocking generator from the worker pool, yielding its items to the event loop."""
+    try:
+        while True:
+            block = await run_blocking(next, generator, None)
+            if block is None:
+                break
+            yield block
+    finally:
+        await run_blocking(generator.close)
+
+
+def local_response(user_input):
+    """Answer from the learning data; exact lookups are served from the mmap snapshot while it is current."""
+    if user_input.startswith('#'):
+        return execute_command(user_input)
+    return answer_text(learning_data_manager.lookup(user_input))
+
+
+def learned_answer(query):
+    """Answers learned for the closest stored question, or None."""
+    entry = learning_data_manager.lookup(query)
+    return (entry.get('answer') or None) if entry is not None else None
+
+
+# Requests that send a session_id get follow-up answers resolved ahead of time (in its own threads)
+sessions = SessionStore(lookup=learning_data_manager.lookup, resolve=local_response, prefetch_audio=PREFETCH_AUDIO)
+
+
+async def session_response(session_id, user_input):
+    """The answer predicted for this session's next question, else the learned one (both off the loop)."""
+    response = await run_blocking(sessions.answer, session_id, user_input) if session_id else None
+    return response if response is not None else await run_blocking(local_response, user_input)
+
+
+async def search_snippet(query):
+    """Non-blocking counterpart of utils.search_answer sharing its cache and breakers.
+
+    Returns the first result snippet for query (None if there was none);
+    errors propagate.
+    """
+    key = cache_key('google', query)
+    found, snippet = search_cache.lookup(key)
+    if found:
+        return snippet
+
+    # Single-flight: concurrent identical queries await the same request
+    future = _inflight.get(key)
+    if future is not None:
+        return await asyncio.shield(future)
+
+    future = _inflight[key] = asyncio.get_running_loop().create_future()
+    try:
+        started = time.perf_counter()
+        with stage('remote_search'):
+            response = await http_client.get(google_search_url(query))
+        response.raise_for_status()
+        snippet = first_google_snippet(response.json())
+        search_cache.put(key, snippet, fetch_seconds=time.perf_counter() - started)
+        future.set_result(snippet)
+        return snippet
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # Mark retrieved so a future nobody awaited does not warn
+        raise
+    finally:
+        del _inflight[key]
+        if not future.done():  # The leader was cancelled: fail the waiters instead of leaving them hanging
+            future.set_exception(SearchCancelledError(f"Search for {query!r} was cancelled."))
+            future.exception()
+
+
+class SearchCancelledError(Exception):
+    """Given to requests waiting on a shared search whose leading request was cancelled."""
+
+
+ASK_BUDGET = 2.0  # Seconds a quoted /ask search may take before falling back to the local answer (as in app.py)
+SEARCH_COST = 0.8  # Seconds a search usually takes; past this the learned answer is tried as a hedge
+ask_stats = {'remote': TierStats(), 'local': TierStats()}  # Same shape as app.py's search_resolver.stats()
+
+
+def _record_tier(name, started, result):
+    latency = time.perf_counter() - started
+    ask_stats[name].record(latency, hit=result == 'hit', error=result == 'error')
+    tier_seconds.observe(latency, tier=name)
+    tier_results.inc(tier=name, result=result)
+
+
+def _search_outcome(search, started):
+    """Formatted snippet of a finished search task, or None for a miss or an error (recorded either way)."""
+    try:
+        snippet = search.result()
+    except Exception as e:
+        print(f"Error in remote tier: {e}")  # Debugging
+        _record_tier('remote', started, 'error')
+        return None
+    _record_tier('remote', started, 'hit' if snippet else 'miss')
+    return format_search_snippet(snippet) if snippet else None
+
+
+async def resolve_search(query):
+    """Return (answer, tier) like app.py's search_resolver: the online snippet, else the learned answer.
+
+    The learned answer is looked up once the search misses, fails or runs
+    past SEARCH_COST; an answer nobody is waiting for any more is left to
+    finish so it still fills the search cache. (None, None) past ASK_BUDGET.
+    """
+    started = time.perf_counter()
+    search = asyncio.ensure_future(search_snippet(query))
+    outcome = []  # Filled once, by whichever of resolve_search or the callback sees the search finish
+
+    def settle(task):
+        if not outcome:
+            outcome.append(_search_outcome(task, started))
+
+    try:
+        await asyncio.wait({search}, timeout=SEARCH_COST)
+        if search.done():
+            settle(search)
+            if outcome[0] is not None:
+                return outcome[0], 'remote'
+        local_started = time.perf_counter()
+        local = await run_blocking(learned_answer, query)
+        _record_tier('local', local_started, 'hit' if local else 'miss')
+        if local is not None:
+            return local, 'local'
+        if not search.done():
+            await asyncio.wait({search}, timeout=ASK_BUDGET - (time.perf_counter() - started))
+        if search.done():
+            settle(search)
+            if outcome[0] is not None:
+                return outcome[0], 'remote'
+        return None, None
+    finally:
+        if not search.done():
+            ask_stats['remote'].record_abandoned()
+            tier_results.inc(tier='remote', result='abandoned')
+            search.add_done_callback(settle)  # Also retrieves its exception, so nothing warns
+
+
+@app.route('/ask', methods=['POST'])
+async def ask():
+    """Handle user input and return AI-generated responses or internet search results."""
+    payload = (await request.get_json()) or {}
+    user_input = payload.get('input', '').strip().lower()
+    session_id = payload.get('session_id')  # Optional: keeps context and prefetches follow-ups
+
+    if not user_input:
+        return jsonify({"error": "No input provided."}), 400  # Bad request
+
+    if user_input.startswith('"') and user_input.endswith('"'):
+        query = user_input.strip('"')
+        # Online answer within the budget, else the learned one if the search is slow or failing
+        response, tier = await resolve_search(query)
+        # Only a real search hit is new knowledge: never fallback text, errors or what was already learned
+        if tier == 'remote':
+            await run_blocking(job_queue.submit, 'learn', knowledge_base.learning_file, query, response)
+        response = response or format_search_snippet(None)
+    else:
+        # Get AI response from the learning data (or the session's prefetched follow-up answer)
+        response = await session_response(session_id, user_input)
+
+    if session_id:
+        await run_blocking(sessions.record, session_id, user_input, response)
+
+    result = {"entries": response or "I'm sorry, I couldn't understand that. Please rephrase your question."}
+    if session_id:
+        result["session_id"] = session_id
+    return jsonify(result)
+
+
+@app.route('/speak', methods=['POST'])
+async def speak():
+    """Handle user input and return a verbal response (streamed MP3 with "stream": true)."""
+    payload = (await request.get_json()) or {}
+    user_input = payload.get('input', '').strip().lower()
+    session_id = payload.get('session_id')
+    response = await session_response(session_id, user_input)
+    if session_id:
+        await run_blocking(sessions.record, session_id, user_input, response)
+    if payload.get('stream'):
+        return Response(stream_blocking(stream_speech(speech_text(response))), mimetype='audio/mpeg')
+    audio_file = await run_blocking(respond_verbal, speech_text(response))  # Synthesis on a miss is blocking
+    return jsonify({"entries": response, "audio_file": audio_file})
+
+@app.route('/define', methods=['POST'])
+async def define():
+    """Fetch word meaning from the dictionary, correcting typos and suggesting close words locally."""
+    word = ((await request.get_json()) or {}).get('word', '')
+    return jsonify(await run_blocking(ai_assistant.define_word, word))  # May compile or page in the index
+
+
+@app.route('/search_cache', methods=['GET'])
+async def search_cache_stats():
+    """Report search cache hit/miss counts and the fetch latency they saved."""
+    return jsonify(search_cache.stats())
+
+
+@app.route('/resolver', methods=['GET'])
+async def resolver_stats():
+    """Report per-tier hit rates and latencies of answer resolution."""
+    return jsonify({"ask": {name: stats.snapshot() for name, stats in ask_stats.items()},
+                    "reasoning": ai_assistant.resolver.stats()})
+
+
+@app.route('/jobs', methods=['GET'])
+async def job_stats():
+    """Report the background job queue: pending, processed, failed and rejected jobs."""
+    return jsonify(job_queue.stats())
+
+
+@app.route('/sessions', methods=['GET'])
+async def session_stats():
+    """Report active sessions and how often predicted follow-ups were asked."""
+    return jsonify(sessions.stats())
+
+
+@app.route('/metrics', methods=['GET'])
+async def metrics():
+    """Stage latencies, cache hits/misses and request counters in the Prometheus text format."""
+    return Response(registry.render(), content_type=CONTENT_TYPE)
+
+
+@app.route('/metrics/profiles', methods=['GET'])
+async def profiles():
+    """Most recent sampling profiles of requests made with ?profile=1 (ASSISTANT_PROFILING=1)."""
+    return jsonify(list(recent_profiles))
+
+
+if __name__ == '__main__':
+    app.run(port=5001)
@@ -3,19 +3,21 @@ import os
 import subprocess
 # from dataManagement import LearningDataManager
 # from numpy.core.defchararray import endswith
-from dataManagement import LearningDataManager
-from adaptive_ai import AdaptiveAI
-from textblob import TextBlob
+from knowledge_base import get_knowledge_base
 # import speech_recognition as sr  # Ensure you have this library installed
-import requests
-from communication import listen_for_audio_command, speak
 # from utils import get_ai_response, append_learning_data
 # from ai_assistant.speak import user_input
 import json
 import random
-import string
 from utils import get_ai_response
-from gtts import gTTS
+from search_cache import search_cache, cache_key
+from tts_cache import get_tts_cache
+from resolver import Resolver, Tier
+from metrics import stage, count
+from job_queue import get_job_queue
+from sessions import SessionStore
+# Heavy dependencies (TextBlob, requests, NumPy, the audio stack) are imported on first use
+# so importing this module stays cheap for text-only use and for app.py.
 """
     Voice Recognition (Speech-to-Text)
 
@@ -71,38 +73,48 @@ User-Specific Customization: Enabling the assistant to adapt more to the user’
 
 
 class InputProcessor:
-    def __init__(self, assistant):
+    def __init__(self, assistant, knowledge_base=None, aiassistant=None):
         self.assistant = assistant
         self.assist = Assistant
-        self.aiassistant = AIAssistant()
-        self.learning_data_manager = LearningDataManager() # Instance of LearningDataManager
+        self.knowledge_base = knowledge_base or get_knowledge_base()  # Shared, process-wide knowledge
+        self.aiassistant = aiassistant or AIAssistant(knowledge_base=self.knowledge_base)
+        self.learning_data_manager = self.knowledge_base.learning  # Shared, thread-safe LearningDataManager
         self.generate_response = get_ai_response  # Assign function reference, not execution
-        self.learning_data = self.learning_data_manager.data  # Load learning data directly from the manager
-        self.data = self.learning_data_manager.data  # Ensure this points to the correct data structure
+
+    @property
+    def learning_data(self):
+        """The manager's learning data, parsed on first access (lookups may be served by the snapshot)."""
+        return self.learning_data_manager.data
+
+    @property
+    def data(self):
+        return self.learning_data_manager.data
 
     def process_input(self, user_input):
         """Process user input based on specific commands and prefixes."""
         user_input = user_input.strip().lower()
-        print(user_input)  # Debug: log user input
 
         try:
             if user_input.startswith('#'):
+                count('route_command')
                 app_name = user_input  # Get the app name after the #
                 return self.run_application(app_name)
             elif user_input.startswith('/') and user_input.endswith('/'):
+                count('route_dictionary')
                 word_to_define = user_input[1:-1].strip()
                 word_define = word_to_define[0].upper() + word_to_define[1:]
                 return self.search_dictionary(word_define)
             elif user_input.startswith('"') and user_input.endswith('"'):
+                count('route_search')
                 query = user_input[1:-1]  # Remove the surrounding quotes
                 return self.search_internet(query)
             elif user_input.startswith("define "):
+                count('route_reasoning')
                 word_to_define = user_input[7:].strip()  # Get the word after 'define '
                 return self.reasoning_function(word_to_define)
             elif user_input:  # Use AI response generation here
-                learning = self.search_learning_json(user_input)
-                speak(learning)
-                return learning
+                count('route_learned')
+                return self.search_learning_json(user_input)  # interact / the voice loop speak it
 
         except Exception as e:
             print(f"Error processing input: {e}")  # Log any processing errors
@@ -129,36 +141,28 @@ class InputProcessor:
 
     def search_internet(self, query):
         """Search the internet for a query."""
-        print(f"Searching the internet for: {query}")
         # Simulate an internet search
         results = self.aiassistant.search_internet(query)
         if results:
             return f"Search results for: {query}\nResults: {results}."
         return f"No results found for: {query}."
 
-    def search_learning_json(self, user_input):
-        """Search for a response in the learning data."""
-        user_input = user_input.lower().strip(string.punctuation)
-        # print(f"User Input: {user_input}")  # Debugging: print the user input
-        for entry in self.learning_data.get('entries', []):  # Use get to avoid KeyError
-            if isinstance(entry, dict):
-                question = entry.get("question", "").lower() # Use get to avoid KeyError
-                question = question.strip(string.punctuation)
-                # print(f"Comparing with: {question}")  # Debugging: print the question being compared
-                if question == user_input:  # Indicate a match has been found
-                    answers = entry.get('answer', [])  # Get answers, default to empty list
-                    if answers:  # Check if answers list is not empty
-                        return random.choice(answers)  # Return a random answer
-                    else:
-                        print("No answers available in my data but I will try to generate my answer.")  # Debugging
+    def search_learning_json(self, user_input, fuzzy=False):
+        """Search for a response in the learning data (falling back to the closest question when fuzzy)."""
+        entry = self.learning_data_manager.lookup(user_input, fuzzy=fuzzy)
+        if entry is not None:
+            answers = entry.get('answer', [])  # Get answers, default to empty list
+            if answers:  # Check if answers list is not empty
+                return random.choice(answers)  # Return a random answer
+            print("No answers available in my data but I will try to generate my answer.")  # Debugging
 
         return None  # Return None if no matching entry is found
 
     def get_ai_response(self, user_input):
         """Get AI response based on user input and learning data."""
-        for entry in self.data:
-            if entry['question'] == user_input:  # Ensure you're comparing correctly
-                return entry['answer'][0]  # Assuming answer is a list
+        entry = self.learning_data_manager.lookup(user_input, fuzzy=False)
+        if entry is not None and entry.get('answer'):
+            return entry['answer'][0]  # Assuming answer is a list
         return "I'm sorry, I don't have an answer for that."
 
 
@@ -176,37 +180,73 @@ class InputProcessor:
 
 
 class Assistant:
-    def __init__(self):
-        self.ai = AdaptiveAI()  # Initialize the AdaptiveAI instance
-        self.learning_data_manager = LearningDataManager()  # Initialize the Learning Data Manager
-        self.data = self.learning_data_manager.data  # Load learning data
-        self.input_processor = InputProcessor(self)
-        self.get_response = InputProcessor(self)
+    def __init__(self, knowledge_base=None):
+        self.knowledge_base = knowledge_base or get_knowledge_base()  # Loaded once, shared by every component
+        self.learning_data_manager = self.knowledge_base.learning  # Shared Learning Data Manager
+        self.input_processor = InputProcessor(self, knowledge_base=self.knowledge_base)
+        self.get_response = self.input_processor
         self.get_ai_response = self.get_response.reasoning_function
+        # The console conversation is one session: likely follow-ups are answered (and voiced) ahead of time
+        self.session_id = 'console'
+        self.sessions = SessionStore(lookup=self.learning_data_manager.lookup,
+                                     resolve=self.input_processor.search_learning_json, prefetch_audio=True)
+        self._player = None
+
+    @property
+    def data(self):
+        """The shared learning data, parsed on first access."""
+        return self.learning_data_manager.data
 
     def choose_input_method(self):
-        """Prompt the user to choose between text or audio input."""
+        """Prompt the user to choose between text or audio input; None means audio (the voice loop)."""
         while True:
             choice = input("Choose input method (text/audio): ").strip().lower()
 
             if choice == 'text':
                 return input("You: ").strip()  # Get text input from the user
             elif choice == 'audio':
-                return listen_for_audio_command()  # Use the audio command function
+                return None  # interact hands over to the pipelined voice loop
             else:
                 print("Invalid choice. Please enter 'text' or 'audio'.")
 
+    @property
+    def player(self):
+        """The single long-lived audio player; replies queue up instead of talking over each other."""
+        if self._player is None:
+            from voice_pipeline import Player
+            self._player = Player()
+        return self._player
+
     def speak(self, text):
-        if text.strip() == "":
+        if not isinstance(text, str) or text.strip() == "":
             return  # Avoid speaking empty text
 
-        # Create the gTTS object and save the speech to an MP3 file
-        tts = gTTS(text=text, lang='en')
-        audio_file_path = "response.mp3"
-        tts.save(audio_file_path)
+        # Reuse cached audio for repeated answers; each text has its own file, so replies never clobber each other
+        audio_file_path = get_tts_cache().get_audio(text)
+
+        # Queue it on the player: returns right away, and plays after any reply still playing
+        self.player.enqueue(audio_file_path)
+
+    def respond(self, user_input):
+        """Answer one command: a predicted follow-up from the session, else the input processor."""
+        response = self.sessions.answer(self.session_id, user_input)  # Predicted follow-up, already resolved
+        if response is None:
+            response = self.input_processor.process_input(user_input)
+        if response:
+            self.sessions.record(self.session_id, user_input, response)
+            return response
+        return self.get_ai_response(user_input)
 
-        # Use subprocess to play the audio without blocking the main thread
-        subprocess.Popen(["mpg123", audio_file_path], stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    def voice_loop(self, **stages):
+        """Listen, recognize, answer, synthesize and play as concurrent stages until "exit" is said.
+
+        stages overrides any VoicePipeline stage (source, recognize, synthesize,
+        player), e.g. with the stand-ins in voice_pipeline for testing.
+        """
+        from voice_pipeline import VoicePipeline
+        stages.setdefault('player', self.player)
+        VoicePipeline(answer=self.respond, **stages).run()
+        self._player = None  # The pipeline closed it
 
 
     def execute_command(self, user_input):
@@ -262,14 +302,22 @@ class Assistant:
         while True:
             user_input = self.choose_input_method()  # Get user input based on the selected method
 
+            if user_input is None:
+                self.voice_loop()  # Spoken commands keep coming while earlier replies are synthesized and played
+                print("Goodbye!")
+                break
+
             if user_input.lower() == "exit":
                 print("Goodbye!")
                 break
 
-            response = self.input_processor.process_input(user_input)
+            response = self.sessions.answer(self.session_id, user_input)  # Predicted follow-up, already resolved
+            if response is None:
+                response = self.input_processor.process_input(user_input)
 
             # Check the response and print debug information
             if response:
+                self.sessions.record(self.session_id, user_input, response)
                 print(f"AI Response: {response}")
                 self.speak(response)  # Generate verbal response
             else:
@@ -282,68 +330,155 @@ class Assistant:
 
 
 class AIAssistant:
-    def __init__(self, dictionary_file='dictionary.json', file_path="learning.json", response_function=None):
+    def __init__(self, dictionary_file='dictionary.json', file_path="learning.json", response_function=None,
+                 knowledge_base=None):
         self.dictionary_file = dictionary_file
-        self.spell_checker = TextBlob
-        self.load_dictionary()
+        self.knowledge_base = knowledge_base or get_knowledge_base(file_path, dictionary_file)
         self.get_ai_response = response_function  # Assign the passed function
         self.file_path = file_path
-        self.learning_data_manager = LearningDataManager()  # Instance of LearningDataManager
-        self.load_data = self.learning_data_manager.data  # Load learning data
+        self.learning_data_manager = self.knowledge_base.learning  # Shared, thread-safe LearningDataManager
+        self._resolver = None
+
+    @property
+    def resolver(self):
+        """Tiered, latency-budgeted answer resolution used by reason_out_answer (built on first use)."""
+        if self._resolver is None:
+            self._resolver = Resolver(self.answer_tiers())
+        return self._resolver
+
+    def answer_tiers(self):
+        """Answer sources in order of preference, with their typical cost in seconds."""
+        tiers = [
+            Tier('exact', lambda query: self._pick_answer(self.learning_data_manager.lookup(query, fuzzy=False)), 0.0005),
+            Tier('fuzzy', lambda query: self._pick_answer(self.learning_data_manager.lookup(query, fuzzy=True)), 0.003),
+            Tier('dictionary', lambda query: self.dictionary_answer(query, corrected=False), 0.001),
+        ]
+        if self.get_ai_response:
+            tiers.append(Tier('response', self.get_ai_response, 0.01))
+        tiers.append(Tier('semantic', self.semantic_answer, 0.02))
+        # A corrected spelling is a guess, so it only answers what the learned data could not
+        tiers.append(Tier('spelling', self.dictionary_answer, 0.002))
+        tiers.append(Tier('remote', self.remote_answer, 0.8, max_in_flight=4))  # Leave pool room for the rest
+        return tiers
+
+    @staticmethod
+    def _pick_answer(entry):
+        if entry is not None and entry.get('answer'):
+            return random.choice(entry['answer'])
+        return None
+
+    def dictionary_answer(self, query, corrected=True):
+        """Definition for a single-word query (misspellings corrected unless corrected=False), or None."""
+        words = query.strip().split()
+        if len(words) != 1:
+            return None
+        if not corrected:
+            return self.dictionary_service.define(words[0])
+        match = self.dictionary_service.lookup(words[0])
+        return match[1] if match else None
+
+    @property
+    def load_data(self):
+        """The shared learning data, parsed on first access."""
+        return self.learning_data_manager.data
+
+    @property
+    def spell_checker(self):
+        """TextBlob class, imported on first use."""
+        from textblob import TextBlob
+        return TextBlob
+
+    @property
+    def dictionary(self):
+        """The shared knowledge base's dictionary, parsed once per process."""
+        return self.knowledge_base.dictionary
 
     def load_dictionary(self):
-        """Load the dictionary from the specified JSON file."""
-        try:
-            with open(self.dictionary_file, 'r') as file:
-                self.dictionary = json.load(file)
-        except FileNotFoundError:
-            self.dictionary = {}
-            print("Dictionary file not found. Please ensure it exists.")
+        """Load the dictionary from the specified JSON file (parsed once per process)."""
+        return self.dictionary
+
+    @property
+    def dictionary_service(self):
+        """Shared indexed dictionary: exact, prefix and misspelling-tolerant lookups."""
+        return self.knowledge_base.dictionary_service
 
     def get_word_meaning(self, word):
-        """Retrieve the definition of a word from the loaded dictionary."""
+        """Retrieve the definition of a word, correcting small misspellings locally."""
         if not word:
             return "Meaning not found."  # Handle empty word case
-        return self.dictionary.get(word.lower(), "Definition not found.")  # Case-insensitive lookup
+        match = self.dictionary_service.lookup(word)  # Case-insensitive, then closest spelling
+        return match[1] if match else "Definition not found."
+
+    def define_word(self, word, limit=5):
+        """Definition plus the word it was found under and alternatives when word itself is not listed."""
+        word = word.strip().lower()
+        match = self.dictionary_service.lookup(word) if word else None
+        result = {"word": word, "meaning": match[1] if match else "Definition not found."}
+        if match is None or match[0] != word:
+            result["match"] = match[0] if match else None
+            suggestions = [suggestion for suggestion, _ in self.dictionary_service.suggest(word, limit)] if word else []
+            completions = self.dictionary_service.complete(word, limit) if word else []
+            result["suggestions"] = list(dict.fromkeys(suggestions + completions))[:limit]
+        return result
 
     def search_internet(self, query):
         """Search the internet for a given query using DuckDuckGo and save new knowledge."""
-        print(f"Searching the internet for: {query}")
-        url = "https://api.duckduckgo.com/"
-        params = {
-            'q': query,
-            'format': 'json',
-            'no_redirect': 1,
-            'no_html': 1,
-            'skip_disambig': 1,
-        }
+        import requests
+        from http_client import CircuitOpenError
         try:
-            response = requests.get(url, params=params)
-            data = response.json()
-
-            # Log the full response for debugging
-            print(f"Full API Response: {data}")
+            results = self._search_results(query)
 
-            # Check for RelatedTopics and Results
-            if 'RelatedTopics' in data and data['RelatedTopics']:
-                results = []
-                for topic in data['RelatedTopics']:
-                    if isinstance(topic, dict) and 'Text' in topic:
-                        results.append(topic['Text'])
-
-                if results:
-                    # Save the first result to learning data
-                    self.update_knowledge(query, results[0])
-                    return results[0]  # Return the first result for simplicity
+            if results:
+                # Save the first result to learning data
+                self.update_knowledge(query, results[0])
+                return results[0]  # Return the first result for simplicity
 
             # Fallback if no results found
             return f"I couldn't find any information on '{query}'. Would you like to know a definition or general thought about love?"
 
+        except CircuitOpenError:
+            # DuckDuckGo keeps failing; answer from local knowledge instead of waiting on it
+            local_answer = self.local_answer(query)
+            return local_answer or f"I can't reach the search service right now and I don't know about '{query}' yet."
         except requests.RequestException as e:
             return f"Network error occurred: {str(e)}"
         except json.JSONDecodeError:
             return "Error decoding the response from the API."
 
+    def remote_answer(self, query):
+        """First DuckDuckGo result for a query (learned for next time), or None; errors propagate."""
+        results = self._search_results(query)
+        if not results:
+            return None
+        self.update_knowledge(query, results[0])
+        return results[0]
+
+    def _search_results(self, query):
+        """DuckDuckGo topic texts for a query, through the shared cache."""
+        url = "https://api.duckduckgo.com/"
+        params = {
+            'q': query,
+            'format': 'json',
+            'no_redirect': 1,
+            'no_html': 1,
+            'skip_disambig': 1,
+        }
+        # Repeated queries are served from the shared cache; concurrent ones share one request
+        return search_cache.get_or_fetch(cache_key('duckduckgo', query), lambda: self._duckduckgo_topics(url, params))
+
+    def _duckduckgo_topics(self, url, params):
+        """Fetch the RelatedTopics texts DuckDuckGo returns for a query."""
+        from http_client import http_client
+        with stage('remote_search'):
+            response = http_client.get(url, params=params)  # Pooled, timeout-bounded, retried
+            data = response.json()
+
+        results = []
+        for topic in data.get('RelatedTopics') or []:
+            if isinstance(topic, dict) and 'Text' in topic:
+                results.append(topic['Text'])
+        return results
+
     def reason_out_answer(self, user_input):
         """AI tries to reason out an answer based on context and learned data."""
 
@@ -375,44 +510,41 @@ class AIAssistant:
                     }
                     return f"I couldn't find any information for '{word_to_define}'. However, I know that: {fallback_knowledge.get(word_to_define.lower(), 'I don’t have any thoughts on that.')}"
 
-        # If AI doesn't know, offer to search the internet and update learning data
-        elif self.get_ai_response:
-            response = self.get_ai_response(user_input)
-            if response:
-                return f"My thought on '{user_input}' is: {response}"
-            else:
-                internet_results = self.search_internet(user_input)
-                if internet_results:
-                    return f"Here's what I found online for '{user_input}': {internet_results[0]}"
-                else:
-                    # Provide a general fallback response
-                    fallback_response = "I'm not sure about that. Would you like to ask something else or try rephrasing?"
-                    return f"I'm not sure about '{user_input}', and I couldn't find much online either. {fallback_response}"
-
+        # Otherwise resolve through the tiers (learned, dictionary, semantic, online) within the latency budget
+        answer, tier = self.resolver.resolve(user_input)
+        if answer is None:
+            # Provide a general fallback response
+            fallback_response = "I'm not sure about that. Would you like to ask something else or try rephrasing?"
+            return f"I'm not sure about '{user_input}', and I couldn't find much online either. {fallback_response}"
+        if tier == 'remote':
+            return f"Here's what I found online for '{user_input}': {answer}"
+        return f"My thought on '{user_input}' is: {answer}"
+
+    def local_answer(self, user_input):
+        """Answer from the learned data (closest question) without going online."""
+        entry = self.learning_data_manager.lookup(user_input, fuzzy=True)
+        if entry is not None and entry.get('answer'):
+            return random.choice(entry['answer'])
+        return self.semantic_answer(user_input)
+
+    def semantic_answer(self, user_input):
+        """Answer from the most similar learned question using the TF-IDF vector index."""
+        from vector_index import vector_path
+        vector_index = self.learning_data_manager.vector_index(path=vector_path(self.knowledge_base.learning_file))
+        if vector_index is None:
+            return None  # NumPy is not installed, or the index is still being built
+        matches = vector_index.search(user_input, top_k=1)
+        # Index entries may be question-only stubs (built from the snapshot); the answer comes from a lookup
+        return self._pick_answer(self.learning_data_manager.lookup(matches[0][1]['question'])) if matches else None
 
     def update_knowledge(self, question, answer):
-        """Update the learning data with new knowledge."""
-        self.learning_data_manager.add_entry(question, answer)
+        """Update the learning data with new knowledge (merged and indexed by the background job queue)."""
+        job_queue = get_job_queue()
+        job_queue.submit('learn', self.knowledge_base.learning_file, question, answer)
+        job_queue.submit('index', self.knowledge_base.learning_file)  # Appends the new row; no matrix rebuild
         return f"I've added new knowledge for: '{question}' with answer '{answer}'."
 
 
-# Example usage:
-ai_assistant = AIAssistant()
-
-# Ask for the meaning of a word
-response = ai_assistant.reason_out_answer("what does it mean by love?")
-print(response)
-
-# Ask for AI's thoughts or knowledge
-response = ai_assistant.reason_out_answer("What is the meaning of life?")
-print(response)
-
-# Add new knowledge
-ai_assistant.update_knowledge("What is Python?", "Python is a programming language.")
-
-# Example function for AI responses wn
-
-
 # Any other assistant functionalities can be defined here as needed
 
 if __name__ == '__main__':
@@ -0,0 +1,19 @@
+import os
+
+# Read once at import: os.umask can only be queried by setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def replace_keeping_mode(temp_path, path):
+    """Rename a finished temp file over path, with the permissions path had (or a new file would get).
+
+    tempfile.mkstemp creates files readable by their owner only; without this
+    every rewrite would lock other users and services out of the data.
+    """
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+    os.chmod(temp_path, mode)
+    os.replace(temp_path, path)
@@ -0,0 +1,93 @@
+"""Memory benchmark: dict entries (learning.json layout) vs compact pooled entries, plus their index.
+
+Usage (from the AI_Assistant directory):
+    python -m benchmarks.memory [--entries N] [--distinct-answers K]
+
+A synthetic corpus is generated in the learning.json format, with answers
+drawn from K distinct strings as in the real data, and loaded both ways.
+The compact data is also measured with its question index as the
+LearningDataManager holds it (exact lookups only) and after the first
+fuzzy search has built the trigram structures.
+Retained heap is measured with tracemalloc after the load has settled.
+"""
+import argparse
+import gc
+import json
+import random
+import tracemalloc
+
+from compact_store import CompactLearningData
+from knowledge_index import get_question_index
+
+
+def synthetic_learning_json(entries, distinct_answers, seed=0):
+    """Return learning.json text with `entries` questions sharing `distinct_answers` answers."""
+    rng = random.Random(seed)
+    answers = [f"Synthetic answer number {i}: " + "lorem ipsum " * rng.randint(2, 12) for i in range(distinct_answers)]
+    follow_ups = ["How about you?", "What would you like to talk about?", "Anything else?"]
+    return json.dumps({"entries": [
+        {
+            "question": f"What is synthetic question {i}?",
+            "answer": rng.sample(answers, rng.randint(1, 4)),
+            "follow_ups": rng.sample(follow_ups, rng.randint(0, 2)),
+            "feedback": None,
+        }
+        for i in range(entries)
+    ]})
+
+
+def compact_indexed(text):
+    data = CompactLearningData(json.loads(text))
+    get_question_index(data)
+    return data
+
+
+def compact_fuzzy(text):
+    data = compact_indexed(text)
+    get_question_index(data).search("what is synthetic question")
+    return data
+
+
+def retained_bytes(load, text):
+    """Bytes still allocated after load(text) returns and garbage is collected."""
+    gc.collect()
+    tracemalloc.start()
+    data = load(text)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=100_000)
+    parser.add_argument('--distinct-answers', type=int, default=2_000)
+    args = parser.parse_args()
+
+    text = synthetic_learning_json(args.entries, args.distinct_answers)
+    dict_current, dict_peak = retained_bytes(json.loads, text)
+    compact_current, compact_peak = retained_bytes(lambda t: CompactLearningData(json.loads(t)), text)
+    indexed_current, indexed_peak = retained_bytes(compact_indexed, text)
+    fuzzy_current, fuzzy_peak = retained_bytes(compact_fuzzy, text)
+    print(json.dumps({
+        "benchmark": "memory",
+        "entries": args.entries,
+        "distinct_answers": args.distinct_answers,
+        "dict_bytes": dict_current,
+        "compact_bytes": compact_current,
+        "compact_indexed_bytes": indexed_current,
+        "compact_fuzzy_bytes": fuzzy_current,
+        "bytes_per_entry": {"dict": round(dict_current / args.entries, 1),
+                            "compact": round(compact_current / args.entries, 1),
+                            "compact_indexed": round(indexed_current / args.entries, 1),
+                            "compact_fuzzy": round(fuzzy_current / args.entries, 1)},
+        "compact_ratio": round(compact_current / dict_current, 3),
+        "peak_bytes": {"dict": dict_peak, "compact": compact_peak, "compact_indexed": indexed_peak,
+                       "compact_fuzzy": fuzzy_peak},
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,353 @@
+"""Reproducible benchmark suite for lookups, learning writes, search and TTS.
+
+Usage (from the AI_Assistant directory):
+    python -m benchmarks.run [--sizes 1000,100000,1000000] [--output results.json]
+                             [--lookups 1000] [--concurrency 8] [--requests 400] [--seed 0]
+
+For every corpus size a fresh interpreter generates a synthetic
+learning.json in a temporary directory and measures load and index time,
+resident memory, lookup latency percentiles (exact, fuzzy and miss),
+in-memory insert, append-log and full-save throughput. For the smallest size
+(see --http-sizes) the Flask app is also served on a local port and /ask and
+/speak are driven by concurrent clients. Network search and gTTS are
+replaced by local stub HTTP servers with a fixed latency, so results depend
+only on this code and the machine.
+
+Results are printed (and written to --output) as JSON, together with the git
+commit, Python version and parameters, so runs can be compared over time.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlsplit
+from urllib.request import Request, urlopen
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = '1000,100000,1000000'
+LOOKUPS = 1000  # Lookups timed per kind
+INSERTS = 10_000  # New Q/A pairs merged in memory
+LOG_BATCH = 100  # Records per append-log write
+
+
+def percentiles(samples):
+    """p50/p90/p99/max of latencies in seconds, reported in milliseconds."""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def at(fraction):
+        return round(ordered[min(int(fraction * len(ordered)), len(ordered) - 1)] * 1000, 4)
+
+    return {"p50_ms": at(0.5), "p90_ms": at(0.9), "p99_ms": at(0.99), "max_ms": round(ordered[-1] * 1000, 4),
+            "mean_ms": round(statistics.fmean(ordered) * 1000, 4)}
+
+
+def rss_mb():
+    """Current resident memory in MB (Linux), falling back to the peak where /proc is unavailable."""
+    try:
+        with open('/proc/self/statm') as file:
+            return round(int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20, 1)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+SYLLABLES = ('ka', 'lo', 'mi', 'ren', 'to', 'sa', 'vel', 'dor', 'pi', 'nu', 'gar', 'ell', 'qua', 'zin', 'bo', 'ter')
+VOCABULARY = sorted({a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES})
+OPENERS = ('what is', 'how do i', 'why does', 'where can i find', 'who made', 'when did')
+
+
+def question(i):
+    """Deterministic question number i: varied words, like real questions, not one repeated template."""
+    rng = random.Random(i)
+    return f"{rng.choice(OPENERS)} {' '.join(rng.choices(VOCABULARY, k=rng.randint(3, 6)))} {i}?"
+
+
+def write_corpus(path, entries, seed):
+    """Stream a learning.json with `entries` questions whose answers come from a shared pool."""
+    rng = random.Random(seed)
+    answers = [f"Synthetic answer {i}: " + "lorem ipsum " * rng.randint(2, 12) for i in range(max(entries // 50, 20))]
+    with open(path, 'w') as file:
+        file.write('{"version": 2, "entries": [\n')
+        for i in range(entries):
+            entry = {"question": question(i), "answer": rng.sample(answers, rng.randint(1, 3)),
+                     "follow_ups": [], "feedback": None}
+            file.write((',\n' if i else '') + json.dumps(entry))
+        file.write('\n]}\n')
+
+
+def typo(text, rng):
+    """Swap two adjacent letters inside the text."""
+    position = rng.randrange(1, len(text) - 2)
+    return text[:position] + text[position + 1] + text[position] + text[position + 2:]
+
+
+def timed(function, arguments):
+    latencies = []
+    for argument in arguments:
+        started = time.perf_counter()
+        function(argument)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def bench_store(path, size, seed, lookups=LOOKUPS):
+    """Load, index, lookup, insert and save measurements for one corpus."""
+    from learning_store import LearningStore
+    from knowledge_index import get_question_index
+    from utils import get_ai_response, append_learning_data, save_learning_data
+
+    rng = random.Random(seed)
+    result = {"rss_mb_before_load": rss_mb()}
+    started = time.perf_counter()
+    data = LearningStore(path).load(compact=True)
+    result["load_seconds"] = round(time.perf_counter() - started, 4)
+    started = time.perf_counter()
+    get_question_index(data)
+    result["index_seconds"] = round(time.perf_counter() - started, 4)
+    result["rss_mb_after_load"] = rss_mb()
+
+    picks = [rng.randrange(size) for _ in range(lookups)]
+    result["lookup"] = {
+        "exact": percentiles(timed(lambda q: get_ai_response(q, data, fuzzy=False), [question(i) for i in picks])),
+        "fuzzy": percentiles(timed(lambda q: get_ai_response(q, data, fuzzy=True), [typo(question(i), rng) for i in picks])),
+        "miss": percentiles(timed(lambda q: get_ai_response(q, data, fuzzy=True),
+                                  [f"xylophone quartz {i} jukebox" for i in range(lookups)])),
+    }
+
+    inserts = min(INSERTS, size)
+    pairs = [(f"New benchmark question {i}?", f"New benchmark answer {i}.") for i in range(inserts)]
+    started = time.perf_counter()
+    for new_question, new_answer in pairs:
+        append_learning_data(new_question, new_answer, data)
+    elapsed = time.perf_counter() - started
+    result["insert_per_second"] = round(inserts / elapsed, 1)
+
+    store = LearningStore(path)
+    started = time.perf_counter()
+    for offset in range(0, inserts, LOG_BATCH):
+        store.append_many(pairs[offset:offset + LOG_BATCH])
+    elapsed = time.perf_counter() - started
+    result["log_append_per_second"] = round(inserts / elapsed, 1)
+
+    started = time.perf_counter()
+    save_learning_data(data, path)
+    elapsed = time.perf_counter() - started
+    result["save_seconds"] = round(elapsed, 4)
+    result["save_mb_per_second"] = round(os.path.getsize(path) / 2 ** 20 / elapsed, 2)
+    result["rss_mb_peak"] = rss_mb()
+    return result
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Stand-in for the search API and the TTS service: fixed latency, canned bodies."""
+
+    latency = 0.0
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        if parts.path == '/search':
+            body = json.dumps({"items": [{"snippet": f"Stub snippet about {query.get('q', [''])[0]}."}]}).encode()
+            content_type = 'application/json'
+        else:
+            body = b'ID3' + (query.get('text', [''])[0].encode() * 8)[:4096]  # Not real MP3, same size class
+            content_type = 'audio/mpeg'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def stub_server(latency):
+    handler = type('StubHandler', (_StubHandler,), {'latency': latency})
+    return ThreadingHTTPServer(('127.0.0.1', 0), handler)
+
+
+def post_json(url, payload):
+    request = Request(url, data=json.dumps(payload).encode(), headers={'Content-Type': 'application/json'})
+    with urlopen(request, timeout=30) as response:
+        return response.status, response.read()
+
+
+def drive(url, payloads, concurrency):
+    """POST every payload with `concurrency` clients; returns throughput, latencies and errors."""
+    latencies, errors = [], 0
+    lock = threading.Lock()
+
+    def send(payload):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            status, _ = post_json(url, payload)
+            failed = status != 200
+        except OSError:
+            failed = True
+        with lock:
+            latencies.append(time.perf_counter() - started)
+            errors += failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(send, payloads))
+    elapsed = time.perf_counter() - started
+    return dict(percentiles(latencies), requests=len(payloads), errors=errors,
+                requests_per_second=round(len(payloads) / elapsed, 1))
+
+
+def bench_http(size, requests, concurrency, search_latency, tts_latency, seed):
+    """End-to-end /ask and /speak throughput against the Flask app, with stub upstreams."""
+    from werkzeug.serving import make_server
+
+    stubs = stub_server(search_latency), stub_server(tts_latency)
+    search_url, tts_url = start_server(stubs[0]), start_server(stubs[1])
+
+    import utils
+    import tts_cache
+    utils.google_search_url = lambda query: f"{search_url}/search?q={quote(query)}"  # Stub upstream instead of Google
+
+    def stub_synthesize(text, lang, voice, path):
+        with urlopen(f"{tts_url}/tts?text={quote(text[:200])}", timeout=30) as response:
+            with open(path, 'wb') as file:
+                file.write(response.read())
+
+    tts_cache._tts_cache = tts_cache.TTSCache(synthesize=stub_synthesize)  # Stub TTS instead of gTTS
+
+    started = time.perf_counter()
+    import app
+    import_seconds = time.perf_counter() - started
+    server = make_server('127.0.0.1', 0, app.app, threaded=True)
+    base = start_server(server)
+
+    rng = random.Random(seed)
+    ask = [{"input": question(rng.randrange(size))} for _ in range(requests)]
+    # A third are quoted searches over a small pool, so the search cache sees both misses and hits
+    for i in range(0, requests, 3):
+        ask[i] = {"input": f'"stub topic {rng.randrange(50)}"'}
+    speak = [{"input": question(rng.randrange(min(size, 100)))} for _ in range(requests)]
+    try:
+        return {
+            "app_import_seconds": round(import_seconds, 4),
+            "concurrency": concurrency,
+            "ask": drive(f"{base}/ask", ask, concurrency),
+            "speak": drive(f"{base}/speak", speak, concurrency),
+            "search_cache": app.search_cache.stats(),
+            "tts_cache": tts_cache.get_tts_cache().stats(),
+        }
+    finally:
+        server.shutdown()
+        for stub in stubs:
+            stub.shutdown()
+
+
+def run_child(args):
+    """Measure one corpus size in this (fresh) interpreter and print the result as JSON."""
+    workdir = tempfile.mkdtemp(prefix='assistant-bench-')
+    os.chdir(workdir)  # app.py and the caches use paths relative to the working directory
+    path = os.path.join(workdir, 'learning.json')
+    started = time.perf_counter()
+    write_corpus(path, args.child, args.seed)
+    result = {"entries": args.child, "generate_seconds": round(time.perf_counter() - started, 2),
+              "corpus_mb": round(os.path.getsize(path) / 2 ** 20, 2)}
+    result.update(bench_store(path, args.child, args.seed, args.lookups))
+    if args.child in args.http_sizes:
+        write_corpus(path, args.child, args.seed)  # Serve the pristine corpus, not the benchmark's inserts
+        os.remove(path + '.log') if os.path.exists(path + '.log') else None
+        result["http"] = bench_http(args.child, args.requests, args.concurrency, args.search_latency,
+                                    args.tts_latency, args.seed)
+    print(json.dumps(result))
+    sys.stdout.flush()
+    shutil.rmtree(workdir, ignore_errors=True)
+    os._exit(0)  # Skip atexit flushes into the throwaway directory and lingering server threads
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_sizes(text):
+    return [int(size) for size in text.split(',') if size.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=parse_sizes, default=parse_sizes(DEFAULT_SIZES))
+    parser.add_argument('--http-sizes', type=parse_sizes, default=None,
+                        help="Sizes that also get the /ask and /speak load test (default: the smallest)")
+    parser.add_argument('--lookups', type=int, default=LOOKUPS, help="Lookups timed per kind (exact, fuzzy, miss)")
+    parser.add_argument('--requests', type=int, default=400, help="Requests per endpoint")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--search-latency', type=float, default=0.05, help="Stub search latency (seconds)")
+    parser.add_argument('--tts-latency', type=float, default=0.1, help="Stub TTS latency (seconds)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Also write the results to this JSON file")
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.http_sizes is None:
+        args.http_sizes = [min(args.sizes)]
+    if args.child is not None:
+        run_child(args)
+
+    results = []
+    for size in args.sizes:
+        command = [sys.executable, '-m', 'benchmarks.run', '--child', str(size), '--seed', str(args.seed),
+                   '--http-sizes', ','.join(map(str, args.http_sizes)), '--lookups', str(args.lookups),
+                   '--requests', str(args.requests),
+                   '--concurrency', str(args.concurrency), '--search-latency', str(args.search_latency),
+                   '--tts-latency', str(args.tts_latency)]
+        completed = subprocess.run(command, cwd=ROOT, capture_output=True, text=True,
+                                   env=dict(os.environ, PYTHONPATH=os.pathsep.join(
+                                       filter(None, [ROOT, os.environ.get('PYTHONPATH')]))))
+        if completed.returncode != 0:
+            results.append({"entries": size, "error": completed.stderr.strip().splitlines()[-1:]})
+            continue
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    report = {
+        "benchmark": "suite",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "parameters": {key: value for key, value in vars(args).items() if key not in ('child', 'output')},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
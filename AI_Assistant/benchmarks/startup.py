@@ -0,0 +1,61 @@
+"""Cold-start benchmark guarding against slow or side-effectful module imports.
+
+Usage (from the AI_Assistant directory):
+    python -m benchmarks.startup [--repeat N] [--budget SECONDS]
+
+Each module is imported in a fresh interpreter. The run fails (exit code 1)
+when the median import time exceeds the budget or when a heavy optional
+dependency gets imported eagerly.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must import without touching the network, the audio stack or NumPy
+MODULES = ['assistant', 'utils', 'dataManagement', 'knowledge_index']
+HEAVY_MODULES = ['textblob', 'gtts', 'requests', 'numpy', 'speech_recognition', 'pyaudio', 'adaptive_ai',
+                 'communication']
+IMPORT_BUDGET = 0.5  # Seconds, median per module including interpreter start
+
+_PROBE = ("import json, sys; import {module}; "
+          "print(json.dumps(sorted(set({heavy!r}) & set(sys.modules))))")
+
+
+def measure(module, repeat):
+    """Import a module in fresh interpreters; return (median seconds, heavy modules it pulled in)."""
+    timings, heavy = [], []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                                cwd=ROOT, capture_output=True, text=True)
+        timings.append(time.perf_counter() - started)
+        if result.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+        heavy = json.loads(result.stdout.strip().splitlines()[-1])
+    return statistics.median(timings), heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=IMPORT_BUDGET)
+    args = parser.parse_args()
+
+    results, failed = {}, False
+    for module in MODULES:
+        seconds, heavy = measure(module, args.repeat)
+        ok = seconds <= args.budget and not heavy
+        failed = failed or not ok
+        results[module] = {"median_seconds": round(seconds, 4), "heavy_imports": heavy, "ok": ok}
+    print(json.dumps({"benchmark": "startup", "budget_seconds": args.budget, "results": results}, indent=2))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
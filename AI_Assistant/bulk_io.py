@@ -0,0 +1,286 @@
+"""Bulk import and export of learning data.
+
+Usage (from the AI_Assistant directory):
+    python bulk_io.py import dump.jsonl [--file learning.json] [--batch 10000]
+    python bulk_io.py export dump.csv [--file learning.json]
+
+Formats are picked from the extension (or --format): JSON Lines
+(.jsonl/.ndjson), CSV with question,answer columns (.csv) and JSON, either an
+array of {"question", "answer"} objects or a learning.json-style
+{"entries": [...]} file. Input is parsed incrementally, so memory stays
+bounded by the knowledge base itself rather than the size of the dump.
+
+Rows are merged like add_entry does (same question normalization as lookups,
+duplicate answers dropped), logged to the append log one batch per write,
+and folded into learning.json with a single compaction at the end. Stop the
+server first: a running LearningDataManager does not see the import.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from learning_store import LearningStore, merge_entry
+from snapshot import compile_snapshot
+
+BATCH_SIZE = 10_000  # Rows per append-log write (one fsync each)
+READ_SIZE = 64 * 1024
+FORMATS = ('jsonl', 'csv', 'json')
+_NUMBER_CHARS = frozenset('0123456789.eE+-')  # Characters that can continue a JSON number
+
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    if extension == '.csv':
+        return 'csv'
+    return 'json'
+
+
+def iter_jsonl(file):
+    """Yield one object per non-blank line; None for a malformed one, so it is counted as skipped."""
+    for number, line in enumerate(file, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            print(f"Skipping malformed line {number}.")
+            yield None
+
+
+def iter_csv(file):
+    """Yield a dict per CSV row, keyed by the header (question, answer)."""
+    yield from csv.DictReader(file)
+
+
+def iter_json_array(file, read_size=READ_SIZE):
+    """Yield the items of a JSON array (or of the "entries" array of a learning.json) one at a time.
+
+    Only the item being decoded and one read buffer are held in memory,
+    instead of the whole document json.load would build. Other keys of a
+    learning.json are stepped over without being decoded.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position = '', 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, position, eof
+        chunk = file.read(read_size)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+    def peek():
+        """The next non-whitespace character, reading more as needed; '' at the end of the input."""
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n':
+                position += 1
+            if position < len(buffer) or eof:
+                return buffer[position:position + 1]
+            fill()
+
+    def decode():
+        """Decode the complete value at position."""
+        nonlocal position
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()  # Value continues past the buffer
+                continue
+            # A number cut by the read ("1." of "1.5e3") decodes as a shorter one: decode it again with more input
+            if not eof and (end == len(buffer) or (isinstance(value, (int, float)) and buffer[end] in _NUMBER_CHARS)):
+                fill()
+                continue
+            position = end
+            return value
+
+    def skip_value():
+        """Move past the value at position without building it, minding brackets inside strings."""
+        nonlocal position
+        depth, in_string, escaped = 0, False, False
+        while True:
+            if position == len(buffer):
+                if eof:
+                    raise json.JSONDecodeError("Unterminated value", buffer, position)
+                fill()
+                continue
+            char = buffer[position]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == '\\':
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+                    if not depth:
+                        position += 1
+                        return
+            elif char == '"':
+                in_string = True
+            elif not depth and char in ',}':
+                return  # End of a number or literal
+            elif char in '[{':
+                depth += 1
+            elif char in ']}':
+                depth -= 1
+                if not depth:
+                    position += 1
+                    return
+            position += 1
+
+    fill()
+    # The array is the document itself, or the "entries" value of a top-level object
+    first = peek()
+    if first == '{':
+        position += 1
+        while True:
+            if peek() != '"':
+                return  # End of the object: no entries
+            key = decode()
+            if peek() != ':':
+                raise json.JSONDecodeError("Expecting ':' delimiter", buffer, position)
+            position += 1
+            if key == 'entries' and peek() == '[':
+                break
+            skip_value()
+            if peek() == ',':
+                position += 1
+    elif first != '[':
+        return
+    position += 1
+
+    while True:
+        char = peek()
+        if char == ',':
+            position += 1
+        elif char in (']', ''):
+            return
+        else:
+            yield decode()
+
+
+READERS = {'jsonl': iter_jsonl, 'csv': iter_csv, 'json': iter_json_array}
+
+
+def row_pair(row):
+    """Return (question, answers) for an input row, or None if it has no usable Q/A."""
+    if not isinstance(row, dict):
+        return None
+    question = row.get('question')
+    answer = row.get('answer')
+    if not isinstance(question, str) or not question.strip():
+        return None
+    answers = answer if isinstance(answer, list) else [answer]
+    answers = [item for item in answers if isinstance(item, str) and item.strip()]
+    return (question.strip(), answers) if answers else None
+
+
+def peak_memory_mb():
+    """Peak resident memory of this process in MB, or None where the platform can't tell."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024  # Bytes on macOS, KB elsewhere
+
+
+def import_rows(rows, filename='learning.json', batch_size=BATCH_SIZE):
+    """Merge an iterable of rows into a learning file; returns (imported, skipped)."""
+    store = LearningStore(filename)
+    data = store.load(compact=True)
+    imported = skipped = 0
+    batch = []
+    for row in rows:
+        pair = row_pair(row)
+        if pair is None:
+            skipped += 1
+            continue
+        merge_entry(data, *pair)
+        batch.append(pair)
+        if len(batch) >= batch_size:
+            store.append_many(batch)  # Durable per batch: an interrupted import replays from the log
+            imported += len(batch)
+            batch = []
+    store.append_many(batch)
+    imported += len(batch)
+    store.compact(data)  # One full rewrite for the whole import
+    snapshot_path = os.path.splitext(filename)[0] + '.snapshot'
+    if os.path.exists(snapshot_path):
+        compile_snapshot(data, snapshot_path)
+    return imported, skipped
+
+
+def export_rows(data, file, fmt):
+    """Stream entries to file; returns the number of rows written."""
+    written = 0
+    if fmt == 'csv':
+        writer = csv.writer(file)
+        writer.writerow(['question', 'answer'])
+        for entry in data.get('entries', []):
+            for answer in entry.get('answer') or []:  # One row per answer, as import expects
+                writer.writerow([entry.get('question', ''), answer])
+                written += 1
+        return written
+
+    if fmt == 'json':
+        file.write('[\n')
+    for entry in data.get('entries', []):
+        record = json.dumps({
+            "question": entry.get('question', ''),
+            "answer": list(entry.get('answer') or []),
+            "follow_ups": list(entry.get('follow_ups') or []),
+            "feedback": entry.get('feedback'),
+        })
+        if fmt == 'json':
+            file.write((',\n' if written else '') + record)
+        else:
+            file.write(record + '\n')
+        written += 1
+    if fmt == 'json':
+        file.write('\n]\n')
+    return written
+
+
+def report(action, rows, skipped, started):
+    elapsed = time.perf_counter() - started
+    rate = rows / elapsed if elapsed else float(rows)
+    peak = peak_memory_mb()
+    peak_text = f"{peak:.1f} MB" if peak is not None else "unknown"
+    print(f"{action} {rows} rows ({skipped} skipped) in {elapsed:.2f}s: "
+          f"{rate:,.0f} rows/sec, peak memory {peak_text}.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('action', choices=('import', 'export'))
+    parser.add_argument('path', help="Dump to read (import) or write (export)")
+    parser.add_argument('--file', default='learning.json', help="Learning data file")
+    parser.add_argument('--format', choices=FORMATS, help="Defaults to the path's extension")
+    parser.add_argument('--batch', type=int, default=BATCH_SIZE, help="Rows per append-log write")
+    args = parser.parse_args(argv)
+    fmt = args.format or detect_format(args.path)
+
+    started = time.perf_counter()
+    if args.action == 'import':
+        with open(args.path, 'r', newline='', encoding='utf-8') as file:
+            imported, skipped = import_rows(READERS[fmt](file), args.file, args.batch)
+        report("Imported", imported, skipped, started)
+    else:
+        data = LearningStore(args.file).load(compact=True)
+        with open(args.path, 'w', newline='', encoding='utf-8') as file:
+            written = export_rows(data, file, fmt)
+        report("Exported", written, 0, started)
+
+
+if __name__ == '__main__':
+    main()
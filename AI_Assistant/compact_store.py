@@ -0,0 +1,117 @@
+from collections.abc import Mapping
+
+_FIELDS = ('question', 'answer', 'follow_ups', 'feedback')
+
+
+def _as_list(value):
+    """List fields may be stored as a single string (or None); never iterate a str character by character."""
+    if isinstance(value, (list, tuple)):
+        return value
+    return [value] if value else []
+
+
+class StringPool:
+    """Deduplicated strings referenced by integer id.
+
+    Learned answers repeat a lot ("Hello!" and "hi" share the same four
+    replies), so each distinct string is stored once and entries keep tuples
+    of small ints instead of their own list of str objects.
+    """
+
+    __slots__ = ('_strings', '_ids')
+
+    def __init__(self):
+        self._strings = []
+        self._ids = {}
+
+    def __len__(self):
+        return len(self._strings)
+
+    def intern(self, text):
+        """Return the id for text, adding it to the pool on first sight."""
+        string_id = self._ids.get(text)
+        if string_id is None:
+            string_id = self._ids[text] = len(self._strings)
+            self._strings.append(text)
+        return string_id
+
+    def intern_all(self, texts):
+        return tuple(self.intern(text) for text in texts if isinstance(text, str))
+
+    def lookup(self, ids):
+        strings = self._strings
+        return [strings[i] for i in ids]
+
+
+class CompactEntry(Mapping):
+    """A learning entry stored as a __slots__ record with pooled answers and follow-ups.
+
+    It reads like the dict entries in learning.json (entry['answer'],
+    entry.get('follow_ups', []), dict(entry)), but list fields are rebuilt on
+    each access: to change them assign a new list, e.g.
+    entry['answer'] = entry['answer'] + [new_answer].
+    """
+
+    __slots__ = ('question', '_answer_ids', '_follow_up_ids', 'feedback', '_pool')
+
+    def __init__(self, pool, question, answer=(), follow_ups=(), feedback=None):
+        self._pool = pool
+        self.question = question
+        self._answer_ids = pool.intern_all(_as_list(answer))
+        self._follow_up_ids = pool.intern_all(_as_list(follow_ups))
+        self.feedback = feedback
+
+    @classmethod
+    def from_dict(cls, pool, entry):
+        return cls(pool, entry.get('question', ''), entry.get('answer') or (), entry.get('follow_ups') or (),
+                   entry.get('feedback'))
+
+    def __getitem__(self, key):
+        if key == 'question':
+            return self.question
+        if key == 'answer':
+            return self._pool.lookup(self._answer_ids)
+        if key == 'follow_ups':
+            return self._pool.lookup(self._follow_up_ids)
+        if key == 'feedback':
+            return self.feedback
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == 'question':
+            self.question = value
+        elif key == 'answer':
+            self._answer_ids = self._pool.intern_all(_as_list(value))
+        elif key == 'follow_ups':
+            self._follow_up_ids = self._pool.intern_all(_as_list(value))
+        elif key == 'feedback':
+            self.feedback = value
+        else:
+            raise KeyError(f"Compact entries only store {', '.join(_FIELDS)}")
+
+    def __iter__(self):
+        return iter(_FIELDS)
+
+    def __len__(self):
+        return len(_FIELDS)
+
+    def __repr__(self):
+        return f"CompactEntry({dict(self)!r})"
+
+
+class CompactLearningData(dict):
+    """Learning data whose entries are CompactEntry records sharing one string pool."""
+
+    def __init__(self, data=None):
+        super().__init__()
+        self.pool = StringPool()
+        data = data or {}
+        for key, value in data.items():
+            if key != 'entries':
+                self[key] = value
+        self['entries'] = [CompactEntry.from_dict(self.pool, entry) for entry in data.get('entries', [])
+                           if isinstance(entry, Mapping)]
+
+    def new_entry(self, question):
+        """Create an empty entry that shares this data's string pool."""
+        return CompactEntry(self.pool, question)
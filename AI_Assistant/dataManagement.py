@@ -0,0 +1,412 @@
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from compact_store import CompactLearningData
+from knowledge_index import QuestionIndex, get_question_index, normalize_question
+from learning_store import LearningStore, merge_entry
+from snapshot import SnapshotReader, compile_snapshot, open_snapshot
+from metrics import count, stage
+
+FLUSH_EVERY = 50  # Queued writes that trigger an early flush
+FLUSH_INTERVAL = 2.0  # Seconds between background flushes
+RELOAD_CHECK_INTERVAL = 0.5  # Seconds between checks for a newly published snapshot
+DATA_REFRESH_INTERVAL = 10.0  # Minimum seconds between rebuilds of a read-only copy for fuzzy matching
+
+
+class ReadWriteLock:
+    """Many concurrent readers or one writer; waiting writers hold off new readers."""
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._condition:
+            while self._writer or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._condition:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._condition.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer = False
+                self._condition.notify_all()
+
+
+class LearningDataManager:
+    """Thread-safe owner of the learning data.
+
+    Lookups take a shared read lock. add_entry updates memory and the index
+    under a short write lock and queues the record; a background thread
+    batches queued records into the append log and compacts the snapshot,
+    doing all disk I/O outside the data lock so lookups never wait on it.
+
+    When an up-to-date compiled snapshot (see snapshot.py) sits next to the
+    learning file, the JSON is not parsed at startup, and exact lookups keep
+    being answered from the memory-mapped snapshot for every question not
+    written since, even once the full data is loaded. A fuzzy miss loads the
+    JSON in the background instead of on the caller's thread; a write or a
+    caller reading self.data loads it right away. The semantic vector index
+    is built from the snapshot's question list too (see vector_index).
+    """
+
+    def __init__(self, filename='learning.json', flush_every=FLUSH_EVERY, flush_interval=FLUSH_INTERVAL, compact=True,
+                 snapshot_path=None):
+        self.filename = filename
+        self.store = LearningStore(filename)
+        self.compact = compact
+        self.snapshot_path = snapshot_path or os.path.splitext(filename)[0] + '.snapshot'
+        self.snapshot = open_snapshot(filename, self.snapshot_path)  # None: no fresh snapshot, use the JSON
+        self.generation = self.snapshot.generation if self.snapshot is not None else 0
+        self._data = None
+        self._load_lock = threading.Lock()
+        self._loader = None  # Background thread parsing the JSON for fuzzy matching
+        self._loader_lock = threading.Lock()
+        self._changed = set()  # Normalized questions written since the snapshot, so it no longer answers them
+        self._stub_vectors = None  # VectorIndex over {"question": ...} stubs, when built from the snapshot
+        self._vector_lock = threading.Lock()
+        if self.snapshot is None:
+            self._load()
+        self.lock = ReadWriteLock()
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._queue = []
+        self._queue_lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # Only one flush/compaction touches the files at a time
+        self._publish_lock = threading.Lock()  # Snapshot versions are compiled and renamed in order
+        self._wake = threading.Event()
+        self._closed = False
+        self._flusher = threading.Thread(target=self._run_flusher, name='learning-flusher', daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    @property
+    def data(self):
+        """The learning data dict, parsed from JSON plus the append log on first use."""
+        if self._data is None:
+            self._load()
+        return self._data
+
+    def _load(self):
+        with self._load_lock:
+            if self._data is None:
+                data = self.store.load(compact=self.compact)  # Compact: pooled answers behind a dict-style API
+                get_question_index(data)  # Build the index before any reader can race to do it
+                self._data = data
+
+    def _load_in_background(self):
+        with self._loader_lock:
+            if self._loader is None:
+                self._loader = threading.Thread(target=self._background_load, name='learning-loader', daemon=True)
+                self._loader.start()
+
+    def _background_load(self):
+        try:
+            self._load()
+        except (OSError, ValueError) as e:
+            print(f"Error loading learning data: {e}")
+            self._loader = None  # Try again on the next fuzzy miss
+
+    def _snapshot_current(self, question):
+        """True if the snapshot's answer for question is still the current one."""
+        return self.snapshot is not None and normalize_question(question) not in self._changed
+
+    def lookup_snapshot(self, question):
+        """Exact lookup served from the mmap snapshot, or None if it is missing or out of date for question."""
+        if not self._snapshot_current(question):
+            return None
+        with stage('local_lookup'):
+            return self.snapshot.lookup(question)
+
+    def reading(self):
+        """Context manager holding the shared read lock, for callers that walk self.data."""
+        return self.lock.read()
+
+    def lookup(self, question, fuzzy=False):
+        """Return the stored entry for a question (closest match when fuzzy), or None.
+
+        Until the JSON has been loaded in the background, fuzzy lookups only
+        find exact matches.
+        """
+        with stage('local_lookup'):
+            if self._snapshot_current(question):
+                entry = self.snapshot.lookup(question)  # Straight from the mmap, no read lock
+                if entry is not None or not fuzzy:
+                    return entry
+                if self._data is None:
+                    self._load_in_background()
+                    return None
+            with self.lock.read():
+                index = get_question_index(self.data)
+                return index.best_match(question) if fuzzy else index.lookup(question)
+
+    def vector_index(self, path=None):
+        """Semantic VectorIndex over the stored questions, or None without NumPy.
+
+        Its entries may be question-only stubs, so answer a match with
+        lookup(match['question']). While the snapshot is serving, the stubs
+        come from its question list (plus questions learned since), so the
+        JSON is never parsed for semantic matching.
+        """
+        from vector_index import VectorIndex, get_vector_index, np  # Pulls in NumPy, so only when needed
+        if np is None:
+            return None
+        if self._stub_vectors is None and (self._data is not None or self.snapshot is None):
+            return get_vector_index(self.data, path=path)
+        with self._vector_lock:
+            if self._stub_vectors is None:
+                self._stub_vectors = VectorIndex([{"question": q} for q in self.snapshot.questions()], path=path)
+                if path and self._stub_vectors._tail_rows:
+                    self._stub_vectors.save()
+        return self._stub_vectors
+
+    def add_entry(self, question, answer):
+        """Add a Q/A pair in memory right away and queue it for the next disk flush."""
+        with stage('learning_write'), self.lock.write():
+            merge_entry(self.data, question, answer)
+            key = normalize_question(question)
+            if self._stub_vectors is not None and key not in self._changed:
+                self._stub_vectors.entries.append({"question": question})  # Indexed on its next sync
+            self._changed.add(key)
+        with self._queue_lock:
+            self._queue.append((question, answer))
+            queued = len(self._queue)
+        if queued >= self.flush_every:
+            self._wake.set()
+
+    def _run_flusher(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"Error flushing learning data: {e}")  # Records stay queued for the next attempt
+
+    def flush(self):
+        """Write queued records to the append log, compacting the snapshot when due."""
+        with self._flush_lock, stage('learning_flush'):
+            with self._queue_lock:
+                batch, self._queue = self._queue, []
+            try:
+                self.store.append_many(batch)
+            except OSError:
+                with self._queue_lock:
+                    self._queue[:0] = batch
+                raise
+            if self.store.needs_compaction():
+                self._compact()
+
+    def _copy(self):
+        # Only the list and its length are taken under the read lock, so a waiting write (and the
+        # lookups queued behind it) never waits on the O(N) copy. Writers only append entries and
+        # assign new answer lists, so the first `length` entries stay safe to copy without it.
+        with self.lock.read():
+            snapshot = {key: value for key, value in self.data.items() if key != 'entries'}
+            entries = self.data.get('entries', [])
+            length = len(entries)
+        snapshot['entries'] = [dict(entry, answer=list(entry.get('answer', []))) for entry in entries[:length]]
+        return snapshot
+
+    def _compact(self):
+        with self._publish_lock:
+            snapshot = self._copy()
+            # Records queued after the copy land in the fresh log with the next flush
+            self.store.compact(snapshot)
+            if os.path.exists(self.snapshot_path):
+                self._publish(snapshot)  # Keep an opted-in binary snapshot current
+
+    def publish_snapshot(self):
+        """Compile the current data into a new snapshot version; returns its generation."""
+        with self._publish_lock:
+            self._publish(self._copy())
+            return self.generation
+
+    def _publish(self, snapshot):
+        self.generation += 1
+        compile_snapshot(snapshot, self.snapshot_path, self.generation)
+
+    def close(self):
+        """Stop the flusher and write out anything still queued."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._flusher.join(timeout=self.flush_interval + 1)
+        self.flush()
+
+
+class SharedSnapshotData:
+    """Read-only learning data served from snapshots published by another process.
+
+    Used by the worker processes of serving.py: every worker maps the same
+    versioned snapshot file, so they all answer from one copy that the OS
+    shares, and none of them writes the learning files. add_entry hands the
+    pair to submit (which sends it to the single writer process); the writer
+    publishes a new snapshot version, and each worker switches to it on its
+    next lookup once RELOAD_CHECK_INTERVAL has passed, without restarting.
+
+    Exact lookups always use the newest snapshot. Fuzzy matching uses a
+    trigram index over the snapshot's questions only (answers stay in the
+    shared mapping), built in the background on the first fuzzy miss and
+    rebuilt at most once per DATA_REFRESH_INTERVAL after a new version; until
+    it exists, fuzzy lookups only find exact matches. self.data, a full
+    private copy, is only built for callers that walk every entry.
+    """
+
+    def __init__(self, snapshot_path, submit, check_interval=RELOAD_CHECK_INTERVAL,
+                 refresh_interval=DATA_REFRESH_INTERVAL):
+        self.snapshot_path = snapshot_path
+        self.submit = submit
+        self.check_interval = check_interval
+        self.refresh_interval = refresh_interval
+        self._reader = None
+        self._stamp = None
+        self._checked = 0.0
+        self._data = None
+        self._data_stamp = None
+        self._refreshed = 0.0
+        self._index = None  # (snapshot stamp, QuestionIndex over question-only entries, built at)
+        self._vectors = None  # (snapshot stamp, VectorIndex over question-only entries, built at)
+        self._indexers = {}  # Attribute name -> thread building it
+        self._lock = threading.Lock()
+
+    @property
+    def snapshot(self):
+        """Reader for the newest published snapshot, re-checked at most every check_interval."""
+        now = time.monotonic()
+        if self._reader is None or now - self._checked >= self.check_interval:
+            with self._lock:
+                if self._reader is None or now - self._checked >= self.check_interval:
+                    self._checked = now
+                    self._reload()
+        return self._reader
+
+    def _reload(self):
+        stat = os.stat(self.snapshot_path)
+        stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)  # Each publish renames a new file into place
+        if stamp != self._stamp:
+            # Lookups in flight keep the old mapping alive; it is unmapped once they drop it
+            self._reader = SnapshotReader(self.snapshot_path)
+            self._stamp = stamp
+            count('snapshot_reload')
+
+    @property
+    def generation(self):
+        return self.snapshot.generation
+
+    @property
+    def data(self):
+        """Entries of the current snapshot as compact learning data (rebuilt, never mutated)."""
+        reader = self.snapshot
+        if self._data is None or (self._data_stamp != self._stamp and
+                                  time.monotonic() - self._refreshed >= self.refresh_interval):
+            with self._lock:
+                if self._data is None or self._data_stamp != self._stamp:
+                    # Replacing the copy drops the indexes built for the previous one
+                    self._data, self._data_stamp = CompactLearningData({"entries": list(reader)}), self._stamp
+                    self._refreshed = time.monotonic()
+        return self._data
+
+    def _question_index(self):
+        """Fuzzy index over the current questions, or None until the first one is built."""
+        return self._snapshot_index('_index', lambda stubs: QuestionIndex(stubs))
+
+    def vector_index(self, path=None):
+        """Semantic index over the current questions (stubs: answer with lookup), or None until built."""
+        from vector_index import VectorIndex, np  # Pulls in NumPy, so only when needed
+        if np is None:
+            return None
+        return self._snapshot_index('_vectors', lambda stubs: VectorIndex(stubs, path=path))
+
+    def _snapshot_index(self, name, build):
+        """self.<name>'s index, rebuilt in the background from a newer snapshot's questions when due."""
+        reader, stamp = self.snapshot, self._stamp  # Picks up a newly published version first
+        current = getattr(self, name)
+        if current is None or (current[0] != stamp and
+                               time.monotonic() - current[2] >= self.refresh_interval):
+            with self._lock:
+                if name not in self._indexers:
+                    thread = threading.Thread(target=self._build_index, args=(name, build, reader, stamp),
+                                              name='snapshot-indexer', daemon=True)
+                    self._indexers[name] = thread
+                    thread.start()
+        return current[1] if current is not None else None
+
+    def _build_index(self, name, build, reader, stamp):
+        try:
+            index = build([{"question": question} for question in reader.questions()])
+            setattr(self, name, (stamp, index, time.monotonic()))
+        except (OSError, ValueError) as e:
+            print(f"Could not index snapshot questions: {e}")
+        finally:
+            self._indexers.pop(name, None)
+
+    def reading(self):
+        return nullcontext()  # self.data is replaced, never changed in place
+
+    def lookup_snapshot(self, question):
+        with stage('local_lookup'):
+            return self.snapshot.lookup(question)
+
+    def lookup(self, question, fuzzy=False):
+        with stage('local_lookup'):
+            entry = self.snapshot.lookup(question)
+            if entry is not None or not fuzzy:
+                return entry
+            index = self._question_index()
+            match = index.best_match(question) if index is not None else None
+            return self.snapshot.lookup(match['question']) if match is not None else None
+
+    def add_entry(self, question, answer):
+        """Send a Q/A pair to the writer; it is served here once the writer publishes it."""
+        self.submit(question, answer)
+
+    def flush(self):
+        pass  # The writer process owns the files
+
+    def close(self):
+        pass
+
+
+# One manager per learning file, so every component in a process shares the same data and log
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_learning_data_manager(filename='learning.json'):
+    """Return the process-wide manager for a learning file, creating it on first use."""
+    key = os.path.abspath(filename)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = LearningDataManager(filename)
+            _managers[key] = manager
+        return manager
+
+
+def set_learning_data_manager(manager, filename='learning.json'):
+    """Make manager the process-wide one for a learning file (before anything asks for it)."""
+    with _managers_lock:
+        _managers[os.path.abspath(filename)] = manager
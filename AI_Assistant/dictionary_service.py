@@ -0,0 +1,305 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from atomic_files import replace_keeping_mode
+
+MAX_EDIT_DISTANCE = 2
+PREFIX_LENGTH = 7  # Deletes are generated from this many leading characters (SymSpell's prefix trick)
+MAGIC = b'AIDX'
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct('<4sIIIII2Q')
+_WORD = struct.Struct('<QIQI')  # word offset, length, definition (JSON) offset, length
+_SLOT = struct.Struct('<QQ')
+_U32 = struct.Struct('<I')
+
+
+def _hash(text):
+    """Stable 64-bit hash of a delete string (never 0, which marks an empty slot)."""
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little') or 1
+
+
+def deletes(word, max_distance=MAX_EDIT_DISTANCE):
+    """Every string reachable from word by removing up to max_distance characters (word included)."""
+    found = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {text[:i] + text[i + 1:] for text in frontier for i in range(len(text))} - found
+        found |= frontier
+    return found
+
+
+def allowed_distance(word, max_distance=MAX_EDIT_DISTANCE):
+    """Edits tolerated for a word of this length: none up to 2 characters, one up to 5, else max_distance."""
+    if len(word) <= 2:
+        return 0
+    return min(1, max_distance) if len(word) <= 5 else max_distance
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance between a and b, or limit + 1 once it exceeds limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    # A shared prefix and suffix never change the distance; typos usually leave only a few characters
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end_a, end_b = len(a), len(b)
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+    if not a or not b:
+        return max(len(a), len(b))  # Within limit: the length check above bounds it
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)  # Transposition
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1] if previous[-1] <= limit else limit + 1
+
+
+def compile_dictionary(dictionary, max_distance=MAX_EDIT_DISTANCE, prefix_length=PREFIX_LENGTH):
+    """Return the compact binary form of a word -> definition map.
+
+    Layout (little-endian): a header, a table of words sorted alphabetically
+    (so prefix completion is a binary search plus a forward scan), an
+    open-addressing table from each delete-string hash to a postings list of
+    word ids, and the UTF-8 words and JSON definitions.
+    """
+    words = {}
+    for word, definition in dictionary.items():
+        if isinstance(word, str) and word.strip():
+            words.setdefault(word.strip().lower(), definition)  # First spelling wins, as with a dict lookup
+    ordered = sorted(words)
+
+    postings = {}
+    for word_id, word in enumerate(ordered):
+        for text in deletes(word[:prefix_length], max_distance):
+            postings.setdefault(_hash(text), []).append(word_id)
+
+    slot_count = 1
+    while slot_count < max(len(postings), 1) * 2:
+        slot_count *= 2
+    word_table_offset = _HEADER.size
+    slot_table_offset = word_table_offset + len(ordered) * _WORD.size
+    position = slot_table_offset + slot_count * _SLOT.size
+
+    slots = [(0, 0)] * slot_count
+    postings_blocks = []
+    for hashed, ids in postings.items():
+        slot = hashed & (slot_count - 1)
+        while slots[slot][0]:
+            slot = (slot + 1) & (slot_count - 1)
+        slots[slot] = (hashed, position)
+        block = _U32.pack(len(ids)) + struct.pack(f'<{len(ids)}I', *ids)
+        postings_blocks.append(block)
+        position += len(block)
+
+    word_entries, strings = [], []
+    for word in ordered:
+        raw_word = word.encode('utf-8')
+        raw_definition = json.dumps(words[word]).encode('utf-8')
+        word_entries.append(_WORD.pack(position, len(raw_word), position + len(raw_word), len(raw_definition)))
+        strings.append(raw_word + raw_definition)
+        position += len(raw_word) + len(raw_definition)
+
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, len(ordered), max_distance, prefix_length, slot_count,
+                          word_table_offset, slot_table_offset)
+    return b''.join([header, *word_entries, *(_SLOT.pack(*slot) for slot in slots), *postings_blocks, *strings])
+
+
+class DictionaryIndex:
+    """Exact, prefix and typo-tolerant lookups over a compiled dictionary (bytes or an mmap)."""
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        (magic, version, self.word_count, self.max_distance, self.prefix_length, self._slot_count,
+         self._word_table_offset, self._slot_table_offset) = _HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"Not a compiled dictionary (version {FORMAT_VERSION}).")
+
+    def __len__(self):
+        return self.word_count
+
+    def word(self, word_id):
+        offset, length, _, _ = _WORD.unpack_from(self._buffer, self._word_table_offset + word_id * _WORD.size)
+        return bytes(self._buffer[offset:offset + length]).decode('utf-8')
+
+    def definition(self, word_id):
+        _, _, offset, length = _WORD.unpack_from(self._buffer, self._word_table_offset + word_id * _WORD.size)
+        return json.loads(bytes(self._buffer[offset:offset + length]).decode('utf-8'))
+
+    def _bisect(self, word):
+        """Id of the first word >= word in sorted order."""
+        low, high = 0, self.word_count
+        while low < high:
+            middle = (low + high) // 2
+            if self.word(middle) < word:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def find(self, word):
+        """Id of word, or None."""
+        word_id = self._bisect(word)
+        return word_id if word_id < self.word_count and self.word(word_id) == word else None
+
+    def complete(self, prefix, limit=10):
+        """Up to limit words starting with prefix, alphabetically."""
+        results = []
+        word_id = self._bisect(prefix)
+        while word_id < self.word_count and len(results) < limit:
+            word = self.word(word_id)
+            if not word.startswith(prefix):
+                break
+            results.append(word)
+            word_id += 1
+        return results
+
+    def _postings(self, text):
+        mask = self._slot_count - 1
+        hashed = _hash(text)
+        slot = hashed & mask
+        while True:
+            stored_hash, offset = _SLOT.unpack_from(self._buffer, self._slot_table_offset + slot * _SLOT.size)
+            if not stored_hash:
+                return ()
+            if stored_hash == hashed:
+                (count,) = _U32.unpack_from(self._buffer, offset)
+                return struct.unpack_from(f'<{count}I', self._buffer, offset + _U32.size)
+            slot = (slot + 1) & mask
+
+    def suggest(self, word, max_distance=None, limit=5):
+        """Up to limit (word, distance) pairs within max_distance edits, closest first.
+
+        max_distance defaults to allowed_distance(word), so short words are
+        only corrected by a single edit (or not at all).
+        """
+        max_distance = allowed_distance(word, self.max_distance) if max_distance is None \
+            else min(max_distance, self.max_distance)
+        if max_distance <= 0:
+            return [(word, 0)] if self.find(word) is not None else []
+        candidates = set()
+        for text in deletes(word[:self.prefix_length], max_distance):
+            candidates.update(self._postings(text))
+        scored = []
+        for word_id in candidates:
+            offset, length, _, _ = _WORD.unpack_from(self._buffer, self._word_table_offset + word_id * _WORD.size)
+            if abs(length - len(word)) > max_distance * 4:  # UTF-8 bytes: cheap pre-filter before decoding
+                continue
+            candidate = bytes(self._buffer[offset:offset + length]).decode('utf-8')
+            distance = edit_distance(word, candidate, max_distance)
+            if distance <= max_distance:
+                scored.append((distance, candidate))
+        return [(candidate, distance) for distance, candidate in sorted(scored)[:limit]]
+
+
+class DictionaryService:
+    """Shared dictionary lookups: exact definitions, prefix completion and spelling suggestions.
+
+    The first lookup compiles dictionary_file into index_file (again whenever
+    the JSON is newer) and memory-maps it, so startup never parses the JSON
+    and every process shares the same pages. Misspellings are corrected with
+    a precomputed deletion index instead of a network search.
+    """
+
+    def __init__(self, dictionary_file='dictionary.json', index_file=None, max_distance=MAX_EDIT_DISTANCE,
+                 prefix_length=PREFIX_LENGTH):
+        self.dictionary_file = dictionary_file
+        self.index_file = index_file or os.path.splitext(dictionary_file)[0] + '.index'
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self._index = None
+        self._lock = threading.Lock()
+
+    @property
+    def index(self):
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = self._load()
+        return self._index
+
+    def _load(self):
+        index = self._open_compiled()
+        if index is not None:
+            return index
+        try:
+            with open(self.dictionary_file, 'r') as file:
+                dictionary = json.load(file)
+        except FileNotFoundError:
+            print("Dictionary file not found. Please ensure it exists.")
+            dictionary = {}
+        compiled = compile_dictionary(dictionary if isinstance(dictionary, dict) else {},
+                                      self.max_distance, self.prefix_length)
+        try:
+            self._write(compiled)
+        except OSError as e:
+            print(f"Could not save the dictionary index: {e}")  # Still usable from memory
+            return DictionaryIndex(compiled)
+        return self._open_compiled() or DictionaryIndex(compiled)
+
+    def _open_compiled(self):
+        """Map an up-to-date compiled index with matching settings, or return None."""
+        try:
+            if os.path.exists(self.dictionary_file) and \
+                    os.path.getmtime(self.index_file) < os.path.getmtime(self.dictionary_file):
+                return None
+            with open(self.index_file, 'rb') as file:
+                index = DictionaryIndex(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+        except (OSError, ValueError, struct.error):
+            return None
+        if (index.max_distance, index.prefix_length) != (self.max_distance, self.prefix_length):
+            return None
+        return index
+
+    def _write(self, compiled):
+        directory = os.path.dirname(os.path.abspath(self.index_file))
+        fd, temp_path = tempfile.mkstemp(prefix='.dictionary.', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(compiled)
+            replace_keeping_mode(temp_path, self.index_file)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def __len__(self):
+        return len(self.index)
+
+    def define(self, word):
+        """Definition of word (case-insensitive), or None."""
+        word_id = self.index.find(word.strip().lower())
+        return self.index.definition(word_id) if word_id is not None else None
+
+    def complete(self, prefix, limit=10):
+        return self.index.complete(prefix.strip().lower(), limit)
+
+    def suggest(self, word, limit=5):
+        return self.index.suggest(word.strip().lower(), limit=limit)
+
+    def lookup(self, word):
+        """Return (word, definition) for word or, if it is misspelled, its closest correction; else None."""
+        word = word.strip().lower()
+        if not word:
+            return None
+        word_id = self.index.find(word)
+        if word_id is None:
+            suggestions = self.index.suggest(word, limit=1)
+            if not suggestions:
+                return None
+            word_id = self.index.find(suggestions[0][0])
+        return self.index.word(word_id), self.index.definition(word_id)
@@ -0,0 +1,174 @@
+import asyncio
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+CONNECT_TIMEOUT = 3.05  # Seconds to establish a connection
+READ_TIMEOUT = 10  # Seconds to wait for the response
+MAX_RETRIES = 2  # Extra attempts after the first, for connection errors, timeouts and 429/5xx
+BACKOFF_BASE = 0.25  # Seconds; doubled per attempt with full jitter
+BACKOFF_MAX = 2.0
+POOL_SIZE = 20  # Keep-alive connections kept per upstream host
+FAILURE_THRESHOLD = 5  # Consecutive failures that open an upstream's circuit
+RESET_TIMEOUT = 30  # Seconds an open circuit fails fast before one trial request is let through
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised without touching the network while an upstream's circuit is open."""
+
+
+class CircuitBreaker:
+    """Per-upstream breaker: closed -> open after repeated failures -> half-open trial."""
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return 'closed'
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                return 'half-open'
+            return 'open'
+
+    def allow(self):
+        """Return True if a request may go out now."""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True  # Half-open: let exactly one request probe the upstream
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release(self):
+        """End a request that says nothing about the upstream (cancelled, interrupted): free the trial slot."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+# Breakers are per upstream host and shared by the sync and async clients
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(url):
+    """Return the circuit breaker for the URL's host."""
+    host = urlsplit(url).netloc
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = _breakers[host] = CircuitBreaker()
+        return breaker
+
+
+def _backoff(attempt):
+    """Full-jitter exponential backoff delay for a retry attempt."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+class HttpClient:
+    """Pooled keep-alive session with timeouts, jittered retries and a breaker per host."""
+
+    def __init__(self, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), max_retries=MAX_RETRIES, pool_size=POOL_SIZE):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, url, params=None, timeout=None):
+        """GET a URL, retrying transient failures; raises CircuitOpenError while the host is failing."""
+        breaker = get_breaker(url)
+        for attempt in range(self.max_retries + 1):
+            if not breaker.allow():
+                raise CircuitOpenError(f"Upstream {urlsplit(url).netloc} is unavailable; try again later.")
+            try:
+                response = self.session.get(url, params=params, timeout=timeout or self.timeout)
+                if response.status_code in RETRY_STATUSES:
+                    response.raise_for_status()
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError):
+                breaker.record_failure()
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(_backoff(attempt))
+                continue
+            except requests.RequestException:
+                breaker.record_failure()  # Not worth retrying (bad redirects, broken bodies), but still a failure
+                raise
+            except BaseException:
+                breaker.release()  # Interrupted, not failed; a later request may run the trial
+                raise
+            breaker.record_success()
+            return response
+
+
+class AsyncHttpClient:
+    """asyncio counterpart of HttpClient built on httpx, sharing the same circuit breakers."""
+
+    def __init__(self, max_retries=MAX_RETRIES, pool_size=POOL_SIZE):
+        import httpx  # Only the async server needs httpx
+        self._httpx = httpx
+        self.max_retries = max_retries
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_keepalive_connections=pool_size, max_connections=pool_size * 5),
+        )
+
+    async def get(self, url, params=None):
+        """GET a URL without blocking the event loop, with the same retry and breaker policy."""
+        breaker = get_breaker(url)
+        for attempt in range(self.max_retries + 1):
+            if not breaker.allow():
+                raise CircuitOpenError(f"Upstream {urlsplit(url).netloc} is unavailable; try again later.")
+            try:
+                response = await self.client.get(url, params=params)
+                if response.status_code in RETRY_STATUSES:
+                    response.raise_for_status()
+            except (self._httpx.TransportError, self._httpx.HTTPStatusError):
+                breaker.record_failure()
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(_backoff(attempt))
+                continue
+            except self._httpx.HTTPError:
+                breaker.record_failure()  # Redirect loops or broken bodies: not retried, but still a failure
+                raise
+            except BaseException:
+                breaker.release()  # Client went away or a hedge was cancelled; the upstream did nothing wrong
+                raise
+            breaker.record_success()
+            return response
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+# Shared by every outbound lookup so connections are reused across requests
+http_client = HttpClient()
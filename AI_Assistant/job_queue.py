@@ -0,0 +1,247 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from metrics import count, registry
+
+MAX_PENDING = 10_000  # Jobs waiting before submit applies backpressure
+SUBMIT_TIMEOUT = 0.05  # Seconds submit waits for room before rejecting a job
+DRAIN_TIMEOUT = 10.0  # Seconds close() waits for pending jobs at shutdown
+FLUSH_BATCH = 100  # Durable jobs run before their effects are flushed and their rows deleted
+JOB_DB = os.environ.get('ASSISTANT_JOB_DB')  # SQLite file for a durable queue; unset keeps jobs in memory
+
+job_seconds = registry.histogram('assistant_job_seconds', "Background job run time per kind.", ('kind',))
+
+
+def learn_job(filename, question, answer):
+    """Merge a Q/A pair into the learning data (answer deduplication and index update included)."""
+    from dataManagement import get_learning_data_manager
+    get_learning_data_manager(filename).add_entry(question, answer)
+
+
+def flush_learned(jobs):
+    """Persist what a batch of learn jobs merged (the managers write to disk in the background)."""
+    from dataManagement import get_learning_data_manager
+    for filename in dict.fromkeys(args[0] for args in jobs):
+        get_learning_data_manager(filename).flush()
+
+
+def index_job(filename):
+    """Add rows for newly learned questions to the semantic vector index."""
+    from dataManagement import get_learning_data_manager
+    from vector_index import vector_path
+    vector_index = get_learning_data_manager(filename).vector_index(path=vector_path(filename))
+    if vector_index is not None:
+        vector_index.sync()
+
+
+# Jobs are stored as (kind, JSON arguments), so a durable queue can replay them after a restart
+HANDLERS = {
+    'learn': learn_job,
+    'index': index_job,
+}
+
+# Kinds whose handlers only buffer their effect; a durable job's row is kept until flusher(list of args) ran
+FLUSHERS = {
+    'learn': flush_learned,
+}
+
+
+class JobQueue:
+    """Bounded background queue for work that should not delay a response.
+
+    submit() returns as soon as the job is queued; worker threads run jobs in
+    submission order (one worker keeps them strictly ordered). When the
+    queue is full, submit waits up to timeout for room and then rejects the
+    job, so a burst slows callers slightly instead of growing memory without
+    limit. With disk_path set, jobs are also kept in a SQLite table until
+    their effects are on disk (for kinds with a flusher, until it has run
+    after them), and ones left over from a previous run are replayed on
+    start. close() stops intake and drains what is pending.
+    """
+
+    def __init__(self, maxsize=MAX_PENDING, workers=1, disk_path=None, handlers=None, flushers=None):
+        self.maxsize = maxsize
+        self.handlers = dict(HANDLERS if handlers is None else handlers)
+        self.flushers = dict(FLUSHERS if flushers is None else flushers)
+        self._jobs = deque()  # (row id or None, kind, args)
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        self._active = 0
+        self._closed = False
+        self._disk = None
+        self._disk_lock = threading.Lock()
+        self.submitted = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        if disk_path:
+            self.enable_disk(disk_path)
+        self._workers = [threading.Thread(target=self._run, name=f'job-worker-{i}', daemon=True)
+                         for i in range(workers)]
+        for worker in self._workers:
+            worker.start()
+        atexit.register(self.close)
+
+    def enable_disk(self, path):
+        """Keep queued jobs in a SQLite file, replaying any a previous process left unfinished."""
+        connection = sqlite3.connect(path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")  # WAL commits without an fsync per job
+        connection.execute("CREATE TABLE IF NOT EXISTS jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT, args TEXT)")
+        connection.commit()
+        rows = connection.execute("SELECT id, kind, args FROM jobs ORDER BY id").fetchall()
+        with self._lock:
+            self._disk = connection
+            self._jobs.extend((row_id, kind, json.loads(args)) for row_id, kind, args in rows)
+            self._not_empty.notify_all()
+
+    def register(self, kind, function, flusher=None):
+        """Run function(*args) for jobs of this kind (and flusher(list of args) before forgetting durable ones)."""
+        self.handlers[kind] = function
+        if flusher is not None:
+            self.flushers[kind] = flusher
+
+    def submit(self, kind, *args, timeout=SUBMIT_TIMEOUT):
+        """Queue a job for the handler of kind; False if the queue stayed full or is closed."""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while len(self._jobs) >= self.maxsize and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._not_full.wait(remaining)
+            if self._closed or len(self._jobs) >= self.maxsize:
+                self.rejected += 1
+                count('job_rejected')
+                return False
+            row_id = self._store(kind, args)
+            self._jobs.append((row_id, kind, args))
+            self.submitted += 1
+            self._not_empty.notify()
+        return True
+
+    def _store(self, kind, args):
+        if self._disk is None:
+            return None
+        with self._disk_lock:
+            cursor = self._disk.execute("INSERT INTO jobs (kind, args) VALUES (?, ?)", (kind, json.dumps(args)))
+            self._disk.commit()
+            return cursor.lastrowid
+
+    def _forget(self, row_ids):
+        row_ids = [row_id for row_id in row_ids if row_id is not None]
+        if not row_ids or self._disk is None:
+            return
+        with self._disk_lock:
+            self._disk.executemany("DELETE FROM jobs WHERE id = ?", [(row_id,) for row_id in row_ids])
+            self._disk.commit()
+
+    def _settle(self, jobs):
+        """Flush what a batch of durable jobs buffered, then delete their rows."""
+        if not jobs:
+            return
+        by_kind = {}
+        for _, kind, args in jobs:
+            by_kind.setdefault(kind, []).append(args)
+        try:
+            for kind, batch in by_kind.items():
+                self.flushers[kind](batch)
+        except Exception as e:
+            print(f"Could not flush background jobs; they will be replayed on restart: {e}")
+            return
+        self._forget(row_id for row_id, _, _ in jobs)
+
+    def _run(self):
+        unflushed = []  # Durable jobs that ran but whose effects are not on disk yet
+        while True:
+            with self._lock:
+                while not self._jobs and not self._closed and not unflushed:
+                    self._not_empty.wait()
+                job = self._jobs.popleft() if self._jobs else None
+                if job is not None:
+                    self._active += 1
+                    self._not_full.notify()
+            if job is None:
+                self._settle(unflushed)  # Idle or closing: nothing to batch them with any more
+                unflushed = []
+                if self._closed and not self._jobs:
+                    return  # Closed and drained
+                continue
+            row_id, kind, args = job
+            failed = False
+            try:
+                handler = self.handlers.get(kind)
+                if handler is None:
+                    raise LookupError(f"no handler registered for {kind!r}")
+                with job_seconds.time(kind=kind):
+                    handler(*args)
+            except Exception as e:
+                failed = True
+                print(f"Background job {kind} failed: {e}")  # Not retried, so one bad job can't wedge the queue
+                count('job_failed')
+            if row_id is not None and not failed and kind in self.flushers:
+                unflushed.append(job)  # Its row goes once the flusher has persisted the effect
+                if len(unflushed) >= FLUSH_BATCH:
+                    self._settle(unflushed)
+                    unflushed = []
+            else:
+                self._forget([row_id])
+            with self._lock:
+                self._active -= 1
+                self.processed += 1
+                self.failed += failed
+                if not self._jobs and not self._active:
+                    self._idle.notify_all()
+
+    def join(self, timeout=None):
+        """Wait until every queued job has run; False if timeout passed first."""
+        with self._lock:
+            return self._idle.wait_for(lambda: not self._jobs and not self._active, timeout)
+
+    def close(self, timeout=DRAIN_TIMEOUT):
+        """Stop accepting jobs and let the workers drain the queue (jobs left over stay on disk, if durable)."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+        deadline = time.monotonic() + timeout
+        for worker in self._workers:
+            worker.join(max(deadline - time.monotonic(), 0))
+        if self._jobs:
+            print(f"{len(self._jobs)} background jobs were not finished before shutdown.")
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def stats(self):
+        return {
+            "pending": len(self._jobs),
+            "active": self._active,
+            "submitted": self.submitted,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "durable": self._disk is not None,
+        }
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Return the process-wide job queue (durable when ASSISTANT_JOB_DB names a SQLite file)."""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(disk_path=JOB_DB)
+            registry.callback('assistant_job_queue_depth', "Background jobs waiting to run.", lambda: len(_job_queue))
+        return _job_queue
@@ -0,0 +1,67 @@
+import json
+import os
+import threading
+from dataManagement import get_learning_data_manager
+from dictionary_service import DictionaryService
+
+
+class KnowledgeBase:
+    """Everything the assistant knows, loaded once and shared by every component.
+
+    Assistant, InputProcessor, AIAssistant and the web apps take a
+    knowledge_base argument and default to get_knowledge_base(), so wiring
+    up more components never re-parses learning.json or dictionary.json and
+    a write through one component is immediately visible to all others.
+    """
+
+    def __init__(self, learning_file='learning.json', dictionary_file='dictionary.json'):
+        self.learning_file = learning_file
+        self.dictionary_file = dictionary_file
+        self.learning = get_learning_data_manager(learning_file)
+        self._dictionary = None
+        self._dictionary_lock = threading.Lock()
+        self.dictionary_service = DictionaryService(dictionary_file)  # Compiled and mapped on first lookup
+
+    @property
+    def data(self):
+        """The learning data dict ({"entries": [...]}) owned by the shared manager."""
+        return self.learning.data
+
+    @property
+    def dictionary(self):
+        """Word -> definition map, parsed from dictionary_file on first use (lookups use dictionary_service)."""
+        if self._dictionary is None:
+            with self._dictionary_lock:
+                if self._dictionary is None:
+                    self._dictionary = self._load_dictionary()
+        return self._dictionary
+
+    def _load_dictionary(self):
+        try:
+            with open(self.dictionary_file, 'r') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            print("Dictionary file not found. Please ensure it exists.")
+            return {}
+
+    def lookup(self, question, fuzzy=False):
+        """Return the learned entry for a question, or None."""
+        return self.learning.lookup(question, fuzzy=fuzzy)
+
+    def add_entry(self, question, answer):
+        """Learn a new Q/A pair (visible immediately, persisted in the background)."""
+        self.learning.add_entry(question, answer)
+
+
+_knowledge_bases = {}
+_knowledge_bases_lock = threading.Lock()
+
+
+def get_knowledge_base(learning_file='learning.json', dictionary_file='dictionary.json'):
+    """Return the process-wide knowledge base for a pair of data files."""
+    key = (os.path.abspath(learning_file), os.path.abspath(dictionary_file))
+    with _knowledge_bases_lock:
+        knowledge_base = _knowledge_bases.get(key)
+        if knowledge_base is None:
+            knowledge_base = _knowledge_bases[key] = KnowledgeBase(learning_file, dictionary_file)
+        return knowledge_base
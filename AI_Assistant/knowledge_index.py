@@ -0,0 +1,235 @@
+import heapq
+import math
+import string
+import threading
+import weakref
+from array import array
+from collections import Counter
+from collections.abc import Mapping
+from dictionary_service import allowed_distance, edit_distance
+
+# Built once at import instead of on every comparison
+_PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+
+# Defaults for approximate matching (Jaccard similarity over character trigrams)
+FUZZY_THRESHOLD = 0.6
+FUZZY_TOP_K = 3
+FUZZY_SCAN_LIMIT = 4096  # Question ids read from postings per search, which bounds it on any corpus size
+FUZZY_CANDIDATES = 16  # Questions with the most shared trigrams that are scored exactly
+ANSWER_THRESHOLD = 0.65  # best_match answers with someone else's question, so it asks for more
+
+# Words too common to tell two questions apart; a fuzzy answer must agree on every other word
+STOP_WORDS = frozenset(
+    "a an the is are was were be been am do does did doing i me my you your he she it its we our they their "
+    "this that these those what whats who whom which when where why how of in on at to for from with by about "
+    "and or but if so can could would should will shall may might must please tell know explain describe define "
+    "mean meaning".split())
+
+
+def normalize_question(text):
+    """Normalize a question so lookups ignore case, punctuation and extra spaces."""
+    if not isinstance(text, str):
+        return ''
+    return ' '.join(text.lower().translate(_PUNCTUATION_TABLE).split())
+
+
+def trigrams(normalized):
+    """Return the set of character trigrams of an already normalized question."""
+    padded = f" {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def content_words(normalized):
+    """Words of an already normalized question that carry its meaning (not in STOP_WORDS)."""
+    return [word for word in normalized.split() if word not in STOP_WORDS]
+
+
+def _matches_word(word, others):
+    """True if word is in others, or one of them is within the typos allowed for its length."""
+    if word in others:
+        return True
+    limit = allowed_distance(word)
+    return limit > 0 and any(edit_distance(word, other, limit) <= limit for other in others)
+
+
+def covers(a, b):
+    """True if every content word of normalized question a is in b, give or take typos."""
+    words_b = b.split()
+    return all(_matches_word(word, words_b) for word in content_words(a))
+
+
+def same_content(a, b):
+    """True if every content word of either normalized question is in the other, give or take typos.
+
+    Trigram similarity alone rates "capital of japan" close to "capital of
+    france" and "how old are you" close to "how are you"; a different or
+    missing content word means a different question.
+    """
+    return covers(a, b) and covers(b, a)
+
+
+class QuestionIndex:
+    """Hash index mapping a normalized question to its learning entry.
+
+    Alongside the exact map it can keep a character-trigram inverted index
+    so paraphrased or misspelled questions can be matched without comparing
+    against every stored question. Exact lookups (merging, imports, most
+    answers) never need it, so it is only built by the first fuzzy search,
+    and kept compact: postings are arrays of question ids, and a candidate's
+    trigrams are recomputed only when it survives the count filters.
+    """
+
+    def __init__(self, entries=None):
+        self.entries = entries if entries is not None else []
+        self._by_question = {}
+        self._keys = []  # Question id -> normalized question, for the trigram index
+        self._sizes = array('I')  # Question id -> number of distinct trigrams
+        self._postings = None  # Trigram -> array of question ids; None until the first fuzzy search
+        self._fuzzy_lock = threading.Lock()
+        self._indexed = 0  # Number of entries from self.entries already indexed
+        self.sync()
+
+    def __len__(self):
+        return len(self._by_question)
+
+    def sync(self):
+        """Index any entries appended to the list since the last sync."""
+        entries = self.entries
+        for position in range(self._indexed, len(entries)):
+            self.add(entries[position])
+        self._indexed = len(entries)
+
+    def add(self, entry):
+        """Index a single entry; the first entry with answers wins for a question."""
+        if not isinstance(entry, Mapping):
+            return
+        key = normalize_question(entry.get('question', ''))
+        existing = self._by_question.get(key)
+        if existing is None or (not existing.get('answer') and entry.get('answer')):
+            self._by_question[key] = entry
+        if existing is None and key and self._postings is not None:
+            self._add_grams(key, self._postings)
+
+    def _add_grams(self, key, postings):
+        grams = trigrams(key)
+        question_id = len(self._keys)
+        self._keys.append(key)
+        self._sizes.append(len(grams))
+        for gram in grams:
+            posting = postings.get(gram)
+            if posting is None:
+                posting = postings[gram] = array('I')
+            posting.append(question_id)
+
+    def build_fuzzy(self):
+        """Build the trigram index now rather than on the first fuzzy search."""
+        if self._postings is not None:
+            return
+        with self._fuzzy_lock:
+            if self._postings is None:
+                postings = {}
+                for key in self._by_question:
+                    if key:
+                        self._add_grams(key, postings)
+                self._postings = postings  # Published complete, so searches never see a partial index
+
+    def lookup(self, question):
+        """Return the entry stored for the question, or None."""
+        if len(self.entries) != self._indexed:
+            self.sync()
+        return self._by_question.get(normalize_question(question))
+
+    def search(self, question, top_k=FUZZY_TOP_K, threshold=FUZZY_THRESHOLD):
+        """Return up to top_k (score, entry) pairs whose similarity is at least threshold.
+
+        Candidates are generated from the rarest query trigrams only (prefix
+        filtering): a question with Jaccard similarity >= threshold must share
+        at least threshold * len(query) trigrams, so it has to appear in one of
+        the first len(query) - ceil(threshold * len(query)) + 1 rarest postings.
+        Hits counted on those postings bound the overlap before any set
+        intersection is done. At most FUZZY_SCAN_LIMIT ids are read: once the
+        next posting would pass it, the remaining (commoner) grams are only
+        counted as possible overlap, and only the FUZZY_CANDIDATES questions
+        with the most hits are scored, so a question sharing little but very
+        common trigrams with the query can be missed.
+        """
+        if len(self.entries) != self._indexed:
+            self.sync()
+        key = normalize_question(question)
+        if not key:
+            return []
+        self.build_fuzzy()
+        postings = self._postings
+        query = trigrams(key)
+        threshold = max(threshold, 1e-9)
+        ordered = sorted(query, key=lambda gram: len(postings.get(gram, ())))
+        prefix_length = len(query) - math.ceil(threshold * len(query)) + 1
+
+        hits = Counter()
+        scanned = read = 0
+        for gram in ordered[:prefix_length]:
+            posting = postings.get(gram, ())
+            read += len(posting)
+            if read > FUZZY_SCAN_LIMIT:
+                break
+            hits.update(posting)
+            scanned += 1
+        unseen = ordered[scanned:]  # Grams not counted in hits
+
+        scored = []
+        for question_id, count in hits.most_common(FUZZY_CANDIDATES):
+            size = self._sizes[question_id]
+            if not threshold * len(query) <= size <= len(query) / threshold:
+                continue  # Length filter: the sizes alone rule this one out
+            if count + len(unseen) < threshold / (1 + threshold) * (len(query) + size):
+                continue  # Even matching every remaining gram cannot reach the threshold
+            candidate = self._keys[question_id]
+            padded = f" {candidate} "
+            overlap = count + sum(gram in padded for gram in unseen)  # A substring test per gram, no set built
+            score = overlap / (len(query) + size - overlap)
+            if score >= threshold:
+                scored.append((score, candidate))
+
+        best = heapq.nlargest(top_k, scored)
+        return [(round(score, 4), self._by_question[candidate]) for score, candidate in best]
+
+    def best_match(self, question, threshold=ANSWER_THRESHOLD):
+        """Return the exact entry for the question, else the closest fuzzy match, else None.
+
+        A fuzzy match also has to have the same content words (see same_content).
+        """
+        entry = self.lookup(question)
+        if entry is not None:
+            return entry
+        key = normalize_question(question)
+        for _, candidate in self.search(question, top_k=FUZZY_TOP_K, threshold=threshold):
+            if same_content(key, normalize_question(candidate.get('question', ''))):
+                return candidate
+        return None
+
+
+# One index per learning data dict, rebuilt only when its 'entries' list is replaced
+_indexes = {}
+
+
+def forget_when_collected(data, registry, key):
+    """Drop registry[key] once data is garbage collected, so replaced copies do not keep their indexes.
+
+    Loaded learning data (CompactLearningData) can be tracked; a plain dict
+    cannot, and its entry stays until another dict reuses the id.
+    """
+    try:
+        weakref.finalize(data, registry.pop, key, None)
+    except TypeError:
+        pass
+
+
+def get_question_index(data):
+    """Return the shared question index for a learning data dict."""
+    entries = data.get('entries', []) if isinstance(data, dict) else []
+    index = _indexes.get(id(data))
+    if index is None or index.entries is not entries:
+        index = QuestionIndex(entries)
+        _indexes[id(data)] = index
+        forget_when_collected(data, _indexes, id(data))
+    return index
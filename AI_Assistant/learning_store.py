@@ -0,0 +1,186 @@
+import json
+import os
+import tempfile
+from collections.abc import Mapping
+from atomic_files import replace_keeping_mode
+from compact_store import CompactLearningData
+from knowledge_index import get_question_index
+
+SNAPSHOT_VERSION = 2
+COMPACT_EVERY = 1000  # Logged records before the log is folded into the snapshot
+
+
+def atomic_write_json(data, filename, indent=4):
+    """Write JSON to a temp file in the same directory, fsync it and rename it into place."""
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, temp_path = tempfile.mkstemp(prefix='.' + os.path.basename(filename) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as file:
+            json.dump(data, file, indent=indent, default=_json_default)
+            file.flush()
+            os.fsync(file.fileno())
+        replace_keeping_mode(temp_path, filename)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    _fsync_directory(directory)
+
+
+def _json_default(value):
+    """Serialize dict-like records (such as compact entries) as plain objects."""
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _fsync_directory(directory):
+    """Persist a rename; not supported on every platform, so failures are ignored."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def merge_entry(data, question, answer):
+    """Merge a Q/A pair into learning data, adding the answer only if it is new.
+
+    Merging is idempotent, so replaying a log record twice (for example after
+    a crash between compaction and log truncation) changes nothing.
+    """
+    entries = data.setdefault('entries', [])
+    answers = answer if isinstance(answer, list) else [answer]
+    entry = get_question_index(data).lookup(question)
+    if entry is None:
+        if hasattr(data, 'new_entry'):
+            entry = data.new_entry(question)  # Compact data: pooled record instead of a dict
+        else:
+            entry = {"question": question, "answer": [], "follow_ups": [], "feedback": None}
+        entries.append(entry)
+        get_question_index(data).sync()  # Index now, so concurrent readers never have to
+    current = entry.get('answer')
+    current = current if isinstance(current, list) else ([current] if current else [])
+    new_answers = []
+    for item in answers:
+        if item not in current and item not in new_answers:
+            new_answers.append(item)
+    if new_answers or not isinstance(entry.get('answer'), list):
+        entry['answer'] = current + new_answers  # Assigned, not appended, so compact entries store it
+    return entry
+
+
+class LearningStore:
+    """Snapshot plus append-only JSON Lines log for learning data.
+
+    New Q/A pairs are appended to ``<snapshot>.log`` (one record per line), so
+    a write costs O(1) instead of re-serializing the whole knowledge base.
+    Loading replays the log over the snapshot; compaction rewrites the
+    snapshot atomically and only then truncates the log.
+    """
+
+    def __init__(self, filename='learning.json', log_filename=None, compact_every=COMPACT_EVERY, fsync=True):
+        self.filename = filename
+        self.log_filename = log_filename or filename + '.log'
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.pending = 0  # Records in the log since the last compaction
+
+    def load(self, compact=False):
+        """Load the snapshot, migrate it if needed and replay the append log.
+
+        With compact set, entries are returned as CompactEntry records that
+        share one pool of deduplicated answer strings.
+        """
+        try:
+            with open(self.filename, 'r') as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            data = {"entries": []}
+        except json.JSONDecodeError:
+            print(f"Learning snapshot {self.filename} is malformed; starting empty.")  # Debugging
+            data = {"entries": []}
+        if not isinstance(data, dict) or not isinstance(data.get('entries'), list):
+            data = {"entries": []}
+
+        if data.get('version') != SNAPSHOT_VERSION:
+            self._migrate(data)
+        if compact:
+            data = CompactLearningData(data)
+
+        self._repair_log()
+        self.pending = 0
+        for record in self._read_log():
+            merge_entry(data, record['question'], record['answer'])
+            self.pending += 1
+        return data
+
+    def _migrate(self, data):
+        """One-time upgrade: fold loose top-level question keys into entries."""
+        for key in [key for key in data if key not in ('entries', 'version')]:
+            value = data.pop(key)
+            if isinstance(value, (str, list)):
+                merge_entry(data, key, value)
+        data['version'] = SNAPSHOT_VERSION
+        if os.path.exists(self.filename):
+            atomic_write_json(data, self.filename)
+
+    def _repair_log(self):
+        """Terminate a torn final line so the next append starts on a fresh line."""
+        try:
+            with open(self.log_filename, 'rb+') as file:
+                file.seek(0, os.SEEK_END)
+                if file.tell() == 0:
+                    return
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b'\n':
+                    file.write(b'\n')
+        except FileNotFoundError:
+            return
+
+    def _read_log(self):
+        """Yield valid log records; a torn final line from a crash is skipped."""
+        try:
+            with open(self.log_filename, 'r') as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if isinstance(record, dict) and 'question' in record and 'answer' in record:
+                        yield record
+        except FileNotFoundError:
+            return
+
+    def append(self, question, answer):
+        """Durably append one Q/A record to the log."""
+        self.append_many([(question, answer)])
+
+    def append_many(self, records):
+        """Durably append a batch of (question, answer) records with a single write and fsync."""
+        if not records:
+            return
+        lines = ''.join(json.dumps({"question": question, "answer": answer}) + '\n' for question, answer in records)
+        with open(self.log_filename, 'a') as file:
+            file.write(lines)
+            file.flush()
+            if self.fsync:
+                os.fsync(file.fileno())
+        self.pending += len(records)
+
+    def needs_compaction(self):
+        """Return True once enough records are logged to be worth a compaction."""
+        return self.pending >= self.compact_every
+
+    def compact(self, data):
+        """Write data as the new snapshot, then drop the log it already contains."""
+        data['version'] = SNAPSHOT_VERSION
+        atomic_write_json(data, self.filename)
+        with open(self.log_filename, 'w'):
+            pass  # Truncate; replaying it again would be harmless anyway
+        self.pending = 0
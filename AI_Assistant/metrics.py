@@ -0,0 +1,237 @@
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as _Tally, deque
+from contextlib import contextmanager
+
+# Latency buckets in seconds: sub-millisecond index hits up to multi-second network calls and synthesis
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROFILE_INTERVAL = 0.001  # Seconds between stack samples
+PROFILE_HISTORY = 20  # Recent request profiles kept for /metrics/profiles
+
+
+def _label_text(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count, optionally split by labels."""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels.get(name, '') for name in self.labelnames), 0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return [(self.name, _label_text(self.labelnames, key), value) for key, value in sorted(values.items())]
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, optionally split by labels."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts (+Inf last), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        slot = bisect_left(self.buckets, value)  # Counts are per bucket; made cumulative when rendered
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][slot] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels):
+        series = self._series.get(tuple(labels.get(name, '') for name in self.labelnames))
+        return series[2] if series else 0
+
+    def samples(self):
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        lines = []
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                lines.append((self.name + '_bucket', _label_text(self.labelnames, key, [('le', _number(bound))]),
+                              cumulative))
+            lines.append((self.name + '_sum', _label_text(self.labelnames, key), total))
+            lines.append((self.name + '_count', _label_text(self.labelnames, key), count))
+        return lines
+
+
+class CallbackMetric:
+    """Values read from elsewhere (such as a cache's own counters) when metrics are scraped.
+
+    function() returns a number, or a {label value: number} dict for a
+    single label, so the instrumented code pays nothing per operation.
+    """
+
+    def __init__(self, name, help_text, function, kind='gauge', labelname=None):
+        self.name = name
+        self.help = help_text
+        self.function = function
+        self.kind = kind
+        self.labelname = labelname
+
+    def samples(self):
+        try:
+            values = self.function()
+        except Exception as e:
+            print(f"Could not collect {self.name}: {e}")
+            return []
+        if isinstance(values, dict):
+            return [(self.name, _label_text((self.labelname,), (label,)), value)
+                    for label, value in sorted(values.items())]
+        return [(self.name, '', values)]
+
+
+class Registry:
+    """Named metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_add(self, name, factory):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._get_or_add(name, lambda: Counter(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_add(name, lambda: Histogram(name, help_text, labelnames, buckets))
+
+    def callback(self, name, help_text, function, kind='gauge', labelname=None):
+        """Register (or replace) a metric whose value is read at scrape time."""
+        with self._lock:
+            metric = self._metrics[name] = CallbackMetric(name, help_text, function, kind, labelname)
+            return metric
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{labels} {_number(value)}" for name, labels, value in metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+stage_seconds = registry.histogram('assistant_stage_seconds', "Time spent per processing stage.", ('stage',))
+events = registry.counter('assistant_events_total', "Notable events on the request path.", ('event',))
+
+
+def stage(name):
+    """Context manager timing a block as one observation of the given stage."""
+    return stage_seconds.time(stage=name)
+
+
+def count(event, amount=1):
+    """Count an event (a cache miss, an input type, an empty knowledge base, ...)."""
+    events.inc(amount, event=event)
+
+
+class SamplingProfiler:
+    """Samples one thread's stack every interval seconds while running.
+
+    It is opt-in per request, so normal requests pay nothing; a profiled
+    request is slowed only by the sampler thread waking up. The result is
+    a tally of collapsed stacks ("outer;inner;leaf" -> samples), the format
+    flame-graph tools read.
+    """
+
+    def __init__(self, thread_id=None, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.stacks = _Tally()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self.started = self.elapsed = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def report(self, top=20):
+        return {
+            "seconds": round(self.elapsed or 0.0, 6),
+            "samples": self.samples,
+            "stacks": [{"stack": stack, "samples": samples} for stack, samples in self.stacks.most_common(top)],
+        }
+
+
+recent_profiles = deque(maxlen=PROFILE_HISTORY)
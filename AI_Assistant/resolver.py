@@ -0,0 +1,182 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from metrics import registry
+
+DEFAULT_BUDGET = 1.5  # Seconds a resolution may take before the best answer so far is returned
+INLINE_COST = 0.005  # Tiers expected to be faster than this run on the caller's thread, never in the pool
+LATENCY_WINDOW = 1024  # Recent latencies kept per tier for percentiles
+
+tier_seconds = registry.histogram('assistant_tier_seconds', "Answer resolution time per tier.", ('tier',))
+tier_results = registry.counter('assistant_tier_results_total', "Answer resolution outcomes per tier.",
+                                ('tier', 'result'))
+
+
+class Tier:
+    """One way of answering a query.
+
+    function(query) returns an answer or None (a miss); expected_cost is the
+    time in seconds it usually takes, which decides when the next tier is
+    started as a hedge. max_in_flight caps the calls of this tier running in
+    the pool at once (including abandoned ones that are still finishing), so
+    a slow upstream cannot take every worker; at the cap the tier is skipped.
+    """
+
+    def __init__(self, name, function, expected_cost, max_in_flight=None):
+        self.name = name
+        self.function = function
+        self.expected_cost = expected_cost
+        self.max_in_flight = max_in_flight
+
+
+class TierStats:
+    """Call, hit and latency counters for one tier."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.calls = 0
+        self.hits = 0
+        self.errors = 0
+        self.abandoned = 0  # Still running when an answer was returned, or past the budget
+        self.skipped = 0  # Not started because max_in_flight calls were already running
+        self.latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency, hit=False, error=False):
+        with self._lock:
+            self.calls += 1
+            self.hits += hit
+            self.errors += error
+            self.latencies.append(latency)
+
+    def record_abandoned(self):
+        with self._lock:
+            self.abandoned += 1
+
+    def record_skipped(self):
+        with self._lock:
+            self.skipped += 1
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            calls, hits, errors, abandoned, skipped = self.calls, self.hits, self.errors, self.abandoned, self.skipped
+
+        def percentile(fraction):
+            return round(latencies[min(int(fraction * len(latencies)), len(latencies) - 1)] * 1000, 3) if latencies else None
+
+        return {"calls": calls, "hits": hits, "hit_rate": round(hits / calls, 3) if calls else None,
+                "errors": errors, "abandoned": abandoned, "skipped": skipped,
+                "p50_ms": percentile(0.5), "p99_ms": percentile(0.99)}
+
+
+class Resolver:
+    """Answer a query from a list of tiers, in order of preference, within a latency budget.
+
+    Tiers are started one after another, but a tier does not have to finish
+    before the next one starts: once every running tier has missed or has
+    overrun its expected cost, the next tier is started speculatively (a
+    hedge). The most preferred answer is returned as soon as no preferred
+    tier can still answer on time, and tiers still running are cancelled (or,
+    if already executing, left to finish in the pool with their result
+    discarded). If the budget runs out first, resolve returns (None, None).
+
+    Tiers cheaper than INLINE_COST run on the caller's thread, so abandoned
+    slow calls filling the pool can never starve them.
+    """
+
+    def __init__(self, tiers, budget=DEFAULT_BUDGET, workers=8):
+        self.tiers = list(tiers)
+        self.budget = budget
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='resolver')
+        self._stats = {tier.name: TierStats() for tier in self.tiers}
+        self._in_flight = {tier.name: 0 for tier in self.tiers}
+        self._in_flight_lock = threading.Lock()
+
+    def _run(self, tier, query):
+        started = time.perf_counter()
+        try:
+            answer = tier.function(query)
+        except Exception as e:
+            print(f"Error in {tier.name} tier: {e}")  # Debugging
+            self._record(tier, time.perf_counter() - started, 'error')
+            return None
+        self._record(tier, time.perf_counter() - started, 'hit' if answer else 'miss')
+        return answer or None
+
+    def _submit(self, tier, query):
+        """Start tier in the pool; None if it already has max_in_flight calls running."""
+        with self._in_flight_lock:
+            if tier.max_in_flight is not None and self._in_flight[tier.name] >= tier.max_in_flight:
+                self._stats[tier.name].record_skipped()
+                tier_results.inc(tier=tier.name, result='skipped')
+                return None
+            self._in_flight[tier.name] += 1
+        future = self.executor.submit(self._run, tier, query)
+        future.add_done_callback(lambda _: self._finished(tier))  # Also runs when a queued call is cancelled
+        return future
+
+    def _finished(self, tier):
+        with self._in_flight_lock:
+            self._in_flight[tier.name] -= 1
+
+    def _record(self, tier, latency, result):
+        self._stats[tier.name].record(latency, hit=result == 'hit', error=result == 'error')
+        tier_seconds.observe(latency, tier=tier.name)
+        tier_results.inc(tier=tier.name, result=result)
+
+    def resolve(self, query, budget=None):
+        """Return (answer, tier name) for the best answer found within the budget, or (None, None)."""
+        deadline = time.monotonic() + (self.budget if budget is None else budget)
+        running = []  # [tier, future, started] for tiers still owed a result, in preference order
+        position = 0
+        try:
+            while True:
+                now = time.monotonic()
+                # Walk in preference order: take an answer once no preferred tier is still on time
+                for tier, future, started in running:
+                    if future.done():
+                        answer = future.result()
+                        if answer is not None:
+                            return answer, tier.name
+                    elif now - started < tier.expected_cost:
+                        break  # Still on schedule; its answer would beat anything below it
+                # Forget tiers that finished without an answer
+                running = [item for item in running if not item[1].done() or item[1].result() is not None]
+                remaining = deadline - now
+                if remaining <= 0:
+                    return None, None
+
+                if position < len(self.tiers) and all(now - started >= tier.expected_cost
+                                                      for tier, _, started in running):
+                    tier = self.tiers[position]
+                    position += 1
+                    if tier.expected_cost <= INLINE_COST:
+                        # Cheap: no thread hop, and no waiting behind slow calls in the pool. Any tier
+                        # still running has overrun its cost, so this answer is the one to return.
+                        answer = self._run(tier, query)
+                        if answer is not None:
+                            return answer, tier.name
+                    else:
+                        future = self._submit(tier, query)
+                        if future is not None:
+                            running.append([tier, future, now])
+                    continue
+
+                if not running:
+                    return None, None
+                # Sleep until a running tier finishes, falls behind schedule or the budget runs out
+                due = [started + tier.expected_cost - now for tier, _, started in running
+                       if now - started < tier.expected_cost]
+                wait([future for _, future, _ in running if not future.done()], timeout=min([remaining] + due),
+                     return_when=FIRST_COMPLETED)
+        finally:
+            for tier, future, _ in running:
+                if not future.done():
+                    future.cancel()
+                    self._stats[tier.name].record_abandoned()
+                    tier_results.inc(tier=tier.name, result='abandoned')
+
+    def stats(self):
+        """Per-tier calls, hit rate, errors, abandoned hedges and latency percentiles."""
+        return {name: stats.snapshot() for name, stats in self._stats.items()}
@@ -0,0 +1,203 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from metrics import registry
+
+SEARCH_TTL = 15 * 60  # Seconds a search result stays fresh
+MAX_ENTRIES = 1000
+MAX_BYTES = 8 * 1024 * 1024  # Approximate bound on cached result sizes
+
+_MISSING = object()  # Distinguishes "not cached" from a cached None (no results)
+
+
+class _Flight:
+    """A fetch in progress that concurrent callers for the same key wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SearchCache:
+    """LRU + TTL cache for search results with single-flight fetching.
+
+    Concurrent misses for the same key share one outbound call. Entries are
+    evicted least-recently-used first once either the entry count or the
+    approximate byte budget is exceeded. With disk_path set, results are also
+    kept in a small SQLite table so they survive restarts.
+    """
+
+    def __init__(self, ttl=SEARCH_TTL, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES, disk_path=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (expires_at, size, fetch_seconds, value)
+        self._bytes = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._disk = None
+        self._disk_lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.saved_seconds = 0.0  # Fetch time avoided by serving hits
+        if disk_path:
+            self.enable_disk(disk_path)
+
+    def enable_disk(self, path):
+        """Keep a persistent copy of results in a SQLite file."""
+        connection = sqlite3.connect(path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("CREATE TABLE IF NOT EXISTS results "
+                           "(key TEXT PRIMARY KEY, value TEXT, expires_at REAL, fetch_seconds REAL)")
+        connection.commit()
+        self._disk = connection
+
+    def get_or_fetch(self, key, fetch, ttl=None):
+        """Return the cached value for key, calling fetch() at most once across threads on a miss.
+
+        Exceptions from fetch are passed to every waiting caller and nothing is cached.
+        """
+        with self._lock:
+            cached = self._get_memory(key)
+            if cached is not _MISSING:
+                return cached
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value = self._get_disk(key)
+            if value is _MISSING:
+                with self._lock:
+                    self.misses += 1
+                started = time.perf_counter()
+                value = fetch()
+                self.put(key, value, ttl=ttl, fetch_seconds=time.perf_counter() - started)
+            flight.value = value
+            return value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def lookup(self, key):
+        """Return (True, value) for a fresh cached key (memory, then disk), else (False, None)."""
+        with self._lock:
+            value = self._get_memory(key)
+        if value is _MISSING:
+            value = self._get_disk(key)
+        if value is not _MISSING:
+            return True, value
+        with self._lock:
+            self.misses += 1
+        return False, None
+
+    def _get_memory(self, key):
+        # Caller holds self._lock
+        item = self._entries.get(key)
+        if item is None:
+            return _MISSING
+        expires_at, size, fetch_seconds, value = item
+        if expires_at <= time.time():
+            del self._entries[key]
+            self._bytes -= size
+            return _MISSING
+        self._entries.move_to_end(key)
+        self.hits += 1
+        self.saved_seconds += fetch_seconds
+        return value
+
+    def _get_disk(self, key):
+        if self._disk is None:
+            return _MISSING
+        with self._disk_lock:
+            row = self._disk.execute("SELECT value, expires_at, fetch_seconds FROM results WHERE key = ?",
+                                     (key,)).fetchone()
+        if row is None or row[1] <= time.time():
+            return _MISSING
+        value = json.loads(row[0])
+        with self._lock:
+            self.disk_hits += 1
+            self.saved_seconds += row[2]
+            self._store_memory(key, value, row[1], row[2])
+        return value
+
+    def put(self, key, value, ttl=None, fetch_seconds=0.0):
+        """Store a value in memory (and on disk when enabled)."""
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._store_memory(key, value, expires_at, fetch_seconds)
+        if self._disk is not None:
+            with self._disk_lock:
+                self._disk.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                                   (key, json.dumps(value), expires_at, fetch_seconds))
+                self._disk.commit()
+
+    def _store_memory(self, key, value, expires_at, fetch_seconds):
+        # Caller holds self._lock
+        size = len(key) + len(json.dumps(value))
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        self._entries[key] = (expires_at, size, fetch_seconds, value)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted_size, _, _) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+
+    def clear(self):
+        """Drop every cached result, in memory and on disk."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self._disk is not None:
+            with self._disk_lock:
+                self._disk.execute("DELETE FROM results")
+                self._disk.commit()
+
+    def stats(self):
+        """Return hit/miss counters and the fetch latency saved so far."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "saved_seconds": round(self.saved_seconds, 4),
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+# Shared by utils.search_internet and AIAssistant.search_internet
+search_cache = SearchCache()
+# Read from the cache's own counters at scrape time, so lookups pay nothing extra
+registry.callback('assistant_search_cache_lookups_total', "Search cache lookups by result.",
+                  lambda: {result: search_cache.stats()[result] for result in ('hits', 'disk_hits', 'misses', 'coalesced')},
+                  kind='counter', labelname='result')
+
+
+def cache_key(source, query):
+    """Build the cache key for a query sent to a given search source."""
+    return f"{source}:{' '.join(query.lower().split())}"
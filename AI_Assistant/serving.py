@@ -0,0 +1,157 @@
+"""Multi-process serving: pre-forked workers on one port, a single writer of learned data.
+
+Usage (from the AI_Assistant directory, POSIX only):
+    python serving.py [--workers 4] [--host 127.0.0.1] [--port 5001] [--file learning.json] [--app app:app]
+
+The parent binds the port and forks a writer process and --workers worker
+processes (one per core by default), restarting any worker that dies.
+
+- The writer owns learning.json: it is the only process with a
+  LearningDataManager, so the append log and compactions never race. It
+  publishes the data as a versioned, memory-mapped snapshot (snapshot.py)
+  on startup and then at most every PUBLISH_INTERVAL while new pairs arrive.
+- Workers serve the app (threaded) from the shared listening socket. Their
+  learning data is a read-only SharedSnapshotData over that snapshot, so every
+  worker maps the same pages and switches to a new version without
+  restarting; pairs learned by /ask are queued to the writer.
+
+Learned answers reach every worker within about PUBLISH_INTERVAL plus the
+snapshot compile time. Metrics and caches are per worker.
+"""
+import argparse
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import threading
+import time
+from dataManagement import SharedSnapshotData, set_learning_data_manager
+from metrics import count
+
+PUBLISH_INTERVAL = 1.0  # Seconds between snapshot versions while new pairs keep arriving
+WRITE_QUEUE_SIZE = 10_000  # Pairs waiting for the writer before workers start dropping them
+SUBMIT_TIMEOUT = 0.1  # Seconds a worker waits for room in a full write queue
+WRITE_BATCH = 1000  # Pairs the writer takes from the queue per pass
+SUPERVISE_INTERVAL = 1.0
+
+
+def run_writer(filename, writes, ready, publish_interval=PUBLISH_INTERVAL):
+    """Apply queued pairs to the learning file and publish snapshot versions, until a None arrives."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The parent decides when to stop; drain first
+    from dataManagement import LearningDataManager
+    manager = LearningDataManager(filename)
+    manager.publish_snapshot()
+    ready.set()
+    published, dirty, running = time.monotonic(), False, True
+    while running:
+        batch = []
+        try:
+            batch.append(writes.get(timeout=publish_interval))
+            while len(batch) < WRITE_BATCH:
+                batch.append(writes.get_nowait())
+        except queue.Empty:
+            pass
+        for pair in batch:
+            if pair is None:
+                running = False
+                break
+            manager.add_entry(*pair)
+            dirty = True
+        if dirty and (not running or time.monotonic() - published >= publish_interval):
+            manager.publish_snapshot()
+            published, dirty = time.monotonic(), False
+    manager.close()
+
+
+def run_worker(listener, host, port, filename, writes, app_path):
+    """Serve the app from the shared socket with read-only learning data."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    def submit(question, answer):
+        try:
+            writes.put((question, answer), timeout=SUBMIT_TIMEOUT)
+        except queue.Full:
+            count('learning_dropped')  # Writer is behind; the answer was still served
+
+    snapshot_path = os.path.splitext(filename)[0] + '.snapshot'
+    set_learning_data_manager(SharedSnapshotData(snapshot_path, submit), filename)
+    os.environ['ASSISTANT_LEARNING_FILE'] = filename  # The app must ask for this file, or it would load its own
+    from werkzeug.serving import make_server
+    module_name, _, attribute = app_path.partition(':')
+    app = getattr(__import__(module_name), attribute or 'app')
+    server = make_server(host, port, app, threaded=True, fd=listener.fileno())
+    # SIGTERM: stop accepting, then hand the writer any pairs still buffered in this process
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    server.serve_forever()
+    # Workers exit without atexit: run the learn jobs still queued here (they submit to the writer), then flush
+    from job_queue import get_job_queue
+    get_job_queue().close()
+    writes.close()
+    writes.join_thread()
+
+
+def bind(host, port, backlog=1024):
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(backlog)
+    listener.set_inheritable(True)
+    return listener
+
+
+def serve(app_path='app:app', host='127.0.0.1', port=5001, workers=None, filename='learning.json'):
+    """Run the writer and the workers until SIGINT/SIGTERM, then stop the workers and drain the writer."""
+    try:
+        context = multiprocessing.get_context('fork')  # Workers inherit the bound socket
+    except ValueError:
+        raise SystemExit("Multi-process serving needs fork (Linux/macOS); use app.py on this platform.")
+    workers = workers or os.cpu_count() or 1
+    listener = bind(host, port)
+    writes = context.Queue(WRITE_QUEUE_SIZE)
+    ready = context.Event()
+    writer = context.Process(target=run_writer, args=(filename, writes, ready), name='learning-writer')
+    writer.start()
+    ready.wait()  # Workers need the first snapshot version
+
+    def start_worker():
+        process = context.Process(target=run_worker, args=(listener, host, port, filename, writes, app_path),
+                                  name='assistant-worker', daemon=True)
+        process.start()
+        return process
+
+    processes = [start_worker() for _ in range(workers)]
+    print(f"Serving {app_path} on http://{host}:{port} with {workers} workers.")
+
+    stopping = []
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stopping.append(True))
+    while not stopping:
+        time.sleep(SUPERVISE_INTERVAL)
+        for i, process in enumerate(processes):
+            if not process.is_alive() and not stopping:
+                print(f"Worker {process.pid} exited ({process.exitcode}); restarting it.")
+                processes[i] = start_worker()
+
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join()
+    writes.put(None)  # Everything the workers queued is ahead of this
+    writer.join()
+    listener.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: one per core)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--file', default='learning.json', help="Learning data file")
+    parser.add_argument('--app', default='app:app', help="WSGI app as module:attribute")
+    args = parser.parse_args()
+    serve(args.app, args.host, args.port, args.workers, args.file)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from knowledge_index import normalize_question
+from metrics import count
+
+SESSION_IDLE = 30 * 60  # Seconds without a turn before a session is dropped
+MAX_SESSIONS = 10_000
+MAX_TURNS = 10  # Recent (question, answer) pairs kept per session
+MAX_PREDICTIONS = 8  # Follow-ups resolved ahead of time per answer
+MAX_PENDING_PREFETCHES = 64  # Speculative work skipped beyond this, so it never crowds out requests
+AUDIO_PER_ANSWER = 3  # Stored answers are lists; render audio for at most this many of them
+PLACEHOLDER_FOLLOW_UP = 'your follow-up question here'  # Left in many learning.json entries
+
+
+class Session:
+    """Recent turns of one conversation and the answers predicted for its next question."""
+
+    __slots__ = ('session_id', 'last_seen', 'turns', 'predictions')
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.last_seen = time.monotonic()
+        self.turns = deque(maxlen=MAX_TURNS)
+        self.predictions = {}  # Normalized follow-up question -> resolved answer
+
+
+def is_prefetchable(question):
+    """Only plain questions are resolved speculatively: never commands, searches or definitions."""
+    text = question.strip().lower()
+    return bool(text) and text != PLACEHOLDER_FOLLOW_UP and not text.startswith(('#', '/', '"', 'define '))
+
+
+class SessionStore:
+    """Conversation sessions keyed by client-supplied id, with follow-up prefetching.
+
+    Each session keeps its last MAX_TURNS turns; sessions idle for longer than
+    idle_timeout (or beyond max_sessions, least recently used first) are
+    dropped. After every recorded turn, the learned entry for the question
+    is looked up in the background and its follow_ups are resolved with
+    resolve(question) (and, with prefetch_audio, rendered into the TTS
+    cache), so asking a predicted follow-up next is answered from the
+    session without a lookup or synthesis.
+
+    lookup(question) returns the learned entry (or None), and resolve should
+    be the same function the caller answers with on a miss, so a warm answer
+    is the one the user would have got anyway.
+    """
+
+    def __init__(self, lookup, resolve, idle_timeout=SESSION_IDLE, max_sessions=MAX_SESSIONS,
+                 prefetch_audio=False, workers=2):
+        self.lookup = lookup
+        self.resolve = resolve
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.prefetch_audio = prefetch_audio
+        self._sessions = OrderedDict()  # Least recently used first
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='prefetch')
+        self._pending = 0
+        self.hits = 0
+        self.misses = 0
+        self.prefetched = 0
+        self.skipped = 0
+
+    def _session(self, session_id):
+        """The session for an id (created if new), marked as just used; evicts idle ones."""
+        now = time.monotonic()
+        session_id = str(session_id)  # Ids come from JSON bodies
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = Session(session_id)
+        else:
+            self._sessions.move_to_end(session_id)
+        session.last_seen = now
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if len(self._sessions) <= self.max_sessions and now - oldest.last_seen < self.idle_timeout:
+                break
+            self._sessions.popitem(last=False)
+        return session
+
+    def answer(self, session_id, question):
+        """The prefetched answer if question is one of the predicted follow-ups, else None."""
+        with self._lock:
+            session = self._session(session_id)
+            answer = session.predictions.pop(normalize_question(question), None)
+            if answer is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        count('prefetch_hit' if answer is not None else 'prefetch_miss')
+        return answer
+
+    def record(self, session_id, question, answer):
+        """Remember a turn and start resolving the follow-ups of its question in the background."""
+        with self._lock:
+            session = self._session(session_id)
+            session.turns.append((question, answer))
+            session.predictions = {}  # Predictions follow the latest answer only
+            if not is_prefetchable(question):
+                return
+            if self._pending >= MAX_PENDING_PREFETCHES:
+                self.skipped += 1
+                return
+            self._pending += 1
+        self._executor.submit(self._prefetch, session, question)
+
+    def history(self, session_id):
+        """Recent (question, answer) turns of a session, oldest first."""
+        with self._lock:
+            session = self._sessions.get(str(session_id))
+            return list(session.turns) if session is not None else []
+
+    def _prefetch(self, session, question):
+        try:
+            entry = self.lookup(question)
+            follow_ups = [text for text in dict.fromkeys((entry or {}).get('follow_ups') or [])
+                          if isinstance(text, str) and is_prefetchable(text)][:MAX_PREDICTIONS]
+            for follow_up in follow_ups:
+                answer = self.resolve(follow_up)
+                if not answer:
+                    continue
+                if self.prefetch_audio:
+                    self._render(answer)
+                with self._lock:
+                    if not session.turns or session.turns[-1][0] != question:
+                        return  # The conversation moved on; these predictions are stale
+                    session.predictions[normalize_question(follow_up)] = answer
+                    self.prefetched += 1
+        except Exception as e:
+            print(f"Could not prefetch follow-ups for {question[:40]!r}: {e}")
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _render(self, answer):
+        from tts_cache import get_tts_cache
+        texts = answer if isinstance(answer, list) else [answer]
+        for text in texts[:AUDIO_PER_ANSWER]:
+            if isinstance(text, str) and text.strip():
+                get_tts_cache().get_audio(text)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "sessions": len(self._sessions),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "prefetched": self.prefetched,
+                "skipped": self.skipped,
+                "pending": self._pending,
+            }
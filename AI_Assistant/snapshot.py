@@ -0,0 +1,229 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from collections.abc import Mapping
+from atomic_files import replace_keeping_mode
+from knowledge_index import normalize_question
+from learning_store import LearningStore
+
+SNAPSHOT_FILE = 'learning.snapshot'  # Compile with: python snapshot.py [learning.json] [learning.snapshot]
+MAGIC = b'AILS'
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct('<4sIIII4Q')
+_SLOT = struct.Struct('<QQ')
+_U32 = struct.Struct('<I')
+_POOL_INDEX = struct.Struct('<QI')
+
+
+def question_hash(normalized):
+    """Stable 64-bit hash (Python's hash() differs between processes)."""
+    return int.from_bytes(hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).digest(), 'little') or 1
+
+
+def _pack_str(text):
+    raw = text.encode('utf-8')
+    return _U32.pack(len(raw)) + raw
+
+
+def _pack_ids(ids):
+    return _U32.pack(len(ids)) + struct.pack(f'<{len(ids)}I', *ids)
+
+
+def compile_snapshot(data, path=SNAPSHOT_FILE, generation=0):
+    """Write learning data to a binary snapshot at path (atomically); returns the entry count."""
+    by_question = {}
+    for entry in data.get('entries', []):
+        if isinstance(entry, Mapping):
+            key = normalize_question(entry.get('question', ''))
+            existing = by_question.get(key)
+            if existing is None or (not existing.get('answer') and entry.get('answer')):
+                by_question[key] = entry  # Same rule as QuestionIndex: the first entry with answers wins
+    entries = [(key, entry) for key, entry in by_question.items() if key]
+    pool, pool_ids = [], {}
+
+    def intern(text):
+        if text not in pool_ids:
+            pool_ids[text] = len(pool)
+            pool.append(text)
+        return pool_ids[text]
+
+    slot_count = 1
+    while slot_count < max(len(entries), 1) * 2:  # Load factor <= 0.5 keeps probes short
+        slot_count *= 2
+    table_offset = _HEADER.size
+    records_offset = table_offset + slot_count * _SLOT.size
+
+    records, slots, position = [], [(0, 0)] * slot_count, records_offset
+    for key, entry in entries:
+        answers = entry.get('answer') or []
+        answers = answers if isinstance(answers, list) else [answers]
+        record = b''.join((
+            _pack_str(key),
+            _pack_str(entry.get('question', '')),
+            _pack_str(json.dumps(entry.get('feedback'))),
+            _pack_ids([intern(a) for a in answers if isinstance(a, str)]),
+            _pack_ids([intern(f) for f in entry.get('follow_ups') or [] if isinstance(f, str)]),
+        ))
+        hashed = question_hash(key)
+        slot = hashed & (slot_count - 1)
+        while slots[slot][0]:
+            slot = (slot + 1) & (slot_count - 1)
+        slots[slot] = (hashed, position + 1)
+        records.append(record)
+        position += len(record)
+
+    pool_index_offset = position
+    pool_offset = pool_index_offset + len(pool) * _POOL_INDEX.size
+    encoded = [text.encode('utf-8') for text in pool]
+    pool_index, cursor = [], pool_offset
+    for raw in encoded:
+        pool_index.append(_POOL_INDEX.pack(cursor, len(raw)))
+        cursor += len(raw)
+
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, len(entries), slot_count, len(pool),
+                          table_offset, records_offset, pool_index_offset, generation)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix='.snapshot.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(header)
+            file.write(b''.join(_SLOT.pack(*slot) for slot in slots))
+            file.write(b''.join(records))
+            file.write(b''.join(pool_index))
+            file.write(b''.join(encoded))
+            file.flush()
+            os.fsync(file.fileno())
+        replace_keeping_mode(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return len(entries)
+
+
+class SnapshotReader:
+    """Read-only, memory-mapped view of a compiled snapshot.
+
+    Layout (little-endian): a header, an open-addressing table of
+    (question hash, record offset + 1) slots, one record per normalized
+    question (question, feedback JSON, answer and follow-up string ids) and
+    the deduplicated string pool. Every process maps the same file, so the
+    OS shares its pages and startup does no parsing; a lookup probes the
+    table and decodes only the matching record.
+    """
+
+    def __init__(self, path=SNAPSHOT_FILE):
+        self.path = path
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.entry_count, self._slot_count, self._pool_count, self._table_offset,
+         self._records_offset, self._pool_index_offset, self.generation) = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a learning snapshot (version {FORMAT_VERSION}).")
+
+    def __len__(self):
+        return self.entry_count
+
+    def close(self):
+        self._map.close()
+
+    def _read_str(self, offset):
+        (length,) = _U32.unpack_from(self._map, offset)
+        start = offset + _U32.size
+        return self._map[start:start + length].decode('utf-8'), start + length
+
+    def _read_ids(self, offset):
+        (count,) = _U32.unpack_from(self._map, offset)
+        start = offset + _U32.size
+        return struct.unpack_from(f'<{count}I', self._map, start), start + 4 * count
+
+    def _pool_string(self, string_id):
+        offset, length = _POOL_INDEX.unpack_from(self._map, self._pool_index_offset + string_id * _POOL_INDEX.size)
+        return self._map[offset:offset + length].decode('utf-8')
+
+    def lookup(self, question):
+        """Return the entry for a question as a dict, or None, decoding only that record."""
+        key = normalize_question(question)
+        if not key or not self._slot_count:
+            return None
+        raw_key = key.encode('utf-8')
+        hashed = question_hash(key)
+        mask = self._slot_count - 1
+        slot = hashed & mask
+        while True:
+            stored_hash, record = _SLOT.unpack_from(self._map, self._table_offset + slot * _SLOT.size)
+            if not stored_hash:
+                return None
+            if stored_hash == hashed:
+                offset = record - 1
+                (length,) = _U32.unpack_from(self._map, offset)
+                start = offset + _U32.size
+                if self._map[start:start + length] == raw_key:
+                    return self._decode(start + length)[0]
+            slot = (slot + 1) & mask
+
+    def __iter__(self):
+        """Yield every entry in the snapshot, in record order."""
+        offset = self._records_offset
+        for _ in range(self.entry_count):
+            _, offset = self._read_str(offset)  # Normalized key
+            entry, offset = self._decode(offset)
+            yield entry
+
+    def questions(self):
+        """Yield the stored question of every entry, in record order, without decoding the rest."""
+        offset = self._records_offset
+        for _ in range(self.entry_count):
+            _, offset = self._read_str(offset)  # Normalized key
+            question, offset = self._read_str(offset)
+            yield question
+            (length,) = _U32.unpack_from(self._map, offset)  # Feedback JSON
+            offset += _U32.size + length
+            for _ in range(2):  # Answer and follow-up string ids
+                (ids,) = _U32.unpack_from(self._map, offset)
+                offset += _U32.size + 4 * ids
+
+    def _decode(self, offset):
+        question, offset = self._read_str(offset)
+        feedback, offset = self._read_str(offset)
+        answer_ids, offset = self._read_ids(offset)
+        follow_up_ids, offset = self._read_ids(offset)
+        return {
+            "question": question,
+            "answer": [self._pool_string(i) for i in answer_ids],
+            "follow_ups": [self._pool_string(i) for i in follow_up_ids],
+            "feedback": json.loads(feedback),
+        }, offset
+
+
+def is_fresh(snapshot_path, learning_file):
+    """True if the snapshot is newer than the JSON snapshot and its append log."""
+    try:
+        compiled = os.path.getmtime(snapshot_path)
+    except OSError:
+        return False
+    sources = [learning_file, learning_file + '.log']
+    return all(not os.path.exists(source) or os.path.getmtime(source) <= compiled for source in sources)
+
+
+def open_snapshot(learning_file='learning.json', snapshot_path=SNAPSHOT_FILE):
+    """Return a reader for an up-to-date snapshot, or None so callers fall back to JSON."""
+    if not is_fresh(snapshot_path, learning_file):
+        return None
+    try:
+        return SnapshotReader(snapshot_path)
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+if __name__ == '__main__':
+    source = sys.argv[1] if len(sys.argv) > 1 else 'learning.json'
+    target = sys.argv[2] if len(sys.argv) > 2 else SNAPSHOT_FILE
+    count = compile_snapshot(LearningStore(source).load(), target)
+    print(f"Compiled {count} questions from {source} into {target}.")
@@ -0,0 +1,26 @@
+import os
+import stat
+
+from learning_store import atomic_write_json
+
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_rewrite_keeps_the_existing_permissions(tmp_path):
+    path = str(tmp_path / "learning.json")
+    atomic_write_json({"entries": []}, path)
+    os.chmod(path, 0o644)
+
+    atomic_write_json({"entries": [{"question": "q", "answer": ["a"]}]}, path)
+    assert mode(path) == 0o644
+
+
+def test_new_file_gets_the_umask_default_not_owner_only(tmp_path):
+    path = str(tmp_path / "new.json")
+    atomic_write_json({"entries": []}, path)
+
+    umask = os.umask(0)
+    os.umask(umask)
+    assert mode(path) == 0o666 & ~umask
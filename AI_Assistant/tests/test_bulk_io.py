@@ -0,0 +1,42 @@
+import io
+import json
+
+import pytest
+
+from bulk_io import iter_json_array, row_pair
+
+ROWS = [{"question": "What is [dark] matter?", "answer": ["It has \"brackets\" ] and [ quotes."]},
+        {"question": "How far?", "answer": [1.5e3, -2, 0.25]}]
+
+
+def read_all(text, read_size):
+    return list(iter_json_array(io.StringIO(text), read_size=read_size))
+
+
+@pytest.mark.parametrize("read_size", [1, 2, 3, 4, 8, 16, 31, 32, 64 * 1024])
+def test_entries_are_found_after_keys_with_brackets(read_size):
+    document = json.dumps({"meta": {"note": "has [brackets] and \"entries\": ["},
+                           "define power": ["x"], "version": 2, "flag": True, "entries": ROWS, "after": [1]})
+    assert read_all(document, read_size) == ROWS
+
+
+@pytest.mark.parametrize("read_size", [1, 2, 3, 5, 7, 64 * 1024])
+def test_top_level_arrays_and_split_numbers(read_size):
+    assert read_all(json.dumps(ROWS), read_size) == ROWS
+    assert read_all("[1.5e3, 12345678, -0.5, true, null]", read_size) == [1500.0, 12345678, -0.5, True, None]
+
+
+@pytest.mark.parametrize("text", ['{"version": 2}', '{}', '"just a string"', ''])
+def test_documents_without_an_array_yield_nothing(text):
+    assert read_all(text, 4) == []
+
+
+def test_truncated_array_raises():
+    with pytest.raises(json.JSONDecodeError):
+        read_all('[{"question": "q", "answer": "a"}, {"question": ', 8)
+
+
+def test_row_pair_keeps_only_usable_answers():
+    assert row_pair({"question": " q ", "answer": ["a", "", 3]}) == ("q", ["a"])
+    assert row_pair({"question": "q", "answer": ""}) is None
+    assert row_pair(["q", "a"]) is None
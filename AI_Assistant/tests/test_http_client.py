@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+import requests
+
+from http_client import AsyncHttpClient, CircuitBreaker, CircuitOpenError, HttpClient, get_breaker
+
+
+class RaisingSession:
+    """Stand-in for requests.Session whose get raises the given exception."""
+
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    def get(self, url, params=None, timeout=None):
+        self.calls += 1
+        raise self.error
+
+
+def client_raising(error):
+    client = HttpClient(max_retries=0)
+    client.session = RaisingSession(error)
+    return client
+
+
+def test_repeated_failures_open_the_circuit():
+    url = "http://failing.invalid/search"
+    client = client_raising(requests.ConnectionError("refused"))
+    for _ in range(get_breaker(url).failure_threshold):
+        with pytest.raises(requests.ConnectionError):
+            client.get(url)
+    with pytest.raises(CircuitOpenError):
+        client.get(url)
+    assert client.session.calls == get_breaker(url).failure_threshold
+
+
+def test_interrupted_requests_do_not_open_the_circuit():
+    url = "http://interrupted.invalid/search"
+    client = client_raising(KeyboardInterrupt())
+    for _ in range(get_breaker(url).failure_threshold + 2):
+        with pytest.raises(KeyboardInterrupt):
+            client.get(url)
+    assert get_breaker(url).state == 'closed'
+    assert get_breaker(url).failures == 0
+
+
+def test_cancelled_trial_frees_the_slot_for_the_next_request():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow()  # Half-open: this request is the trial
+    assert not breaker.allow()
+    breaker.release()  # The trial was cancelled
+    assert breaker.allow()
+
+
+def test_async_cancellation_is_not_a_failure():
+    pytest.importorskip("httpx")
+    url = "http://cancelled.invalid/search"
+
+    class CancelledClient:
+        async def get(self, url, params=None):
+            raise asyncio.CancelledError()
+
+    async def run():
+        client = AsyncHttpClient(max_retries=0)
+        await client.aclose()
+        client.client = CancelledClient()
+        for _ in range(get_breaker(url).failure_threshold + 2):
+            with pytest.raises(asyncio.CancelledError):
+                await client.get(url)
+
+    asyncio.run(run())
+    assert get_breaker(url).state == 'closed'
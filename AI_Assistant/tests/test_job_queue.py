@@ -0,0 +1,85 @@
+import sqlite3
+import threading
+
+from job_queue import JobQueue
+
+
+def rows(path):
+    with sqlite3.connect(path) as connection:
+        return connection.execute("SELECT kind, args FROM jobs ORDER BY id").fetchall()
+
+
+def test_jobs_run_in_submission_order():
+    done = []
+    queue = JobQueue(handlers={'note': done.append}, flushers={})
+    for i in range(50):
+        assert queue.submit('note', i)
+    assert queue.join(2)
+    queue.close()
+    assert done == list(range(50))
+
+
+def test_full_queue_rejects_instead_of_growing():
+    release = threading.Event()
+    queue = JobQueue(maxsize=2, handlers={'wait': lambda: release.wait(2)}, flushers={})
+    results = [queue.submit('wait', timeout=0.01) for _ in range(4)]
+    release.set()
+    queue.join(2)
+    queue.close()
+    assert results.count(False) >= 1
+    assert queue.stats()['rejected'] == results.count(False)
+
+
+def test_failed_job_does_not_stop_the_queue():
+    done = []
+
+    def handler(value):
+        if value == 'bad':
+            raise ValueError(value)
+        done.append(value)
+
+    queue = JobQueue(handlers={'note': handler}, flushers={})
+    for value in ('a', 'bad', 'b'):
+        queue.submit('note', value)
+    queue.join(2)
+    queue.close()
+    assert done == ['a', 'b']
+    assert queue.stats()['failed'] == 1
+
+
+def test_durable_jobs_left_over_are_replayed_on_restart(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    stopped = JobQueue(workers=0, disk_path=path, handlers={}, flushers={})  # Dies before running anything
+    stopped.submit('note', 'first', 1)
+    stopped.submit('note', 'second', 2)
+    stopped.close(timeout=0)
+    assert rows(path) == [('note', '["first", 1]'), ('note', '["second", 2]')]
+
+    done = []
+    queue = JobQueue(disk_path=path, handlers={'note': lambda name, number: done.append((name, number))},
+                     flushers={})
+    assert queue.join(2)
+    queue.close()
+
+    assert done == [('first', 1), ('second', 2)]
+    assert rows(path) == []
+
+
+def test_durable_rows_are_kept_until_the_flusher_succeeds(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    buffered, flushed = [], []
+
+    def failing_flush(batch):
+        raise OSError("disk full")
+
+    queue = JobQueue(disk_path=path, handlers={'learn': buffered.append}, flushers={'learn': failing_flush})
+    queue.submit('learn', 'hello')
+    queue.close()
+    assert buffered == ['hello']
+    assert rows(path) == [('learn', '["hello"]')]  # Ran, but its effect never reached disk
+
+    queue = JobQueue(disk_path=path, handlers={'learn': buffered.append}, flushers={'learn': flushed.extend})
+    queue.close()
+    assert buffered == ['hello', 'hello']
+    assert flushed == [['hello']]
+    assert rows(path) == []
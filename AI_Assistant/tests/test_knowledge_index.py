@@ -0,0 +1,50 @@
+import random
+import time
+
+from benchmarks.run import question, typo
+from knowledge_index import QuestionIndex, same_content
+
+
+def entry(text, answer="answer"):
+    return {"question": text, "answer": [answer]}
+
+
+def test_lookup_ignores_case_punctuation_and_spacing():
+    index = QuestionIndex([entry("What is the capital of France?", "Paris")])
+    assert index.lookup("  what IS the capital of france ")["answer"] == ["Paris"]
+    assert index.lookup("what is the capital of spain") is None
+
+
+def test_best_match_tolerates_typos_but_not_other_questions():
+    index = QuestionIndex([entry("What is the capital of France?", "Paris"), entry("How are you?", "Fine")])
+    assert index.best_match("what is the capital of frnace")["answer"] == ["Paris"]
+    assert index.best_match("what is the capital of japan") is None
+    assert index.best_match("how old are you") is None
+    assert not same_content("capital of japan", "capital of france")
+
+
+def test_entries_added_after_the_first_fuzzy_search_are_found():
+    entries = [entry("What is dark matter?")]
+    index = QuestionIndex(entries)
+    index.search("what is dark matter")  # Builds the trigram index
+    entries.append(entry("What is photosynthesis?", "Plants"))
+    assert index.best_match("what is photosynthesys")["answer"] == ["Plants"]
+
+
+def test_fuzzy_search_stays_fast_on_a_large_corpus():
+    size = 20_000
+    index = QuestionIndex([entry(question(i)) for i in range(size)])
+    index.build_fuzzy()
+    rng = random.Random(0)
+    queries = [typo(question(rng.randrange(size)), rng) for _ in range(200)]
+
+    latencies, found = [], 0
+    for query in queries:
+        started = time.perf_counter()
+        found += index.best_match(query) is not None
+        latencies.append(time.perf_counter() - started)
+
+    latencies.sort()
+    assert found >= 0.85 * len(queries)
+    # Sub-millisecond on a laptop; the margin keeps slow CI machines from failing on noise
+    assert latencies[len(latencies) // 2] < 0.003
@@ -0,0 +1,220 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from compact_store import CompactEntry, CompactLearningData, StringPool
+from dataManagement import LearningDataManager, ReadWriteLock
+from learning_store import SNAPSHOT_VERSION, LearningStore, merge_entry
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def write_json(path, data):
+    with open(path, 'w') as file:
+        json.dump(data, file)
+
+
+def test_torn_final_log_line_is_skipped_and_repaired(tmp_path):
+    filename = str(tmp_path / 'learning.json')
+    store = LearningStore(filename)
+    store.append("what is a star", "A ball of plasma.")
+    with open(store.log_filename, 'a') as file:
+        file.write('{"question": "what is a pla')  # Killed in the middle of a write
+
+    data = LearningStore(filename).load()
+    assert [entry['question'] for entry in data['entries']] == ["what is a star"]
+
+    # The torn line was terminated, so the next record starts on a line of its own
+    store = LearningStore(filename)
+    store.load()
+    store.append("what is a planet", "A body orbiting a star.")
+    questions = [entry['question'] for entry in LearningStore(filename).load()['entries']]
+    assert questions == ["what is a star", "what is a planet"]
+
+
+def test_log_is_replayed_after_the_process_is_killed(tmp_path):
+    filename = str(tmp_path / 'learning.json')
+    script = (
+        "import os, signal\n"
+        "from dataManagement import LearningDataManager, ReadWriteLock\n"
+        f"manager = LearningDataManager({filename!r}, flush_interval=60)\n"
+        "manager.add_entry('what is a comet', 'An icy body.')\n"
+        "manager.add_entry('what is a comet', 'A dirty snowball.')\n"
+        "manager.flush()\n"
+        "os.kill(os.getpid(), signal.SIGKILL)\n"  # No close(), no compaction, no atexit handlers
+    )
+    result = subprocess.run([sys.executable, '-c', script], cwd=HERE)
+    assert result.returncode == -signal.SIGKILL
+
+    entry = LearningStore(filename).load()['entries'][0]
+    assert entry['question'] == 'what is a comet'
+    assert entry['answer'] == ['An icy body.', 'A dirty snowball.']
+
+
+def test_replaying_a_record_twice_changes_nothing(tmp_path):
+    filename = str(tmp_path / 'learning.json')
+    store = LearningStore(filename)
+    store.append("hello", ["Hi!", "Hey!"])
+    store.append("hello", "Hi!")
+
+    data = LearningStore(filename).load()
+    assert data['entries'][0]['answer'] == ["Hi!", "Hey!"]
+
+
+def test_compaction_writes_the_snapshot_and_truncates_the_log(tmp_path):
+    filename = str(tmp_path / 'learning.json')
+    store = LearningStore(filename, compact_every=2)
+    write_json(filename, {"version": SNAPSHOT_VERSION, "entries": []})
+    store.append_many([("hello", "Hi!"), ("bye", "Goodbye!")])
+    assert store.needs_compaction()
+
+    data = LearningStore(filename).load()
+    store.compact(data)
+
+    assert os.path.getsize(store.log_filename) == 0
+    assert not store.needs_compaction()
+    with open(filename) as file:
+        saved = json.load(file)
+    assert saved['version'] == SNAPSHOT_VERSION
+    assert [entry['question'] for entry in saved['entries']] == ["hello", "bye"]
+    assert LearningStore(filename).load() == saved
+
+
+def test_loose_question_keys_are_migrated_into_entries(tmp_path):
+    filename = str(tmp_path / 'learning.json')
+    write_json(filename, {
+        "entries": [{"question": "define power", "answer": ["Energy per unit time."], "follow_ups": [],
+                     "feedback": None}],
+        "define power": "The rate of doing work.",
+        "hello": ["Hi!"],
+        "broken": 42,  # Not an answer; dropped
+    })
+
+    data = LearningStore(filename).load()
+
+    assert data['version'] == SNAPSHOT_VERSION
+    assert set(data) == {'entries', 'version'}
+    by_question = {entry['question']: entry['answer'] for entry in data['entries']}
+    assert by_question == {"define power": ["Energy per unit time.", "The rate of doing work."],
+                           "hello": ["Hi!"]}
+    with open(filename) as file:
+        assert json.load(file) == data  # Migrated once, on disk
+
+
+def test_compact_entries_read_like_dicts_and_share_the_pool():
+    data = CompactLearningData({"version": SNAPSHOT_VERSION, "entries": [
+        {"question": "hello", "answer": ["Hi!", "Hey!"], "follow_ups": ["how are you"], "feedback": None},
+        {"question": "hi", "answer": ["Hey!", "Hi!"], "follow_ups": None, "feedback": "good"},
+        "not an entry",
+    ]})
+
+    hello, hi = data['entries']
+    assert data['version'] == SNAPSHOT_VERSION
+    assert dict(hello) == {"question": "hello", "answer": ["Hi!", "Hey!"], "follow_ups": ["how are you"],
+                           "feedback": None}
+    assert hi.get('follow_ups') == [] and hi['feedback'] == "good"
+    assert len(data.pool) == 3  # "Hi!", "Hey!" and "how are you", stored once
+
+
+def test_compact_entry_wraps_a_single_answer_string():
+    pool = StringPool()
+    entry = CompactEntry(pool, "hello", answer="Hi!")
+    assert entry['answer'] == ["Hi!"]  # Not ['H', 'i', '!']
+
+    entry['answer'] = "Hello there!"
+    assert entry['answer'] == ["Hello there!"]
+    entry['answer'] = entry['answer'] + ["Hi!"]
+    assert entry['answer'] == ["Hello there!", "Hi!"]
+    assert len(pool) == 2
+
+
+def test_merging_into_compact_data_adds_compact_entries():
+    data = CompactLearningData({"entries": [{"question": "hello", "answer": "Hi!"}]})
+    merge_entry(data, "Hello?", "Hey!")
+    merge_entry(data, "bye", ["Goodbye!", "Hi!"])
+
+    assert [dict(entry)['answer'] for entry in data['entries']] == [["Hi!", "Hey!"], ["Goodbye!", "Hi!"]]
+    assert all(isinstance(entry, CompactEntry) for entry in data['entries'])
+    assert len(data.pool) == 3
+
+
+def test_compact_load_round_trips_through_the_store(tmp_path):
+    filename = str(tmp_path / 'learning.json')
+    store = LearningStore(filename)
+    store.append("hello", ["Hi!", "Hey!"])
+    data = store.load(compact=True)
+    assert isinstance(data, CompactLearningData)
+    store.compact(data)
+
+    assert LearningStore(filename).load()['entries'] == [
+        {"question": "hello", "answer": ["Hi!", "Hey!"], "follow_ups": [], "feedback": None}]
+
+
+def test_manager_close_writes_what_is_queued(tmp_path):
+    filename = str(tmp_path / 'learning.json')
+    manager = LearningDataManager(filename, flush_interval=60)
+    manager.add_entry("what is a moon", "A natural satellite.")
+    assert manager.lookup("What is a moon?")['answer'] == ["A natural satellite."]
+    manager.close()
+
+    assert LearningStore(filename).load()['entries'][0]['answer'] == ["A natural satellite."]
+
+
+def test_writer_waits_for_readers_and_holds_off_new_ones():
+    lock = ReadWriteLock()
+    events = []
+
+    def writer():
+        with lock.write():
+            events.append('write')
+
+    def late_reader():
+        with lock.read():
+            events.append('late read')
+
+    with lock.read():
+        threads = [threading.Thread(target=writer)]
+        threads[0].start()
+        wait_for(lambda: lock._writers_waiting == 1)
+        threads.append(threading.Thread(target=late_reader))
+        threads[1].start()
+        time.sleep(0.05)
+        assert events == []  # The writer waits on this reader; the new reader waits on the writer
+        events.append('read')
+    for thread in threads:
+        thread.join(2)
+
+    assert events == ['read', 'write', 'late read']
+
+
+def test_writers_exclude_each_other_and_readers():
+    lock = ReadWriteLock()
+    inside = []
+    overlaps = []
+
+    def worker(mode, rounds=200):
+        for _ in range(rounds):
+            with (lock.write() if mode == 'w' else lock.read()):
+                inside.append(mode)
+                if 'w' in inside and len(inside) > 1:
+                    overlaps.append(list(inside))
+                inside.remove(mode)
+
+    threads = [threading.Thread(target=worker, args=(mode,)) for mode in 'wwrrr']
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert overlaps == []
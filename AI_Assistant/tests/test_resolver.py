@@ -0,0 +1,93 @@
+import threading
+import time
+
+from resolver import Resolver, Tier
+
+
+def slow(answer, seconds, calls=None):
+    def function(query):
+        if calls is not None:
+            calls.append(query)
+        time.sleep(seconds)
+        return answer
+    return function
+
+
+def test_preferred_tier_wins_when_it_answers_on_time():
+    resolver = Resolver([Tier('local', slow("local", 0.01), 0.1), Tier('remote', slow("remote", 0.01), 0.5)])
+    assert resolver.resolve("q") == ("local", 'local')
+    assert resolver.stats()['remote']['calls'] == 0  # Never hedged
+
+
+def test_overrunning_tier_is_hedged_and_abandoned():
+    release = threading.Event()
+    resolver = Resolver([Tier('remote', lambda q: release.wait(2) and "remote", 0.05),
+                         Tier('local', slow("local", 0.01), 0.1)], budget=1.0)
+
+    started = time.monotonic()
+    assert resolver.resolve("q") == ("local", 'local')
+    assert time.monotonic() - started < 0.5
+    release.set()
+    resolver.executor.shutdown(wait=True)
+
+    stats = resolver.stats()
+    assert stats['remote']['abandoned'] == 1
+    assert stats['local']['hits'] == 1
+
+
+def test_miss_starts_the_next_tier_without_waiting_for_its_cost():
+    resolver = Resolver([Tier('local', slow(None, 0), 1.0), Tier('remote', slow("remote", 0.01), 1.0)])
+    started = time.monotonic()
+    assert resolver.resolve("q") == ("remote", 'remote')
+    assert time.monotonic() - started < 0.5
+
+
+def test_budget_runs_out():
+    release = threading.Event()
+    resolver = Resolver([Tier('remote', lambda q: release.wait(2) and "late", 0.01)], budget=0.1)
+    started = time.monotonic()
+    assert resolver.resolve("q") == (None, None)
+    assert time.monotonic() - started < 0.5
+    release.set()
+    resolver.executor.shutdown(wait=True)
+    assert resolver.stats()['remote']['abandoned'] == 1
+
+
+def test_queued_hedge_is_cancelled_before_it_runs():
+    release = threading.Event()
+    calls = []
+    resolver = Resolver([Tier('remote', lambda q: release.wait(2) and "remote", 0.01),
+                         Tier('backup', slow("backup", 0, calls), 0.01),
+                         Tier('local', slow("local", 0), 0.001)], workers=1, budget=1.0)
+
+    # The only worker is stuck on remote, so backup is still queued when the inline tier answers
+    assert resolver.resolve("q") == ("local", 'local')
+    release.set()
+    resolver.executor.shutdown(wait=True)
+
+    assert calls == []
+    assert resolver.stats()['backup']['abandoned'] == 1
+    assert resolver._in_flight == {'remote': 0, 'backup': 0, 'local': 0}
+
+
+def test_tier_at_max_in_flight_is_skipped():
+    release = threading.Event()
+    resolver = Resolver([Tier('remote', lambda q: release.wait(2) and "remote", 0.01, max_in_flight=1),
+                         Tier('local', slow("local", 0), 0.001)], budget=1.0)
+
+    assert resolver.resolve("a") == ("local", 'local')  # remote abandoned but still running
+    assert resolver.resolve("b") == ("local", 'local')
+    release.set()
+    resolver.executor.shutdown(wait=True)
+
+    assert resolver.stats()['remote']['skipped'] == 1
+    assert resolver.stats()['remote']['abandoned'] == 1
+
+
+def test_tier_errors_count_as_misses():
+    def broken(query):
+        raise RuntimeError("upstream down")
+
+    resolver = Resolver([Tier('remote', broken, 0.1), Tier('local', slow("local", 0), 0.001)])
+    assert resolver.resolve("q") == ("local", 'local')
+    assert resolver.stats()['remote']['errors'] == 1
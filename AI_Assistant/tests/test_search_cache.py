@@ -0,0 +1,118 @@
+import threading
+import time
+
+import pytest
+
+from search_cache import SearchCache, cache_key
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = SearchCache()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(2)
+        return "answer"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch("k", fetch))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: cache.coalesced == 7)  # Everyone but the leader is waiting on its flight
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ["answer"] * 8
+    assert cache.stats()["misses"] == 1
+
+
+def test_fetch_error_reaches_every_caller_and_is_not_cached():
+    cache = SearchCache()
+    release = threading.Event()
+
+    def failing():
+        release.wait(2)
+        raise RuntimeError("upstream down")
+
+    errors = []
+
+    def call():
+        try:
+            cache.get_or_fetch("k", failing)
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: cache.coalesced == 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == 3
+    assert cache.get_or_fetch("k", lambda: "recovered") == "recovered"
+
+
+def test_entries_expire_after_ttl():
+    cache = SearchCache(ttl=0.05)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.get_or_fetch("k", fetch) == 1
+    assert cache.get_or_fetch("k", fetch) == 1  # Fresh: served from memory
+    time.sleep(0.1)
+    assert cache.get_or_fetch("k", fetch) == 2
+    assert cache.stats()["entries"] == 1
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = SearchCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.lookup("a") == (True, 1)  # a is now the most recently used
+    cache.put("c", 3)
+
+    assert cache.lookup("b") == (False, None)
+    assert cache.lookup("a") == (True, 1)
+    assert cache.lookup("c") == (True, 3)
+
+
+def test_byte_budget_evicts_and_skips_oversized_values():
+    cache = SearchCache(max_bytes=100)
+    cache.put("a", "x" * 40)
+    cache.put("b", "y" * 40)
+    assert cache.stats()["entries"] == 2
+    cache.put("c", "z" * 40)  # Over budget: the oldest goes
+    assert cache.lookup("a") == (False, None)
+    cache.put("huge", "w" * 200)  # Bigger than the whole budget: never cached
+    assert cache.lookup("huge") == (False, None)
+    assert cache.stats()["bytes"] <= 100
+
+
+def test_disk_results_survive_a_new_cache(tmp_path):
+    path = str(tmp_path / "search.sqlite")
+    SearchCache(disk_path=path).put("k", {"snippet": "text"})
+
+    cache = SearchCache(disk_path=path)
+    assert cache.get_or_fetch("k", lambda: pytest.fail("should be served from disk")) == {"snippet": "text"}
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_cache_key_ignores_case_and_spacing():
+    assert cache_key("ddg", "  What IS   python ") == cache_key("ddg", "what is python")
+    assert cache_key("ddg", "python") != cache_key("wiki", "python")
@@ -0,0 +1,74 @@
+import time
+
+from sessions import SessionStore
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+ENTRIES = {
+    "hello": {"question": "hello", "answer": ["Hi!"],
+              "follow_ups": ["How are you?", "define love", "your follow-up question here"]},
+    "what is a star": {"question": "what is a star", "answer": ["A ball of plasma."],
+                       "follow_ups": ["what is a planet"]},
+}
+
+
+def make_store(**kwargs):
+    resolved = []
+
+    def resolve(question):
+        resolved.append(question)
+        return f"answer to {question}"
+
+    store = SessionStore(lambda question: ENTRIES.get(question.lower()), resolve, **kwargs)
+    return store, resolved
+
+
+def test_predicted_follow_up_is_answered_from_the_session():
+    store, resolved = make_store()
+    store.record('s1', "hello", ["Hi!"])
+    wait_for(lambda: store.stats()['prefetched'] == 1 and store.stats()['pending'] == 0)
+
+    assert resolved == ["How are you?"]  # Definitions and the placeholder are never prefetched
+    assert store.answer('s1', "how are you") == "answer to How are you?"
+    assert store.answer('s1', "how are you") is None  # Used up
+    assert store.answer('s2', "how are you") is None  # Other sessions have their own predictions
+    assert store.stats()['hits'] == 1 and store.stats()['misses'] == 2
+
+
+def test_predictions_follow_the_latest_turn():
+    store, _ = make_store()
+    store.record('s1', "hello", ["Hi!"])
+    wait_for(lambda: store.stats()['pending'] == 0)
+    store.record('s1', "what is a star", ["A ball of plasma."])
+    wait_for(lambda: store.stats()['pending'] == 0)
+
+    assert store.answer('s1', "how are you") is None
+    assert store.answer('s1', "What is a planet?") == "answer to what is a planet"
+    assert store.history('s1') == [("hello", ["Hi!"]), ("what is a star", ["A ball of plasma."])]
+
+
+def test_commands_are_not_prefetched():
+    store, resolved = make_store()
+    store.record('s1', "#hello", "Executing: hello")
+    time.sleep(0.05)
+    assert resolved == [] and store.stats()['pending'] == 0
+
+
+def test_idle_and_excess_sessions_are_dropped():
+    store, _ = make_store(max_sessions=2)
+    for session_id in ('a', 'b', 'c'):
+        store.record(session_id, "#noop", "")
+    assert len(store) == 2
+    assert store.history('a') == []
+
+    store, _ = make_store(idle_timeout=0.01)
+    store.record('a', "#noop", "")
+    time.sleep(0.02)
+    store.record('b', "#noop", "")
+    assert store.history('a') == [] and len(store) == 1
@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+from dataManagement import LearningDataManager
+from learning_store import LearningStore
+from snapshot import SnapshotReader, compile_snapshot, is_fresh
+
+ENTRIES = [
+    {"question": "What is dark matter?", "answer": ["Matter that does not emit light."], "follow_ups": [],
+     "feedback": None},
+    {"question": "Explain black holes.", "answer": ["Regions light cannot escape."], "follow_ups": ["Why?"],
+     "feedback": {"helpful": True}},
+]
+
+
+@pytest.fixture
+def learning_file(tmp_path):
+    path = tmp_path / "learning.json"
+    path.write_text(json.dumps({"entries": ENTRIES}))
+    return str(path)
+
+
+@pytest.fixture
+def snapshot_manager(learning_file):
+    compile_snapshot(LearningStore(learning_file).load(), learning_file.replace(".json", ".snapshot"))
+    manager = LearningDataManager(learning_file)
+    yield manager
+    manager.close()
+
+
+def test_snapshot_lookups_match_the_json(learning_file, tmp_path):
+    path = str(tmp_path / "learning.snapshot")
+    compile_snapshot(LearningStore(learning_file).load(), path)
+    reader = SnapshotReader(path)
+
+    for entry in ENTRIES:
+        assert reader.lookup(entry["question"].upper()) == entry
+    assert reader.lookup("what is antimatter") is None
+    assert list(reader.questions()) == [entry["question"] for entry in ENTRIES]
+    assert is_fresh(path, learning_file)
+
+
+def test_manager_serves_from_the_snapshot_without_parsing_json(snapshot_manager):
+    assert snapshot_manager.snapshot is not None
+    assert snapshot_manager.lookup("what is dark matter")["answer"] == ENTRIES[0]["answer"]
+    assert snapshot_manager._data is None
+
+
+def test_writes_are_served_over_the_snapshot(snapshot_manager):
+    snapshot_manager.add_entry("What is dark matter?", "Still a mystery.")
+    assert snapshot_manager.lookup("what is dark matter")["answer"] == ENTRIES[0]["answer"] + ["Still a mystery."]
+    assert snapshot_manager.lookup("explain black holes")["answer"] == ENTRIES[1]["answer"]
+
+
+def test_semantic_index_is_built_from_snapshot_questions(snapshot_manager):
+    pytest.importorskip("numpy")
+    index = snapshot_manager.vector_index()
+    match = index.search("explain the black holes", top_k=1)[0][1]
+
+    assert snapshot_manager.lookup(match["question"])["answer"] == ENTRIES[1]["answer"]
+    assert snapshot_manager._data is None  # The JSON was never parsed
+
+    snapshot_manager.add_entry("What is a pulsar?", "A spinning neutron star.")
+    match = index.search("what is pulsar", top_k=1)[0][1]
+    assert snapshot_manager.lookup(match["question"])["answer"] == ["A spinning neutron star."]
+
+
+def wait_for(function, timeout=5.0):
+    import time
+    deadline = time.monotonic() + timeout
+    while (result := function()) is None:
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+    return result
+
+
+def test_workers_build_fuzzy_and_semantic_indexes_from_the_snapshot(learning_file, tmp_path):
+    from dataManagement import SharedSnapshotData
+    path = str(tmp_path / "learning.snapshot")
+    compile_snapshot(LearningStore(learning_file).load(), path)
+    submitted = []
+    worker = SharedSnapshotData(path, lambda question, answer: submitted.append((question, answer)))
+
+    assert worker.lookup("what is dark mater", fuzzy=True) is None  # Starts building the fuzzy index
+    wait_for(worker._question_index)
+    assert worker.lookup("what is dark mater", fuzzy=True)["answer"] == ENTRIES[0]["answer"]
+
+    pytest.importorskip("numpy")
+    index = wait_for(worker.vector_index)
+    assert index.search("explain the black holes", top_k=1)[0][1] == {"question": "Explain black holes."}
+
+    worker.add_entry("What is a pulsar?", "A spinning neutron star.")
+    assert submitted == [("What is a pulsar?", "A spinning neutron star.")]
@@ -0,0 +1,79 @@
+import os
+import threading
+import time
+
+import tts_cache
+from tts_cache import TTSCache
+
+
+def write_bytes(size):
+    def synthesize(text, lang, voice, path):
+        with open(path, 'wb') as file:
+            file.write(b'x' * size)
+    return synthesize
+
+
+def age(path, seconds):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_hit_touches_the_file(tmp_path):
+    cache = TTSCache(str(tmp_path), synthesize=write_bytes(10))
+    path = cache.get_audio("hello")
+    age(path, 3600)
+
+    assert cache.get_audio("hello") == path
+    assert time.time() - os.path.getmtime(path) < 5
+    assert cache.stats() == {"hits": 1, "misses": 1, "files": 1, "bytes": 10}
+
+
+def test_file_handed_out_recently_is_not_evicted(tmp_path):
+    cache = TTSCache(str(tmp_path), max_bytes=15, synthesize=write_bytes(10))
+    first = cache.get_audio("first")
+    second = cache.get_audio("second")  # Over the limit, but first was only just handed out
+
+    assert os.path.exists(first) and os.path.exists(second)
+    assert cache.stats()["bytes"] == 20
+
+    age(first, tts_cache.EVICTION_GRACE + 1)
+    age(second, tts_cache.EVICTION_GRACE + 1)
+    third = cache.get_audio("third")
+    assert not os.path.exists(first) and not os.path.exists(second)
+    assert os.path.exists(third)
+    assert cache.stats()["bytes"] == 10
+
+
+def test_touch_from_another_process_protects_a_file(tmp_path):
+    cache = TTSCache(str(tmp_path), max_bytes=25, synthesize=write_bytes(10))
+    first = cache.get_audio("first")
+    second = cache.get_audio("second")
+    age(first, tts_cache.EVICTION_GRACE + 1)
+    age(second, tts_cache.EVICTION_GRACE + 1)
+    TTSCache(str(tmp_path), synthesize=write_bytes(10)).get_audio("first")  # Another worker's hit
+
+    cache.get_audio("third")
+
+    assert os.path.exists(first)  # Least recently used here, but just used elsewhere
+    assert not os.path.exists(second)
+
+
+def test_evicted_path_is_never_handed_out_during_a_burst(tmp_path):
+    cache = TTSCache(str(tmp_path), max_bytes=30, synthesize=write_bytes(10))
+    missing = []
+
+    def speak(texts):
+        for text in texts:
+            path = cache.get_audio(text)
+            time.sleep(0.001)  # Between getting the path and opening it
+            if not os.path.exists(path):
+                missing.append(text)
+
+    threads = [threading.Thread(target=speak, args=([f"reply {i}" for i in range(n, n + 40)],))
+               for n in range(0, 80, 20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert missing == []
@@ -0,0 +1,52 @@
+import threading
+import time
+
+from tts_stream import split_sentences, stream_speech
+
+
+class FileCache:
+    """Stand-in for the TTS cache: writes each chunk's text as its 'audio' after a per-chunk delay."""
+
+    def __init__(self, directory, delays=None):
+        self.directory = directory
+        self.delays = delays or {}
+        self.rendered = []
+        self._lock = threading.Lock()
+
+    def get_audio(self, text):
+        time.sleep(self.delays.get(text, 0.0))
+        with self._lock:
+            self.rendered.append(text)
+            path = self.directory / f"{len(self.rendered)}.mp3"
+        path.write_bytes(f"<{text}>".encode())
+        return str(path)
+
+
+def test_split_sentences_keeps_order_and_limits_length():
+    text = "First one. Second one! " + "word, " * 60 + "end."
+    chunks = split_sentences(text, max_chars=50)
+    assert chunks[:2] == ["First one.", "Second one!"]
+    assert all(len(chunk) <= 50 for chunk in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+
+def test_chunks_are_streamed_in_sentence_order(tmp_path):
+    # The first sentence renders slowest, so synthesis finishes out of order
+    cache = FileCache(tmp_path, delays={"One.": 0.15, "Two.": 0.05})
+    audio = b"".join(stream_speech("One. Two. Three.", cache=cache, workers=3))
+
+    assert audio == b"<One.><Two.><Three.>"
+    assert cache.rendered[0] != "One."
+
+
+def test_closing_the_stream_skips_chunks_not_yet_started(tmp_path):
+    cache = FileCache(tmp_path, delays={f"Sentence {i}.": 0.02 for i in range(10)})
+    stream = stream_speech(" ".join(f"Sentence {i}." for i in range(10)), cache=cache, workers=1)
+
+    assert next(stream) == b"<Sentence 0.>"
+    stream.close()  # Client went away
+    assert len(cache.rendered) < 10
+
+
+def test_empty_text_streams_nothing(tmp_path):
+    assert list(stream_speech("   ", cache=FileCache(tmp_path))) == []
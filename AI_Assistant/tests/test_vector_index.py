@@ -0,0 +1,42 @@
+import json
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from vector_index import VectorIndex
+
+LEARNING_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "learning.json")
+
+
+@pytest.fixture(scope="module")
+def index():
+    with open(LEARNING_FILE) as file:  # Read directly: LearningStore.load would migrate the checked-in file
+        return VectorIndex(json.load(file)["entries"])
+
+
+@pytest.mark.parametrize("query", ["what is the capital of japan", "how old are you", "define love"])
+def test_questions_about_something_else_are_not_answered(index, query):
+    assert index.search(query, top_k=1) == []
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("tell me about black holes", "explain black holes"),
+    ("explain dark matter", "what is dark matter"),
+    ("what is quantum physics about", "what is quantum physics"),
+])
+def test_paraphrases_still_match(index, query, expected):
+    matches = index.search(query, top_k=1)
+    assert matches and matches[0][1]["question"].lower().rstrip("?.") == expected
+
+
+def test_cache_round_trip(tmp_path):
+    entries = [{"question": "What is a black hole?", "answer": ["A region of spacetime."]},
+               {"question": "How are you?", "answer": ["Fine."]}]
+    path = str(tmp_path / "learning_vectors.npy")
+    VectorIndex(entries, path=path).save()
+
+    loaded = VectorIndex(entries, path=path)
+    assert len(loaded) == 2 and loaded._tail_rows == 0  # Rows came from the saved matrix
+    assert loaded.search("what is a black hole")[0][1] is entries[0]
@@ -0,0 +1,138 @@
+import threading
+
+from voice_pipeline import Player, RecordingBackend, VoicePipeline, text_recognizer
+
+
+class SignallingBackend(RecordingBackend):
+    """RecordingBackend that lets the test know when a reply has started playing."""
+
+    def __init__(self, seconds):
+        super().__init__(seconds)
+        self.playing = threading.Event()
+
+    def play(self, path):
+        self.playing.set()
+        super().play(path)
+
+
+class GatedSource:
+    """Returns each phrase once its gate (an Event, or None for no wait) is set, then None."""
+
+    def __init__(self, steps):
+        self._steps = iter(steps)
+
+    def __call__(self):
+        phrase, gate = next(self._steps, (None, None))
+        if gate is not None:
+            assert gate.wait(2), "gate never opened"
+        return phrase
+
+
+def run(source, backend, barge_in=True, answer=None):
+    pipeline = VoicePipeline(answer=answer or (lambda text: f"You said: {text}"), source=source,
+                             recognize=text_recognizer, synthesize=lambda text: text,
+                             player=Player(backend), barge_in=barge_in)
+    pipeline.run()
+    return backend.played
+
+
+def test_new_command_stops_the_reply_being_played():
+    backend = SignallingBackend(seconds=0.5)
+    source = GatedSource([("first", None), ("second", backend.playing), ("exit", None)])
+    played = run(source, backend)
+
+    assert played[0] == ("You said: first", "stopped")
+    assert played[-1] == ("You said: second", "finished")
+    assert backend.stopped >= 1
+
+
+def test_without_barge_in_replies_play_in_order():
+    backend = SignallingBackend(seconds=0.05)
+    source = GatedSource([("first", None), ("second", backend.playing), ("exit", None)])
+
+    assert run(source, backend, barge_in=False) == [("You said: first", "finished"),
+                                                    ("You said: second", "finished")]
+    assert backend.stopped == 0
+
+
+def test_superseded_answer_is_never_played():
+    second_recognized = threading.Event()
+
+    def answer(text):
+        if text == "first":
+            assert second_recognized.wait(2)  # Still thinking when the user asks something else
+        return f"You said: {text}"
+
+    def recognize(audio):
+        if audio == "second":
+            second_recognized.set()
+        return audio
+
+    backend = RecordingBackend()
+    source = GatedSource([("first", None), ("second", None), ("exit", None)])
+    pipeline = VoicePipeline(answer=answer, source=source, recognize=recognize, synthesize=lambda text: text,
+                             player=Player(backend))
+    pipeline.run()
+
+    assert backend.played == [("You said: second", "finished")]
+
+
+def test_unrecognized_audio_is_skipped():
+    backend = RecordingBackend()
+    source = GatedSource([("  ", None), ("hello", None)])
+
+    assert run(source, backend) == [("You said: hello", "finished")]
+
+
+class GatedBackend(RecordingBackend):
+    """RecordingBackend that waits for a gate after a file is dequeued and before it starts playing."""
+
+    def __init__(self, seconds):
+        super().__init__(seconds)
+        self.dequeued = threading.Event()
+        self.gate = threading.Event()
+
+    def play(self, path):
+        self.dequeued.set()
+        assert self.gate.wait(2), "gate never opened"
+        super().play(path)
+
+
+def test_cancel_before_playback_starts_stops_the_file():
+    backend = GatedBackend(seconds=5)
+    player = Player(backend)
+    player.enqueue("reply")
+    assert backend.dequeued.wait(2)
+    player.cancel()  # Taken off the queue, but play() has not started yet
+    backend.gate.set()
+    player.close()
+
+    assert backend.played == [("reply", "stopped")]
+
+
+def test_cancel_drops_queued_files_and_the_next_one_plays():
+    backend = SignallingBackend(seconds=5)
+    player = Player(backend)
+    player.enqueue("first")
+    player.enqueue("second")
+    assert backend.playing.wait(2)
+    player.cancel()
+    backend.seconds = 0
+    player.enqueue("third")
+    player.close()
+
+    assert backend.played == [("first", "stopped"), ("third", "finished")]
+
+
+def test_cancel_while_closing_still_lets_the_player_stop():
+    backend = SignallingBackend(seconds=5)
+    player = Player(backend)
+    player.enqueue("first")
+    assert backend.playing.wait(2)
+    closer = threading.Thread(target=player.close)
+    closer.start()
+    player.cancel()
+    closer.join(2)
+
+    assert not closer.is_alive()
+    assert backend.played == [("first", "stopped")]
@@ -0,0 +1,119 @@
+import asyncio
+import importlib
+import json
+import os
+
+import pytest
+import requests
+
+pytest.importorskip("flask")
+pytest.importorskip("quart")
+
+LEARNED = {"entries": [{"question": "What is dark matter?", "answer": ["Matter that does not emit light."],
+                        "follow_ups": [], "feedback": None}]}
+
+
+@pytest.fixture(scope="module")
+def apps(tmp_path_factory):
+    """Both apps over a throwaway learning file (they share its knowledge base)."""
+    directory = tmp_path_factory.mktemp("apps")
+    learning_file = str(directory / "learning.json")
+    with open(learning_file, "w") as file:
+        json.dump(LEARNED, file)
+    previous = os.environ.get("ASSISTANT_LEARNING_FILE")
+    os.environ["ASSISTANT_LEARNING_FILE"] = learning_file
+    try:
+        yield importlib.import_module("app"), importlib.import_module("asgi_app")
+    finally:
+        if previous is None:
+            os.environ.pop("ASSISTANT_LEARNING_FILE")
+        else:
+            os.environ["ASSISTANT_LEARNING_FILE"] = previous
+
+
+def routes(app):
+    return {(rule.rule, method) for rule in app.url_map.iter_rules() if rule.endpoint != "static"
+            for method in rule.methods - {"HEAD", "OPTIONS"}}
+
+
+def ask_asgi(asgi_app, path, payload=None):
+    async def run():
+        async with asgi_app.app.test_app() as test_app:
+            client = test_app.test_client()
+            response = await (client.post(path, json=payload) if payload is not None else client.get(path))
+            return response.status_code, await response.get_json()
+    return asyncio.run(run())
+
+
+def test_both_apps_serve_the_same_routes(apps):
+    flask_app, asgi_app = apps
+    assert routes(flask_app.app) == routes(asgi_app.app)
+
+
+def test_stats_routes_answer(apps):
+    _, asgi_app = apps
+    for path in ("/resolver", "/jobs", "/sessions", "/metrics/profiles", "/search_cache"):
+        status, _ = ask_asgi(asgi_app, path)
+        assert status == 200, path
+    status, body = ask_asgi(asgi_app, "/resolver")
+    assert set(body["ask"]) == {"remote", "local"}
+
+
+def test_quoted_ask_falls_back_to_the_learned_answer_when_search_fails(apps, monkeypatch):
+    flask_app, asgi_app = apps
+
+    def offline(query):
+        raise requests.ConnectionError("network is down")
+
+    async def offline_async(query):
+        offline(query)
+
+    monkeypatch.setattr(asgi_app, "search_snippet", offline_async)
+    monkeypatch.setattr(flask_app.search_resolver.tiers[0], "function", offline)
+    _, body = ask_asgi(asgi_app, "/ask", {"input": '"what is dark matter"'})
+    flask_body = flask_app.app.test_client().post("/ask", json={"input": '"what is dark matter"'}).get_json()
+
+    assert body == flask_body == {"entries": LEARNED["entries"][0]["answer"]}
+
+
+def test_slow_search_is_hedged_with_the_learned_answer(apps, monkeypatch):
+    _, asgi_app = apps
+
+    async def slow(query):
+        await asyncio.sleep(0.5)
+        return "A late snippet."
+
+    monkeypatch.setattr(asgi_app, "search_snippet", slow)
+    monkeypatch.setattr(asgi_app, "SEARCH_COST", 0.05)
+    abandoned = asgi_app.ask_stats["remote"].abandoned
+    _, body = ask_asgi(asgi_app, "/ask", {"input": '"what is dark matter"'})
+
+    assert body == {"entries": LEARNED["entries"][0]["answer"]}
+    assert asgi_app.ask_stats["remote"].abandoned == abandoned + 1
+
+
+def test_quoted_ask_learns_a_search_hit(apps, monkeypatch):
+    _, asgi_app = apps
+    submitted = []
+
+    async def found(query):
+        return "A snippet."
+
+    monkeypatch.setattr(asgi_app, "search_snippet", found)
+    monkeypatch.setattr(asgi_app.job_queue, "submit", lambda *job: submitted.append(job))
+    _, body = ask_asgi(asgi_app, "/ask", {"input": '"what is a quasar"'})
+
+    assert "A snippet." in body["entries"]
+    assert submitted == [("learn", asgi_app.knowledge_base.learning_file, "what is a quasar", body["entries"])]
+
+
+def test_speak_keeps_the_session(apps, monkeypatch):
+    flask_app, asgi_app = apps
+    monkeypatch.setattr(asgi_app, "respond_verbal", lambda text: "reply.mp3")
+    monkeypatch.setattr(flask_app, "respond_verbal", lambda text: "reply.mp3")
+    payload = {"input": "what is dark matter", "session_id": "s1"}
+    _, body = ask_asgi(asgi_app, "/speak", payload)
+
+    assert body == flask_app.app.test_client().post("/speak", json=payload).get_json()
+    assert body == {"entries": LEARNED["entries"][0]["answer"], "audio_file": "reply.mp3"}
+    assert asgi_app.sessions.stats()["sessions"] == 1
@@ -0,0 +1,184 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from atomic_files import replace_keeping_mode
+from metrics import registry, stage
+
+TTS_CACHE_DIR = 'tts_cache'
+TTS_CACHE_MAX_BYTES = 200 * 1024 * 1024
+EVICTION_GRACE = 60.0  # Seconds after a file was handed out (by any process) before it may be evicted
+DEFAULT_LANG = 'en'
+DEFAULT_VOICE = 'com'  # gTTS top-level domain, which selects the accent
+
+
+def gtts_synthesize(text, lang, voice, path):
+    """Render text to an MP3 file with gTTS."""
+    from gtts import gTTS  # Imported on first synthesis; cache hits never need it
+    gTTS(text=text, lang=lang, tld=voice).save(path)
+
+
+def audio_key(text, lang=DEFAULT_LANG, voice=DEFAULT_VOICE):
+    """Content address of a rendering: the same text, language and voice always map to one file."""
+    return hashlib.sha256(f"{lang}\0{voice}\0{text}".encode('utf-8')).hexdigest()
+
+
+class TTSCache:
+    """Size-bounded, content-addressed store of synthesized audio.
+
+    Files are named by audio_key, written to a temp file and renamed into
+    place, so readers never see a partial MP3 and concurrent speakers never
+    overwrite each other. The least recently used files are deleted once the
+    directory grows past max_bytes. Every hit touches the file's mtime, and
+    files touched within EVICTION_GRACE seconds are never deleted, so a path
+    handed to a player or a response is still there when it is opened (the
+    directory may overshoot max_bytes meanwhile).
+    """
+
+    def __init__(self, directory=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES, synthesize=gtts_synthesize):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.synthesize = synthesize
+        self._files = OrderedDict()  # key -> size, least recently used first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._key_locks = {}  # key -> Lock, so one text is only synthesized once at a time
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        """Rebuild the LRU order from the files already on disk (oldest access first)."""
+        found = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.mp3'):
+                stat = os.stat(os.path.join(self.directory, name))
+                found.append((stat.st_atime, name[:-4], stat.st_size))
+        for _, key, size in sorted(found):
+            self._files[key] = size
+            self._bytes += size
+
+    def path_for(self, key):
+        return os.path.join(self.directory, key + '.mp3')
+
+    def get_audio(self, text, lang=DEFAULT_LANG, voice=DEFAULT_VOICE):
+        """Return the path of an MP3 for text, synthesizing it only on a cache miss."""
+        key = audio_key(text, lang, voice)
+        path = self.path_for(key)
+        if self._touch(key):
+            return path
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                if self._touch(key):  # Another thread rendered it while we waited
+                    return path
+                with self._lock:
+                    self.misses += 1
+                fd, temp_path = tempfile.mkstemp(suffix='.mp3.tmp', dir=self.directory)
+                os.close(fd)
+                try:
+                    with stage('tts_synthesis'):
+                        self.synthesize(text, lang, voice, temp_path)
+                    replace_keeping_mode(temp_path, path)
+                except BaseException:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                    raise
+                self._add(key, os.path.getsize(path))
+        finally:
+            with self._lock:
+                self._key_locks.pop(key, None)  # Also when synthesis failed, so failed texts don't pile up
+        return path
+
+    def _touch(self, key):
+        """Mark a cached file as recently used; False if it is not cached."""
+        with self._lock:
+            if key not in self._files:
+                return False
+            try:
+                os.utime(self.path_for(key))  # Tells every process sharing the directory it is in use
+            except FileNotFoundError:
+                self._bytes -= self._files.pop(key)  # Removed outside the cache
+                return False
+            self._files.move_to_end(key)
+            self.hits += 1
+        return True
+
+    def _add(self, key, size):
+        with self._lock:
+            self._bytes -= self._files.pop(key, 0)
+            self._files[key] = size
+            self._bytes += size
+            self._evict()
+
+    def _evict(self):
+        """Delete least recently used files until under max_bytes, except ones in their grace period (lock held)."""
+        now = time.time()
+        for _ in range(len(self._files)):
+            if self._bytes <= self.max_bytes:
+                return
+            key, size = next(iter(self._files.items()))
+            path = self.path_for(key)
+            try:
+                used = os.stat(path).st_mtime
+            except FileNotFoundError:
+                used = None
+            if used is not None and now - used < EVICTION_GRACE:
+                self._files.move_to_end(key)  # Handed out moments ago, here or by another process
+                continue
+            del self._files[key]
+            self._bytes -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def warm_up(self, data, lang=DEFAULT_LANG, voice=DEFAULT_VOICE, workers=4):
+        """Pre-render audio for every stored answer; returns how many were rendered or already cached."""
+        answers = {answer for entry in data.get('entries', []) if isinstance(entry, Mapping)
+                   for answer in entry.get('answer', []) if isinstance(answer, str) and answer.strip()}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(lambda answer: self._try_render(answer, lang, voice), answers)
+            return sum(1 for rendered in results if rendered)
+
+    def _try_render(self, text, lang, voice):
+        try:
+            self.get_audio(text, lang, voice)
+            return True
+        except Exception as e:
+            print(f"Could not pre-render audio for {text[:40]!r}: {e}")
+            return False
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "files": len(self._files), "bytes": self._bytes}
+
+
+_tts_cache = None
+_tts_cache_lock = threading.Lock()
+
+
+def get_tts_cache():
+    """Return the process-wide audio cache, creating its directory on first use."""
+    global _tts_cache
+    with _tts_cache_lock:
+        if _tts_cache is None:
+            _tts_cache = TTSCache()
+            registry.callback('assistant_tts_cache_lookups_total', "Audio cache lookups by result.",
+                              lambda: {result: _tts_cache.stats()[result] for result in ('hits', 'misses')},
+                              kind='counter', labelname='result')
+        return _tts_cache
+
+
+if __name__ == '__main__':
+    # Warm-up job: pre-render audio for every answer in learning.json
+    from learning_store import LearningStore
+    rendered = get_tts_cache().warm_up(LearningStore().load())
+    print(f"Audio ready for {rendered} answers.")
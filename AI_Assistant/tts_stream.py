@@ -0,0 +1,52 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from tts_cache import get_tts_cache
+
+STREAM_WORKERS = 3  # Sentence chunks synthesized in parallel
+MAX_CHUNK_CHARS = 200  # Long sentences are split further at commas / spaces
+READ_SIZE = 64 * 1024
+
+_SENTENCE_END = re.compile(r'(?<=[.!?;:])\s+|\n+')
+
+
+def split_sentences(text, max_chars=MAX_CHUNK_CHARS):
+    """Split text into sentence-sized chunks no longer than max_chars."""
+    chunks = []
+    for sentence in _SENTENCE_END.split(text):
+        sentence = sentence.strip()
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(', ', 0, max_chars)
+            if cut <= 0:
+                cut = sentence.rfind(' ', 0, max_chars)
+            cut = cut + 1 if cut > 0 else max_chars
+            chunks.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if sentence:
+            chunks.append(sentence)
+    return chunks
+
+
+def stream_speech(text, cache=None, workers=STREAM_WORKERS):
+    """Yield MP3 bytes chunk by chunk, in order, as soon as each sentence is synthesized.
+
+    Sentences are rendered through the TTS cache in a small pool, so the
+    first bytes are ready after the first sentence instead of the whole
+    answer; MP3 frames from consecutive chunks concatenate into one stream.
+    """
+    cache = cache or get_tts_cache()
+    chunks = split_sentences(text)
+    if not chunks:
+        return
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(cache.get_audio, chunk) for chunk in chunks]
+        try:
+            for future in futures:
+                with open(future.result(), 'rb') as audio:
+                    while True:
+                        block = audio.read(READ_SIZE)
+                        if not block:
+                            break
+                        yield block
+        finally:
+            for future in futures:
+                future.cancel()  # Client went away: skip chunks that have not started
@@ -1,56 +1,62 @@
-import json
-import requests
-from gtts import gTTS
-import tempfile
-import string
+import random
+from knowledge_index import get_question_index
+from learning_store import LearningStore, merge_entry
+from search_cache import search_cache, cache_key
+from tts_cache import get_tts_cache
+from metrics import stage, count
+# requests/http_client and vector_index (NumPy) are imported inside the functions that need them
 
 
 # Load the learning data from learning.json
 def load_learning_data(filename='learning.json'):
-    """Load learning data from a JSON file."""
-    try:
-        with open(filename, 'r') as file:
-            data = json.load(file)
-            return data if 'entries' in data else {"entries": []}
-    except FileNotFoundError:
-        return {"entries": []}  # Return an empty structure if the file is not found
-    except json.JSONDecodeError:
-        return {"entries": []}  # Return an empty structure if JSON is malformed
+    """Load learning data from the JSON snapshot plus any records in its append log."""
+    return LearningStore(filename).load()
 
 
 def save_learning_data(data, filename='learning.json'):
-    """Save learning data to a JSON file."""
-    with open(filename, 'w') as file:
-        json.dump(data, file, indent=4) #type: ignore
+    """Save learning data as a new snapshot (atomic rename) and clear the append log."""
+    LearningStore(filename).compact(data)
+
 
+def get_ai_response(user_input, data, fuzzy=False, semantic=False, learning_file='learning.json'):
+    """Generate a response for the user's input based on learning data.
 
-def get_ai_response(user_input, data):
-    """Generate a response for the user's input based on learning data."""
+    Only exact questions are answered unless fuzzy is enabled; then a
+    question with no exact match falls back to the closest stored question
+    with the same content words (QuestionIndex.best_match). With semantic
+    enabled (and NumPy installed), the TF-IDF vector index is tried after
+    that; it is kept on disk next to learning_file, the file data came from.
+    """
     # Check if the input starts with a '#', in which case it should be passed as is
     if user_input.startswith('#'):
-        print(f"Command received: {user_input}")  # Debugging
+        count('command')
         return execute_command(user_input)
 
-    # Normalize input by converting to lowercase and stripping extra spaces
-    user_input = user_input.lower().strip()
-    user_input_no_punct = user_input.translate(str.maketrans('', '', string.punctuation))
-
     # Access the 'entries' list in the data dictionary
     entries = data.get('entries', [])
     if not isinstance(entries, list) or not entries:
-        print("No knowledge stored.")  # Debugging
+        count('empty_knowledge')
         return "Error: No knowledge stored."
 
-    # Find the corresponding entry in the data
-    existing_entry = next(
-        (entry for entry in entries if
-         entry.get('question', '').lower().translate(str.maketrans('', '', string.punctuation)) == user_input_no_punct),
-        None
-    )
+    # Find the corresponding entry through the shared normalized-question index
+    with stage('local_lookup'):
+        index = get_question_index(data)
+        existing_entry = index.best_match(user_input) if fuzzy else index.lookup(user_input)
+    if existing_entry is None and semantic:
+        from vector_index import get_vector_index, vector_path
+        with stage('semantic_lookup'):
+            vector_index = get_vector_index(data, path=vector_path(learning_file))
+            matches = vector_index.search(user_input, top_k=1) if vector_index is not None else []
+        existing_entry = matches[0][1] if matches else None
 
     # If an entry is found, return the answer
-    return existing_entry.get('answer',
-                              "Sorry, I don't have a proper answer for that.") if existing_entry else "I couldn't find any relevant information for that."
+    return answer_text(existing_entry)
+
+
+def answer_text(entry):
+    """The reply for a looked-up entry (or None)."""
+    return entry.get('answer',
+                     "Sorry, I don't have a proper answer for that.") if entry else "I couldn't find any relevant information for that."
 
 
 def execute_command(user_input):
@@ -58,49 +64,78 @@ def execute_command(user_input):
     return f"Executing: {user_input[1:].strip()}"  # Remove '#' and execute the rest of the command
 
 
-def search_internet(query):
-    """Search the internet using the Google Custom Search API and return a snippet."""
-    api_key = ''  # Replace with your actual API key
-    search_engine_id = ''  # Replace with your actual Search Engine ID
-    search_url = f"https://www.googleapis.com/customsearch/v1?key={api_key}&cx={search_engine_id}&q={query}"
+def search_internet(query, fallback=None):
+    """Search the internet using the Google Custom Search API and return a snippet.
 
+    While the upstream's circuit is open the call fails fast, returning
+    fallback() (typically the local knowledge answer) when one is given.
+    """
+    import requests
+    from http_client import CircuitOpenError
     try:
-        response = requests.get(search_url)
-        response.raise_for_status()  # Raise an error for bad responses
-        results = response.json().get('items', [])
-
-        if results:
-            snippet = results[0]['snippet']  # Get the first search result snippet
-            return f"I found some information online: {snippet} Would you like to know more about this topic?"
-        else:
-            return "I couldn't find anything relevant online."
+        # Repeated queries are served from the shared cache; concurrent ones share one request
+        snippet = search_cache.get_or_fetch(cache_key('google', query), lambda: _google_snippet(query))
+        return format_search_snippet(snippet)
+    except CircuitOpenError as e:
+        return fallback() if fallback else f"Error searching the internet: {str(e)}"
     except requests.RequestException as e:
         return f"Error searching the internet: {str(e)}"
 
 
+def search_answer(query):
+    """Formatted search snippet for a query, or None when nothing was found; errors propagate."""
+    snippet = search_cache.get_or_fetch(cache_key('google', query), lambda: _google_snippet(query))
+    return format_search_snippet(snippet) if snippet else None
+
+
+def format_search_snippet(snippet):
+    """Turn a search snippet (or None) into the reply shown to the user."""
+    if snippet:
+        return f"I found some information online: {snippet} Would you like to know more about this topic?"
+    return "I couldn't find anything relevant online."
+
+
+def google_search_url(query):
+    """Build the Google Custom Search API URL for a query."""
+    api_key = ''  # Replace with your actual API key
+    search_engine_id = ''  # Replace with your actual Search Engine ID
+    return f"https://www.googleapis.com/customsearch/v1?key={api_key}&cx={search_engine_id}&q={query}"
+
+
+def first_google_snippet(payload):
+    """Return the first result snippet of a Custom Search API response, or None."""
+    results = payload.get('items', [])
+    return results[0]['snippet'] if results else None
+
+
+def _google_snippet(query):
+    """Fetch the first Google Custom Search snippet for a query, or None."""
+    from http_client import http_client
+    with stage('remote_search'):
+        response = http_client.get(google_search_url(query))  # Pooled, timeout-bounded, retried
+        response.raise_for_status()  # Raise an error for bad responses
+        return first_google_snippet(response.json())
+
+
 def append_learning_data(user_input, response, data):
-    """Append new learning data to the dictionary."""
+    """Append new learning data to the dictionary's entries (in memory only)."""
     if isinstance(data, dict):
-        # Check if user_input already exists in data
-        if user_input not in data:
-            data[user_input] = response  # Add new entry to the dictionary
-        else:
-            # If user_input already exists, append to the existing responses
-            if isinstance(data[user_input], list):
-                data[user_input].append(response)
-            else:
-                data[user_input] = [data[user_input], response]
+        merge_entry(data, user_input, response)  # Adds the entry or appends a new answer to it
     else:
         print("Error: Data is not a dictionary.")
 
 
 def respond_verbal(response):
-    """Convert the text response to speech and save it as an audio file."""
+    """Convert the text response to speech and return the path of the cached audio file."""
     try:
-        tts = gTTS(text=response, lang='en')
-        # Create a temporary file to save the audio
-        temp_file = tempfile.NamedTemporaryFile(delete=True, suffix='.mp3')
-        tts.save(temp_file.name)  # Save the audio file
-        return temp_file.name  # Return the path to the audio file
+        # Content-addressed cache: repeated answers reuse the same MP3 instead of re-synthesizing
+        return get_tts_cache().get_audio(response)
     except Exception as e:
         return f"Error generating audio response: {str(e)}"
+
+
+def speech_text(response):
+    """Pick the text to speak for a response; stored entries hold a list of answers."""
+    if isinstance(response, list):
+        return random.choice(response) if response else ""
+    return response or ""
@@ -0,0 +1,213 @@
+import hashlib
+import json
+import math
+import os
+import tempfile
+import threading
+from collections.abc import Mapping
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; semantic retrieval is simply unavailable without it
+    np = None
+
+from atomic_files import replace_keeping_mode
+from knowledge_index import content_words, covers, forget_when_collected, normalize_question
+from learning_store import atomic_write_json
+
+VECTOR_DIMENSIONS = 1024  # Width of the hashed feature space
+VECTOR_CACHE_SUFFIX = '_vectors.npy'  # learning.json -> learning_vectors.npy (+ learning_vectors.json)
+SEMANTIC_THRESHOLD = 0.35
+SEMANTIC_CANDIDATES = 16  # Closest rows checked for content words before giving up
+AUTOSAVE_EVERY = 500  # Unsaved appended rows before the matrix is written back to disk
+
+
+def vector_path(learning_file):
+    """Path of the vector cache kept next to a learning file."""
+    return os.path.splitext(learning_file)[0] + VECTOR_CACHE_SUFFIX
+
+
+def _features(normalized):
+    """Return hashed feature ids for the words and word bigrams of a question."""
+    words = normalized.split()
+    tokens = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    return [int.from_bytes(hashlib.blake2b(token.encode(), digest_size=4).digest(), 'little') % VECTOR_DIMENSIONS
+            for token in tokens]
+
+
+class VectorIndex:
+    """Hashed TF-IDF vectors for every learned question, scored with one matrix-vector product.
+
+    Rows hold L2-normalised sublinear term frequencies and document
+    frequencies are tracked per feature, so a new question only appends a row.
+    IDF is applied on the query side (squared, since rows carry none), which
+    keeps appends independent of the rest of the matrix.
+    A matrix loaded from disk stays memory-mapped; appended rows go to an
+    in-memory tail that is merged back when the index is saved.
+    """
+
+    def __init__(self, entries, path=None):
+        if np is None:
+            raise RuntimeError("NumPy is required for semantic retrieval.")
+        self.entries = entries
+        self.path = path
+        self._base = np.zeros((0, VECTOR_DIMENSIONS), dtype=np.float32)  # Persisted rows (mmap when loaded)
+        self._tail = np.zeros((64, VECTOR_DIMENSIONS), dtype=np.float32)  # Appended rows, grown by doubling
+        self._tail_rows = 0
+        self._positions = []  # Row -> position in self.entries
+        self._questions = []  # Row -> normalized question, used to validate the disk cache
+        self._df = np.zeros(VECTOR_DIMENSIONS, dtype=np.float64)
+        self._indexed = 0
+        self._lock = threading.RLock()  # Resolver tiers may search and sync from several threads at once
+        if path and os.path.exists(path):
+            self._load()
+        self.sync()
+
+    def __len__(self):
+        return len(self._positions)
+
+    def _load(self):
+        """Reuse the persisted matrix when it still describes a prefix of the entries."""
+        try:
+            with open(self._meta_path(), 'r') as file:
+                meta = json.load(file)
+            base = np.load(self.path, mmap_mode='r')
+        except (OSError, ValueError):
+            return
+        positions, questions = meta.get('positions', []), meta.get('questions', [])
+        if base.shape != (len(positions), VECTOR_DIMENSIONS) or meta.get('indexed', 0) > len(self.entries):
+            return
+        for position, question in zip(positions, questions):
+            entry = self.entries[position]
+            if not isinstance(entry, Mapping) or normalize_question(entry.get('question', '')) != question:
+                return  # The learning data changed underneath the cache; rebuild it
+        self._base = base
+        self._positions, self._questions = list(positions), list(questions)
+        self._df = np.asarray(meta['df'], dtype=np.float64)
+        self._indexed = meta['indexed']
+
+    def _meta_path(self):
+        return os.path.splitext(self.path)[0] + '.json'
+
+    def _vectorize(self, normalized):
+        """Return the sparse (feature ids, weights) of a question."""
+        counts = {}
+        for feature in _features(normalized):
+            counts[feature] = counts.get(feature, 0) + 1
+        ids = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        weights = np.fromiter((1.0 + math.log(c) for c in counts.values()), dtype=np.float64, count=len(counts))
+        return ids, weights
+
+    def sync(self):
+        """Append rows for entries added since the last sync."""
+        with self._lock:
+            self._sync()
+
+    def _sync(self):
+        for position in range(self._indexed, len(self.entries)):
+            self.add(self.entries[position], position)
+        self._indexed = len(self.entries)
+        if self.path and self._tail_rows >= AUTOSAVE_EVERY:
+            self.save()
+
+    def add(self, entry, position):
+        """Append a row for a single entry."""
+        if not isinstance(entry, Mapping):
+            return
+        normalized = normalize_question(entry.get('question', ''))
+        if not normalized:
+            return
+        ids, weights = self._vectorize(normalized)
+        if self._tail_rows == len(self._tail):
+            grown = np.zeros((len(self._tail) * 2, VECTOR_DIMENSIONS), dtype=np.float32)
+            grown[:self._tail_rows] = self._tail
+            self._tail = grown
+        row = self._tail[self._tail_rows]
+        row[:] = 0
+        row[ids] = weights / np.linalg.norm(weights)
+        self._tail_rows += 1
+        self._df[ids] += 1
+        self._positions.append(position)
+        self._questions.append(normalized)
+
+    def search(self, question, top_k=3, threshold=SEMANTIC_THRESHOLD):
+        """Return up to top_k (score, entry) pairs by cosine similarity.
+
+        A stored question only counts if it contains every content word of the
+        query (knowledge_index.covers): shared words such as "capital" or "are
+        you" score well even when the question is about something else.
+        """
+        normalized = normalize_question(question)
+        if not content_words(normalized):
+            return []  # Nothing but stop words; only an exact match could answer it
+        with self._lock:
+            if len(self.entries) != self._indexed:
+                self._sync()
+            if not self._positions:
+                return []
+            ids, weights = self._vectorize(normalized)
+            idf = np.log((1.0 + len(self._positions)) / (1.0 + self._df)) + 1.0
+            query = np.zeros(VECTOR_DIMENSIONS, dtype=np.float32)
+            query[ids] = weights * idf[ids] ** 2
+            query /= np.linalg.norm(query)
+            scores = np.concatenate((self._base @ query, self._tail[:self._tail_rows] @ query))
+            positions, questions = list(self._positions), list(self._questions)
+        k = min(max(top_k, SEMANTIC_CANDIDATES), len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        matches = []
+        for row in best:
+            if scores[row] < threshold or len(matches) == top_k:
+                break
+            if covers(normalized, questions[row]):
+                matches.append((round(float(scores[row]), 4), self.entries[positions[row]]))
+        return matches
+
+    def save(self):
+        """Write the full matrix to disk atomically and memory-map it back in."""
+        if not self.path:
+            return
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        matrix = np.concatenate((self._base, self._tail[:self._tail_rows]))
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(prefix='.vectors.', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                np.save(file, matrix)
+            replace_keeping_mode(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        atomic_write_json({'indexed': self._indexed, 'positions': self._positions,
+                           'questions': self._questions, 'df': self._df.tolist()}, self._meta_path(), indent=None)
+        self._base = np.load(self.path, mmap_mode='r')
+        self._tail_rows = 0
+
+
+# One vector index per learning data dict, mirroring knowledge_index.get_question_index
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_vector_index(data, path=None):
+    """Return the shared vector index for a learning data dict, or None without NumPy.
+
+    Pass path=vector_path(learning_file) to keep the matrix on disk next to
+    the learning file; without a path the index lives in memory only.
+    """
+    if np is None:
+        return None
+    entries = data.get('entries', []) if isinstance(data, dict) else []
+    with _indexes_lock:
+        index = _indexes.get(id(data))
+        if index is None or index.entries is not entries:
+            index = VectorIndex(entries, path=path)
+            if path and index._tail_rows:
+                index.save()
+            _indexes[id(data)] = index
+            forget_when_collected(data, _indexes, id(data))
+        return index
@@ -0,0 +1,334 @@
+"""Pipelined voice loop: capture -> recognize -> answer -> synthesize -> play.
+
+Each stage runs on its own thread and hands work to the next through a
+bounded queue, so the next command is captured and recognized while the
+previous answer is still being resolved or synthesized, and a slow stage
+holds back the ones before it instead of piling up work. Playback goes
+through one long-lived Player that plays replies in order; when barge_in
+is on, recognizing a new command cancels whatever is still queued or
+playing for earlier ones.
+
+Every stage is a plain callable, so the loop runs without a microphone,
+network or speakers (see the stand-ins below):
+    python voice_pipeline.py  # Scripted demo with local stand-ins
+"""
+import queue
+import subprocess
+import threading
+import time
+from metrics import count, stage
+
+QUEUE_SIZE = 4  # Items waiting between two stages before the earlier stage blocks
+PLAYER_QUEUE_SIZE = 16
+EXIT_COMMAND = 'exit'
+_END = object()  # Returned by the recognition stage for EXIT_COMMAND: no more commands follow
+
+
+class Turn:
+    """One command moving through the pipeline; later stages drop it once it is superseded."""
+
+    __slots__ = ('number', 'value')
+
+    def __init__(self, number, value):
+        self.number = number
+        self.value = value
+
+
+class Mpg123Backend:
+    """Plays MP3 files through a single `mpg123 -R` (remote control) process instead of one process per reply."""
+
+    def __init__(self, command=('mpg123', '-R')):
+        self.command = list(command)
+        self._process = None
+        self._stopped = False  # Set by stop() until the next prepare(), so a stop sent before LOAD still counts
+        self._lock = threading.Lock()
+
+    def _send(self, line):
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                             stderr=subprocess.DEVNULL, text=True, bufsize=1)
+            self._process.stdin.write('SILENCE\n')  # No per-frame status lines
+        self._process.stdin.write(line + '\n')
+        self._process.stdin.flush()
+        return self._process
+
+    def prepare(self):
+        """Called by the Player (under its lock) for each file it is about to play; forgets earlier stops."""
+        with self._lock:
+            self._stopped = False
+
+    def play(self, path):
+        """Play a file, returning when it has finished or was stopped."""
+        with self._lock:
+            if self._stopped:
+                return  # Cancelled between being dequeued and starting
+            process = self._send(f'LOAD {path}')
+        started = False
+        for line in process.stdout:
+            if line.startswith('@P 2'):
+                started = True
+            elif line.startswith('@E') or (started and line.startswith('@P 0')):
+                return  # Finished, stopped or unplayable
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+            if self._process is not None and self._process.poll() is None:
+                self._process.stdin.write('STOP\n')
+                self._process.stdin.flush()
+
+    def close(self):
+        with self._lock:
+            if self._process is not None and self._process.poll() is None:
+                self._process.stdin.write('QUIT\n')
+                self._process.stdin.flush()
+                self._process.wait(timeout=2)
+
+
+class Player:
+    """One long-lived playback thread: files play in the order queued, never over each other.
+
+    cancel() drops everything queued and stops the file playing now (barge-in).
+    A backend has prepare(), called before each file, and stop(), which
+    must also stop a play() that has not started yet.
+    """
+
+    def __init__(self, backend=None, maxsize=PLAYER_QUEUE_SIZE):
+        self.backend = backend or Mpg123Backend()
+        self._queue = queue.Queue(maxsize)
+        self._generation = 0  # Bumped by cancel(); queued files from older generations are skipped
+        self._lock = threading.Lock()  # Orders cancel() against a file being taken off the queue
+        self._thread = threading.Thread(target=self._run, name='audio-player', daemon=True)
+        self._thread.start()
+
+    def enqueue(self, path):
+        self._queue.put((self._generation, path))
+
+    def cancel(self):
+        with self._lock:
+            self._generation += 1
+            closing = False
+            try:
+                while True:
+                    closing |= self._queue.get_nowait() is None
+            except queue.Empty:
+                pass
+            if closing:
+                self._queue.put(None)  # close() is waiting on the thread; keep its stop marker
+            self.backend.stop()
+        count('voice_barge_in')
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            generation, path = item
+            with self._lock:
+                if generation != self._generation:
+                    continue
+                # A cancel() from here on comes after this, so its stop() reaches this file's play()
+                self.backend.prepare()
+            try:
+                with stage('voice_playback'):
+                    self.backend.play(path)
+            except Exception as e:
+                print(f"Could not play {path}: {e}")
+
+    def close(self):
+        """Play what is queued, then stop the player."""
+        self._queue.put(None)
+        self._thread.join()
+        self.backend.close()
+
+
+def microphone_source():
+    """Capture one phrase from the default microphone (SpeechRecognition)."""
+    import speech_recognition as sr
+    recognizer = sr.Recognizer()
+    with sr.Microphone() as microphone:
+        recognizer.adjust_for_ambient_noise(microphone, duration=0.5)
+        return recognizer.listen(microphone)
+
+
+def google_recognizer(audio):
+    """Text of a captured phrase, or None if it could not be understood."""
+    import speech_recognition as sr
+    try:
+        return sr.Recognizer().recognize_google(audio)
+    except sr.UnknownValueError:
+        return None
+
+
+def tts_synthesizer(text):
+    """Path of the cached MP3 for text (synthesized on a miss)."""
+    from tts_cache import get_tts_cache
+    return get_tts_cache().get_audio(text)
+
+
+class VoicePipeline:
+    """Runs capture, recognition, answering and synthesis as concurrent stages feeding one Player.
+
+    source() returns captured audio, or None when there is nothing more to
+    capture; recognize(audio) returns text or None; answer(text) returns the
+    reply text; synthesize(text) returns something player.enqueue accepts.
+    Saying EXIT_COMMAND stops capturing; replies already underway still play.
+    """
+
+    def __init__(self, answer, source=microphone_source, recognize=google_recognizer, synthesize=tts_synthesizer,
+                 player=None, barge_in=True, queue_size=QUEUE_SIZE):
+        self.source = source
+        self.recognize = recognize
+        self.answer = answer
+        self.synthesize = synthesize
+        self.player = player or Player()
+        self.barge_in = barge_in
+        self.queue_size = queue_size
+        self.current = 0  # Number of the newest recognized command
+        self._stopped = threading.Event()
+        self._threads = []
+
+    def stop(self):
+        """Stop capturing; commands already captured finish their way through."""
+        self._stopped.set()
+
+    def _capture(self, outbox):
+        number = 0
+        while not self._stopped.is_set():
+            with stage('voice_capture'):
+                audio = self.source()
+            if audio is None:
+                break
+            number += 1
+            outbox.put(Turn(number, audio))
+        outbox.put(None)
+
+    def _recognized(self, turn):
+        with stage('voice_recognition'):
+            text = self.recognize(turn.value)
+        if not text or not text.strip():
+            return None
+        if text.strip().lower() == EXIT_COMMAND:
+            self.stop()
+            return _END
+        if self.barge_in and self.current:
+            self.player.cancel()  # The user spoke over the previous reply
+        self.current = turn.number
+        return text
+
+    def _answered(self, turn):
+        with stage('voice_answer'):
+            return self.answer(turn.value)
+
+    def _synthesized(self, turn):
+        with stage('voice_synthesis'):
+            return self.synthesize(turn.value)
+
+    def _run_stage(self, function, inbox, outbox):
+        while True:
+            turn = inbox.get()
+            if turn is None:
+                if outbox is not None:
+                    outbox.put(None)
+                return
+            if self.barge_in and turn.number < self.current:
+                count('voice_superseded')  # A newer command arrived; nobody wants this reply any more
+                continue
+            try:
+                value = function(turn)
+            except Exception as e:
+                print(f"Voice pipeline stage {function.__name__} failed: {e}")
+                continue
+            if value is None:
+                continue
+            if value is _END:
+                if outbox is not None:
+                    outbox.put(None)
+                return
+            if outbox is None:
+                if not self.barge_in or turn.number >= self.current:
+                    self.player.enqueue(value)
+            else:
+                outbox.put(Turn(turn.number, value))
+
+    def start(self):
+        captured, recognized, answered = (queue.Queue(self.queue_size) for _ in range(3))
+        stages = [
+            (self._capture, (captured,)),
+            (self._run_stage, (self._recognized, captured, recognized)),
+            (self._run_stage, (self._answered, recognized, answered)),
+            (self._run_stage, (self._synthesized, answered, None)),
+        ]
+        self._threads = [threading.Thread(target=target, args=args, name=f'voice-stage-{i}', daemon=True)
+                         for i, (target, args) in enumerate(stages)]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def wait(self):
+        """Block until every stage after capture has drained, then let the player finish."""
+        for thread in self._threads[1:]:  # Capture may be blocked listening; it is a daemon and exits on its own
+            thread.join()
+        self.player.close()
+
+    def run(self):
+        self.start()
+        try:
+            self.wait()
+        except KeyboardInterrupt:
+            self.stop()
+            self.player.cancel()
+
+
+# Local stand-ins: run the loop with scripted input and no audio devices or network
+
+class ScriptedSource:
+    """Returns the given phrases one per call (after delay seconds each), then None."""
+
+    def __init__(self, phrases, delay=0.0):
+        self._phrases = iter(phrases)
+        self.delay = delay
+
+    def __call__(self):
+        time.sleep(self.delay)
+        return next(self._phrases, None)
+
+
+def text_recognizer(audio):
+    """Treats the captured 'audio' as the recognized text."""
+    return audio
+
+
+class RecordingBackend:
+    """Player backend that 'plays' for a fixed time and records what was played or stopped."""
+
+    def __init__(self, seconds=0.0):
+        self.seconds = seconds
+        self.played = []
+        self.stopped = 0
+        self._stop = threading.Event()
+
+    def prepare(self):
+        self._stop.clear()
+
+    def play(self, path):
+        interrupted = self._stop.wait(self.seconds)
+        self.played.append((path, 'stopped' if interrupted else 'finished'))
+
+    def stop(self):
+        self.stopped += 1
+        self._stop.set()
+
+    def close(self):
+        pass
+
+
+if __name__ == '__main__':
+    backend = RecordingBackend(seconds=0.2)
+    pipeline = VoicePipeline(answer=lambda text: f"You said: {text}",
+                             source=ScriptedSource(['hello', 'what time is it', 'exit'], delay=0.1),
+                             recognize=text_recognizer, synthesize=lambda text: text,
+                             player=Player(backend))
+    pipeline.run()
+    for played, outcome in backend.played:
+        print(f"{outcome}: {played}")